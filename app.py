@@ -70,6 +70,8 @@ def check_directories():
         'raw_videos': 'videos/raw_videos',
         'edited': 'videos/edited',
         'final': 'videos/final',
+        'deferred': 'videos/deferred',
+        'failed': 'videos/failed',
         'uploaded': 'videos/uploaded',
     }
     return dirs
@@ -84,6 +86,27 @@ def get_video_files(directory):
         return sorted([f for f in os.listdir(directory) if f.endswith('.mp4')])
     return []
 
+def show_file_progress(step):
+    """Per-file ffmpeg progress and encode speed for a step, as written by run.py."""
+    for job in step.get('progress', []):
+        details = []
+        if job.get('speed'):
+            details.append(f"{job['speed']:g}x")
+        if job.get('fps'):
+            details.append(f"{job['fps']:g} fps")
+        details.append(f"{job.get('out_time', 0):g}s encoded in {job.get('wall_time', 0):g}s")
+        if job.get('bitrate'):
+            details.append(job['bitrate'])
+        label = f"{job['job_id']}: " + ", ".join(details)
+        if job['status'] == 'failed':
+            st.error(f"❌ {job['job_id']} (exit {job.get('returncode')})")
+            if job.get('stderr_tail'):
+                st.code("\n".join(job['stderr_tail'][-5:]))
+        elif job.get('percent') is not None:
+            st.progress(min(job['percent'], 100.0) / 100, text=label)
+        else:
+            st.caption(("✅ " if job['status'] == 'done' else "⏳ ") + label)
+
 # Main UI
 def main():
     st.markdown('<h1 class="main-header">🎬 TikTok to YouTube Shorts</h1>', unsafe_allow_html=True)
@@ -131,7 +154,8 @@ def main():
             try:
                 with open('tiktok_data.json', 'r') as f:
                     data = json.load(f)
-                    st.write(f"📥 Downloaded: {len(data.get('downloaded_videos', []))} videos")
+                    downloaded = data.get('downloaded_count', len(data.get('downloaded_videos', [])))
+                    st.write(f"📥 Downloaded: {downloaded} videos")
             except:
                 pass
         
@@ -170,6 +194,7 @@ def main():
                         new_status[key]['status'] = 'pending'
                         new_status[key]['message'] = ''
                         new_status[key]['count'] = 0
+                        new_status[key].pop('progress', None)
                 new_status['current_step'] = None
                 new_status['running'] = False
                 save_status(new_status)
@@ -203,6 +228,7 @@ def main():
             col1, col2 = st.columns([4, 1])
             with col1:
                 st.markdown("### 🛠️ Step 2: Resize Videos to 720x1280")
+                show_file_progress(status['step2_resize'])
             with col2:
                 if step2_status == 'processing':
                     st.markdown('<p class="status-processing">⏳ Processing</p>', unsafe_allow_html=True)
@@ -219,6 +245,7 @@ def main():
             col1, col2 = st.columns([4, 1])
             with col1:
                 st.markdown("### 🧠 Step 3: Generate Metadata (GPT + Whisper)")
+                show_file_progress(status['step3_metadata'])
             with col2:
                 if step3_status == 'processing':
                     st.markdown('<p class="status-processing">⏳ Processing</p>', unsafe_allow_html=True)
@@ -0,0 +1,119 @@
+"""Step 3 under a server-side rate limit: no scheduler vs scripts.api_scheduler.
+
+Runs the asyncio MetadataEngine against a local OpenAI stub that allows
+--server-rpm requests per minute (enforced over one-second windows) and
+answers anything beyond that with 429 + Retry-After. Without the scheduler
+(no retries, no local limits) the 429s turn into skipped videos; with it,
+calls are paced and retried and every video should get metadata. Run from
+the project root:
+
+    python -m benchmarks.bench_api_scheduler --videos 30 --server-rpm 600
+"""
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+from benchmarks.bench_metadata_engine import StubOpenAIHandler, make_entries
+
+
+class RateLimitedHandler(StubOpenAIHandler):
+    latency = 0.1
+    per_second = 10
+    accepted = 0
+    rejected = 0
+    _lock = threading.Lock()
+    _window = (0, 0)  # (second, requests in it)
+
+    def do_POST(self):
+        with RateLimitedHandler._lock:
+            now = time.time()
+            second, count = RateLimitedHandler._window
+            if int(now) != second:
+                second, count = int(now), 0
+            allowed = count < self.per_second
+            RateLimitedHandler._window = (second, count + allowed)
+            if allowed:
+                RateLimitedHandler.accepted += 1
+            else:
+                RateLimitedHandler.rejected += 1
+        if allowed:
+            return super().do_POST()
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        data = b'{"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}'
+        self.send_response(429)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Retry-After", f"{second + 1 - now:.2f}")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=30)
+    parser.add_argument("--server-rpm", type=int, default=600, help="requests/minute the stub accepts")
+    parser.add_argument("--latency", type=float, default=0.1, help="seconds per accepted stub request")
+    parser.add_argument("--concurrency", type=int, default=8, help="Whisper and chat concurrency")
+    args = parser.parse_args()
+
+    RateLimitedHandler.latency = args.latency
+    RateLimitedHandler.per_second = max(1, args.server_rpm // 60)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RateLimitedHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+    os.environ["RESULT_CACHE"] = "0"
+    os.environ["VAD_ENABLED"] = "0"
+    os.environ["UPLOAD_AUDIO_FORMAT"] = "wav"
+
+    from scripts import api_scheduler, openai_helper
+    from scripts.metadata_engine import MetadataEngine
+
+    # Both modes share the stub's limit; the scheduler is told about it like a real account limit
+    limits = {name: {"rpm": args.server_rpm // 2, "tpm": 0, "concurrency": args.concurrency}
+              for name in ("whisper", "chat")}
+    modes = {
+        "no scheduler": api_scheduler.ApiScheduler(limits={}, max_retries=0),
+        "scheduler": api_scheduler.ApiScheduler(limits=limits, backoff_base=0.2),
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="scheduler_bench_")
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        rows = []
+        for mode, scheduler in modes.items():
+            api_scheduler._scheduler = scheduler
+            shutil.rmtree("videos", ignore_errors=True)
+            for d in (openai_helper.FINAL_DIR, openai_helper.PROCESSED_AUDIO_DIR,
+                      openai_helper.PROCESSED_TRANSCRIPTS_DIR):
+                os.makedirs(d)
+            entries = make_entries(openai_helper.FINAL_DIR, args.videos, failures=0)
+            RateLimitedHandler.accepted = RateLimitedHandler.rejected = 0
+            engine = MetadataEngine(whisper_concurrency=args.concurrency, chat_concurrency=args.concurrency,
+                                    batch=False)
+            start = time.perf_counter()
+            results = asyncio.run(engine.run(entries))
+            elapsed = time.perf_counter() - start
+            ok = sum(1 for r in results if r["ok"])
+            rows.append((mode, elapsed, ok, RateLimitedHandler.accepted, RateLimitedHandler.rejected,
+                         scheduler.stats()))
+
+        print(f"\n{args.videos} videos, server limit {args.server_rpm} requests/min, {args.latency}s per request")
+        for mode, elapsed, ok, accepted, rejected, stats in rows:
+            retried = sum(s["retried"] for s in stats.values())
+            print(f"{mode:<13} {elapsed:6.2f}s  {ok}/{args.videos} with metadata  "
+                  f"{accepted} accepted, {rejected} got 429  {retried} retries")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Bytes sent to Whisper per clip: 16 kHz PCM WAV vs the compressed upload formats.
+
+Transcribes clips through openai_helper.transcribe_with_whisper against a
+local stub of the transcription endpoint that counts the request bytes, once
+per UPLOAD_AUDIO_FORMAT. Clips are synthetic speech-like audio (--seconds
+long), or the WAVs in --audio-dir. Also reports encode time, the upload time
+those bytes would take at --egress-mbps, and how many files each clip was
+split into (lower --max-mb to exercise chunking). Run from the project root:
+
+    python -m benchmarks.bench_audio_upload --clips 5 --seconds 60
+"""
+import os
+import time
+import wave
+import shutil
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer
+
+import numpy as np
+
+from benchmarks.bench_metadata_engine import StubOpenAIHandler
+
+RATE = 16000
+
+
+class CountingHandler(StubOpenAIHandler):
+    latency = 0
+    requests = 0
+    bytes_received = 0
+
+    def do_POST(self):
+        CountingHandler.requests += 1
+        CountingHandler.bytes_received += int(self.headers.get("Content-Length", 0))
+        super().do_POST()
+
+
+def speech_like(rng, seconds):
+    """Voiced bursts with a drifting pitch, noise consonants and pauses."""
+    out, total = [], 0
+    while total < seconds * RATE:
+        n = int(rng.uniform(0.08, 0.3) * RATE)
+        t = np.arange(n) / RATE
+        f0 = rng.uniform(110, 200)
+        voiced = sum(np.sin(2 * np.pi * f0 * k * t) * (0.3 / k) for k in range(1, 8)) * np.hanning(n)
+        consonant = rng.normal(0, 0.05, int(rng.uniform(0.03, 0.08) * RATE))
+        pause = rng.normal(0, 1e-3, int(rng.choice([0.05, 0.1, 0.4]) * RATE))
+        out += [consonant, voiced, pause]
+        total += len(consonant) + n + len(pause)
+    return np.concatenate(out)[:int(seconds * RATE)]
+
+
+def write_wav(path, samples):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=5)
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--audio-dir", help="use these WAVs instead of synthetic clips")
+    parser.add_argument("--egress-mbps", type=float, default=5, help="link speed for the upload-time estimate")
+    parser.add_argument("--max-mb", type=float, default=24, help="split uploads above this size")
+    parser.add_argument("--formats", default="wav,mp3,opus")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), CountingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+    os.environ["RESULT_CACHE"] = "0"
+
+    from scripts import audio_encoding, openai_helper
+
+    work_dir = tempfile.mkdtemp(prefix="audio_upload_bench_")
+    try:
+        if args.audio_dir:
+            clips = []
+            for name in sorted(os.listdir(args.audio_dir)):
+                if name.lower().endswith(".wav"):
+                    clips.append(os.path.join(work_dir, name))
+                    shutil.copyfile(os.path.join(args.audio_dir, name), clips[-1])
+        else:
+            rng = np.random.default_rng(0)
+            clips = []
+            for i in range(args.clips):
+                clips.append(os.path.join(work_dir, f"clip_{i}.wav"))
+                write_wav(clips[-1], speech_like(rng, args.seconds))
+        if not clips:
+            print("No WAV clips found.")
+            return
+        seconds = sum(audio_encoding.wav_duration(c) or 0 for c in clips)
+        print(f"{len(clips)} clips, {seconds / len(clips):.0f}s average, link {args.egress_mbps:g} Mbit/s\n")
+
+        baseline = None
+        for fmt in args.formats.split(","):
+            audio_encoding.UPLOAD_AUDIO_FORMAT = fmt
+            audio_encoding.MAX_UPLOAD_BYTES = int(args.max_mb * 1024 * 1024)
+            CountingHandler.requests = CountingHandler.bytes_received = 0
+            start = time.perf_counter()
+            for clip in clips:
+                openai_helper.transcribe_with_whisper(clip)
+            elapsed = time.perf_counter() - start
+
+            per_clip = CountingHandler.bytes_received / len(clips)
+            baseline = baseline or per_clip
+            upload_seconds = per_clip * 8 / (args.egress_mbps * 1e6)
+            print(f"{fmt:<5} {per_clip / 1024:8.0f} KB/clip ({per_clip / baseline:6.1%} of {args.formats.split(',')[0]})  "
+                  f"{CountingHandler.requests / len(clips):.1f} files/clip  "
+                  f"upload ~{upload_seconds:5.2f}s/clip  encode+send {elapsed / len(clips):.2f}s/clip")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
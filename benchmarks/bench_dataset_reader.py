@@ -0,0 +1,92 @@
+"""Benchmark dataset filtering: json.load + Python loop vs the streaming reader.
+
+Writes a synthetic Apify-style export, then runs each mode in a fresh child
+process so peak RSS is measured per mode. Run from the project root:
+
+    python -m benchmarks.bench_dataset_reader --rows 2000000
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+
+def write_export(path, rows):
+    rng = random.Random(0)
+    with open(path, "w") as f:
+        f.write("[\n")
+        for i in range(rows):
+            item = {
+                "id": str(7_000_000_000_000_000_000 + i),
+                "text": "tech gadget review #tech #ai " * rng.randint(1, 4),
+                "diggCount": rng.randint(0, 50_000),
+                "playCount": rng.randint(0, 2_000_000),
+                "shareCount": rng.randint(0, 1_000),
+                "authorMeta": {"name": f"user{i % 5000}", "fans": rng.randint(0, 10**6)},
+                "mediaUrls": [f"https://cdn.example.com/v/{i}.mp4"] if rng.random() > 0.05 else [],
+            }
+            f.write(json.dumps(item))
+            f.write(",\n" if i < rows - 1 else "\n")
+        f.write("]\n")
+
+
+def run_mode(mode, path, cache_dir):
+    from scripts import downloader
+
+    start = time.perf_counter()
+    if mode == "json_load":
+        with open(path) as f:
+            data = json.load(f)
+        urls = []
+        for item in data:
+            media_urls = item.get("mediaUrls", [])
+            if media_urls and item.get("diggCount", 0) > 100 and item.get("playCount", 0) > 1000:
+                urls.append(media_urls[0])
+    else:
+        columns = downloader.load_columns(path, use_cache=True, cache_dir=cache_dir)
+        urls = downloader.select_videos(columns, top_k=50 if mode.endswith("topk") else None)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "seconds": elapsed, "peak_rss_mb": peak_mb, "selected": len(urls)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--child", nargs=3, metavar=("MODE", "PATH", "CACHE_DIR"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(*args.child)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="dataset_bench_")
+    try:
+        path = os.path.join(work_dir, "export.json")
+        cache_dir = os.path.join(work_dir, "cache")
+        start = time.perf_counter()
+        write_export(path, args.rows)
+        print(f"Synthetic export: {args.rows} rows, {os.path.getsize(path) / 1e6:.0f} MB "
+              f"(written in {time.perf_counter() - start:.1f}s)")
+
+        # streaming_cold parses and fills the cache; the later modes hit it
+        for mode in ("json_load", "streaming_cold", "streaming_cached", "streaming_cached_topk"):
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_dataset_reader", "--child", mode, path, cache_dir],
+                capture_output=True, text=True, check=True
+            ).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            print(f"{mode:>22}: {result['seconds']:7.2f}s  peak RSS {result['peak_rss_mb']:8.1f} MB  "
+                  f"selected {result['selected']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
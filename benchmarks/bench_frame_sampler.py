@@ -0,0 +1,104 @@
+"""OCR frame sampling: decode-everything loop vs scripts.frame_sampler.
+
+Renders synthetic clips (default 60 s, 720x1280) and samples one frame every
+--interval seconds with the old cap.read() loop and with the sampler in
+grab-only, seek and max-frames modes. Checks that the sampled frames match
+the old loop's pixel for pixel. Run from the project root:
+
+    python -m benchmarks.bench_frame_sampler --clips 2 --seconds 60
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import cv2
+import numpy as np
+
+from scripts import frame_sampler
+
+
+def make_clip(path, seconds, gop):
+    subprocess.run([
+        "ffmpeg", "-f", "lavfi", "-i", f"testsrc2=size=720x1280:rate=30:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", str(gop), "-pix_fmt", "yuv420p", "-y", path
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+
+def read_every_frame(path, interval):
+    """The loop extract_text_with_ocr used before: decode all, keep every ~interval s."""
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 15
+    frame_interval = max(int(fps * interval), 15)
+    frames, decoded, frame_count = [], 0, 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        decoded += 1
+        if frame_count % frame_interval == 0:
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        frame_count += 1
+    cap.release()
+    return frames, {"mode": "read all", "grabbed": 0, "retrieved": decoded, "seeks": 0}
+
+
+def run_sampler(path, interval, max_frames, seek_min_gap):
+    frame_sampler.SEEK_MIN_GAP = seek_min_gap
+    stats = {}
+    frames = [f for _t, f in frame_sampler.sample_frames(path, interval, max_frames, stats=stats)]
+    return frames, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=2)
+    parser.add_argument("--seconds", type=int, default=60)
+    parser.add_argument("--interval", type=float, default=2.0)
+    parser.add_argument("--max-frames", type=int, default=10)
+    parser.add_argument("--gop", type=int, default=250, help="keyframe interval of the synthetic clips")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="sampler_bench_")
+    try:
+        clips = []
+        for i in range(args.clips):
+            clips.append(os.path.join(work_dir, f"clip_{i}.mp4"))
+            make_clip(clips[-1], args.seconds, args.gop)
+        print(f"{args.clips} clips x {args.seconds}s, 720x1280@30, GOP {args.gop}, one frame every {args.interval:g}s")
+
+        seek_min_gap = frame_sampler.SEEK_MIN_GAP
+        modes = [
+            ("read all (old)", lambda p: read_every_frame(p, args.interval)),
+            ("grab only", lambda p: run_sampler(p, args.interval, None, 1e9)),
+            ("seek + grab", lambda p: run_sampler(p, args.interval, None, seek_min_gap)),
+            (f"max {args.max_frames} frames", lambda p: run_sampler(p, None, args.max_frames, seek_min_gap)),
+        ]
+        reference = {}
+        for label, sample in modes:
+            start = time.perf_counter()
+            totals = {"grabbed": 0, "retrieved": 0, "seeks": 0, "frames": 0}
+            mismatched = 0
+            for path in clips:
+                frames, stats = sample(path)
+                for key in ("grabbed", "retrieved", "seeks"):
+                    totals[key] += stats[key]
+                totals["frames"] += len(frames)
+                if path not in reference:
+                    reference[path] = frames
+                elif not label.startswith("max"):
+                    same = len(frames) == len(reference[path]) and all(
+                        np.array_equal(a, b) for a, b in zip(frames, reference[path]))
+                    mismatched += not same
+            elapsed = time.perf_counter() - start
+            exact = "" if label.startswith(("read", "max")) else ("  exact" if not mismatched else f"  {mismatched} clips differ")
+            print(f"{label:<16} {elapsed:6.2f}s  sampled {totals['frames']:4}  "
+                  f"grabbed {totals['grabbed']:5}  retrieved {totals['retrieved']:5}  seeks {totals['seeks']:3}{exact}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Step 3 wall time: sequential process_video vs the asyncio MetadataEngine.
+
+Runs both against a local stub of the OpenAI transcription and chat
+endpoints that sleeps --latency seconds per request. Videos whose id
+contains "fail" get HTTP 500s from Whisper, to check that one bad video
+doesn't take the batch down. The async engine runs with and without
+batched metadata requests; in batched replies, videos whose id contains
+"bad" come back with an invalid title, to exercise the per-video
+fallback. Run from the project root:
+
+    python -m benchmarks.bench_metadata_engine --videos 20 --latency 0.5
+"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+TRANSCRIPT = "today we look at five keyboard shortcuts that will make you much faster at coding every day"
+REPLY = "Title: Five Shortcuts To Code Faster\nDescription: Speed up your workflow. #coding #tech #shortcuts"
+
+
+def batch_reply(request):
+    """Structured reply for a batched metadata request: one item per transcript line."""
+    items = []
+    for line in request["messages"][-1]["content"].splitlines():
+        try:
+            video_id = json.loads(line)["id"]
+        except (ValueError, TypeError, KeyError):
+            continue
+        title = "Five Shortcuts To Code Faster" if "bad" not in video_id else " ".join(["word"] * 30)
+        items.append({"id": video_id, "title": title, "description": "Speed up your workflow. #coding #tech"})
+    return json.dumps({"items": items})
+
+
+class StubOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.5
+    protocol_version = "HTTP/1.1"
+    chat_requests = 0
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(self.latency)
+        if self.path.endswith("/audio/transcriptions"):
+            if b"fail" in body:
+                return self._send(500, "application/json", json.dumps({"error": {"message": "injected failure"}}))
+            return self._send(200, "text/plain", TRANSCRIPT)
+        if self.path.endswith("/chat/completions"):
+            StubOpenAIHandler.chat_requests += 1
+            request = json.loads(body)
+            content = batch_reply(request) if "response_format" in request else REPLY
+            return self._send(200, "application/json", json.dumps({
+                "id": "chatcmpl-stub", "object": "chat.completion", "created": int(time.time()),
+                "model": "stub", "choices": [{"index": 0, "finish_reason": "stop",
+                                              "message": {"role": "assistant", "content": content}}],
+            }))
+        self._send(404, "application/json", "{}")
+
+    def _send(self, status, content_type, text):
+        data = text.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_entries(final_dir, count, failures, invalid=0):
+    entries = []
+    for i in range(count):
+        video_id = f"fail{i}" if i < failures else f"bad{i}" if i < failures + invalid else f"video{i}"
+        path = os.path.join(final_dir, f"{video_id}.mp4")
+        audio_path = os.path.join(final_dir, f"{video_id}.wav")
+        for p in (path, audio_path):
+            with open(p, "wb") as f:
+                f.write(video_id.encode() * 64)  # the stub only looks for "fail"
+        entries.append({"video_id": video_id, "path": path, "audio_path": audio_path, "container": "mp4"})
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per stub API request")
+    parser.add_argument("--failures", type=int, default=1, help="videos whose transcription fails")
+    parser.add_argument("--invalid", type=int, default=1, help="videos with an invalid item in batched replies")
+    parser.add_argument("--concurrency", type=int, default=4, help="Whisper and chat concurrency")
+    args = parser.parse_args()
+
+    StubOpenAIHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenAIHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    os.environ.setdefault("OPENAI_API_KEY", "sk-stub")
+    os.environ["RESULT_CACHE"] = "0"  # both modes must really hit the API
+    os.environ.setdefault("API_BACKOFF_BASE", "0.05")  # the injected 500s are retried before giving up
+    # The stub has no rate limit; don't pace requests to the default account limits
+    os.environ.setdefault("WHISPER_RPM", "6000")
+    os.environ.setdefault("CHAT_RPM", "6000")
+    # The fake WAVs aren't audio: upload them as they are, without VAD or encoding
+    os.environ["VAD_ENABLED"] = "0"
+    os.environ["UPLOAD_AUDIO_FORMAT"] = "wav"
+
+    # Imported after the env is set so the clients pick up the stub URL
+    from scripts import openai_helper
+    from scripts.metadata_engine import MetadataEngine
+
+    work_dir = tempfile.mkdtemp(prefix="metadata_bench_")
+    cwd = os.getcwd()
+    os.chdir(work_dir)  # openai_helper writes under ./videos
+    try:
+        timings = {}
+        for mode in ("sequential", "async", "async batched"):
+            shutil.rmtree("videos", ignore_errors=True)
+            os.makedirs(openai_helper.FINAL_DIR)
+            os.makedirs(openai_helper.PROCESSED_AUDIO_DIR)
+            os.makedirs(openai_helper.PROCESSED_TRANSCRIPTS_DIR)
+            entries = make_entries(openai_helper.FINAL_DIR, args.videos, args.failures, args.invalid)
+            StubOpenAIHandler.chat_requests = 0
+            start = time.perf_counter()
+            if mode == "sequential":
+                ok = sum(1 for entry in entries if openai_helper.process_video(entry))
+            else:
+                engine = MetadataEngine(whisper_concurrency=args.concurrency, chat_concurrency=args.concurrency,
+                                        batch=mode == "async batched")
+                ok = sum(1 for r in asyncio.run(engine.run(entries)) if r["ok"])
+            timings[mode] = (time.perf_counter() - start, ok, StubOpenAIHandler.chat_requests)
+
+        print(f"\n{args.videos} videos, {args.latency}s per API call, {args.failures} injected failures")
+        for mode, (elapsed, ok, chat_requests) in timings.items():
+            print(f"{mode:<14} {elapsed:7.2f}s  {ok}/{args.videos} with metadata  {chat_requests} chat requests  "
+                  f"speedup {timings['sequential'][0] / elapsed:.1f}x")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
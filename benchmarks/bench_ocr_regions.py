@@ -0,0 +1,150 @@
+"""OCR cost and recall: full 720x1280 frames vs text-band crops.
+
+Builds a fixture set of synthetic caption frames (blurred, gradient and busy
+backgrounds; 0-2 caption lines of known words at random sizes and places),
+or reads PNG/JPG frames from --frames-dir. Reports the text-band pre-pass
+time and how many caption lines it covers and, when EasyOCR is installed,
+OCR seconds per frame and word recall for the full-frame and cropped paths.
+With --frames-dir there is no ground truth, so recall is measured against
+the words the full-frame path finds. Run from the project root:
+
+    python -m benchmarks.bench_ocr_regions --frames 40
+"""
+import os
+import re
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from scripts import ocr_prefilter
+
+WORDS = ("coding python shortcut faster laptop keyboard terminal secret trick setup "
+         "cursor github deploy server bug fix daily tips learn build ship").split()
+
+
+def background(rng, kind):
+    h, w = 1280, 720
+    if kind == "gradient":
+        return np.tile(np.linspace(rng.integers(0, 120), rng.integers(120, 255), h, dtype=np.float32)[:, None],
+                       (1, w)).astype(np.uint8)
+    noise = (rng.random((h, w)) * 255).astype(np.uint8)
+    if kind == "busy":
+        return cv2.GaussianBlur(noise, (3, 3), 0)
+    frame = cv2.GaussianBlur(noise, (41, 41), 0)
+    for _ in range(rng.integers(0, 4)):  # UI-ish blocks
+        x, y = int(rng.integers(0, w - 100)), int(rng.integers(0, h - 100))
+        cv2.rectangle(frame, (x, y), (x + int(rng.integers(40, 200)), y + int(rng.integers(40, 200))),
+                      int(rng.integers(0, 255)), -1)
+    return frame
+
+
+def make_fixture(rng):
+    """One synthetic frame and its caption lines as (words, box)."""
+    frame = background(rng, rng.choice(["blur", "blur", "gradient", "busy"]))
+    lines = []
+    y = int(rng.integers(150, 1000))
+    for _ in range(rng.choice([0, 1, 1, 2])):
+        words = list(rng.choice(WORDS, size=int(rng.integers(2, 4)), replace=False))
+        text = " ".join(words)
+        font_scale = float(rng.uniform(0.9, 1.6))
+        (tw, th), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 3)
+        x = int(rng.integers(10, max(11, 710 - tw)))
+        if rng.random() < 0.5:  # caption box, TikTok style
+            cv2.rectangle(frame, (x - 10, y - th - 10), (x + tw + 10, y + baseline + 10), 0, -1)
+            colour = 255
+        else:
+            colour = 255 if frame[y - th:y, x:x + tw].mean() < 128 else 0
+        cv2.putText(frame, text, (x, y), cv2.FONT_HERSHEY_SIMPLEX, font_scale, colour, 3)
+        lines.append((words, (x, y - th, x + tw, y + baseline)))
+        y += th + baseline + 30
+    return frame, lines
+
+
+def covered(box, bands, min_share=0.8):
+    x0, y0, x1, y1 = box
+    area = max(1, (x1 - x0) * (y1 - y0))
+    best = 0
+    for bx0, by0, bx1, by1 in bands:
+        ix = max(0, min(x1, bx1) - max(x0, bx0))
+        iy = max(0, min(y1, by1) - max(y0, by0))
+        best = max(best, ix * iy)
+    return best / area >= min_share
+
+
+def words_of(text):
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=40, help="synthetic fixture frames")
+    parser.add_argument("--frames-dir", help="use real frames instead (no ground truth)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.frames_dir:
+        names = sorted(n for n in os.listdir(args.frames_dir) if n.lower().endswith((".png", ".jpg")))
+        fixtures = [(cv2.imread(os.path.join(args.frames_dir, n), cv2.IMREAD_GRAYSCALE), None) for n in names]
+    else:
+        fixtures = [make_fixture(rng) for _ in range(args.frames)]
+
+    start = time.perf_counter()
+    all_bands = [ocr_prefilter.find_text_bands(frame) for frame, _lines in fixtures]
+    prepass = (time.perf_counter() - start) / len(fixtures)
+    skipped = sum(1 for bands in all_bands if not bands)
+    frame_area = fixtures[0][0].shape[0] * fixtures[0][0].shape[1]
+    band_share = np.mean([sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in bands) / frame_area
+                          for bands in all_bands])
+    print(f"{len(fixtures)} frames, pre-pass {prepass * 1000:.1f} ms/frame, {skipped} frames skipped as text-free, "
+          f"crops cover {band_share:.0%} of the frame on average")
+    if not args.frames_dir:
+        lines = [(line, bands) for (_f, frame_lines), bands in zip(fixtures, all_bands) for line in frame_lines]
+        hit = sum(1 for (_words, box), bands in lines if covered(box, bands))
+        false_skips = sum(1 for (_f, frame_lines), bands in zip(fixtures, all_bands) if frame_lines and not bands)
+        print(f"caption lines covered by a band: {hit}/{len(lines)}; frames with text skipped: {false_skips}")
+
+    try:
+        import easyocr
+    except ImportError:
+        print("EasyOCR not installed; skipping the OCR timing and recall comparison.")
+        return
+    reader = easyocr.Reader(['en'], gpu=False)
+
+    def full_frame(frame):
+        return " ".join(t[1] for t in reader.readtext(frame))
+
+    def banded(frame, bands):
+        if not bands:
+            return ""
+        h, w = frame.shape[:2]
+        if bands == [(0, 0, w, h)]:
+            return full_frame(frame)
+        image, boxes = ocr_prefilter.band_boxes(frame, bands)
+        return " ".join(t[1] for t in reader.recognize(image, horizontal_list=boxes, free_list=[]))
+
+    results = {}
+    for label in ("full frame", "text bands"):
+        found, seconds = [], 0.0
+        for (frame, _lines), bands in zip(fixtures, all_bands):
+            t0 = time.perf_counter()
+            text = full_frame(frame) if label == "full frame" else banded(frame, bands)
+            seconds += time.perf_counter() - t0
+            found.append(words_of(text))
+        results[label] = (found, seconds / len(fixtures))
+
+    for label, (found, per_frame) in results.items():
+        if args.frames_dir:
+            truth = results["full frame"][0]
+        else:
+            truth = [set(w for words, _box in lines for w in words) for _frame, lines in fixtures]
+        total = sum(len(t) for t in truth)
+        recalled = sum(len(t & f) for t, f in zip(truth, found))
+        print(f"{label:<11} {per_frame:6.2f} s/frame  recall {recalled}/{total} words "
+              f"({recalled / max(1, total):.0%})")
+
+
+if __name__ == "__main__":
+    main()
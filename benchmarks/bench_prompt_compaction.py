@@ -0,0 +1,145 @@
+"""Prompt compaction on a fixture set: size reduction, speed and keyword retention.
+
+Each fixture is a Whisper- or OCR-style transcript with the words the
+metadata prompt must keep (the tool, the numbers, the hashtags). Reports
+estimated tokens before/after and compaction time per transcript, and
+exits non-zero if a fixture loses a required word or ends up over the
+budget. --transcripts-dir adds real transcripts (e.g.
+videos/processed/transcripts) for the size numbers only. Run from the
+project root:
+
+    python -m benchmarks.bench_prompt_compaction --budget 500
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+from scripts import prompt_compaction
+
+TUTORIAL_STEPS = [
+    "First open the command palette with control shift P and type format document.",
+    "Next install the Prettier extension so every file formats on save.",
+    "Then turn on auto save in settings, it is under files auto save after delay.",
+    "Now use alt and the arrow keys to move a whole line up or down without cutting it.",
+    "Press control D to select the next match and edit every copy of a variable at once.",
+    "Split the editor with control backslash so the test file sits next to the code.",
+    "Finally use the integrated terminal with control backtick instead of switching windows.",
+]
+FILLER = [
+    "So yeah, um, that is basically what I wanted to say about this one.",
+    "Honestly it took me way too long to find this out.",
+    "Let me know in the comments if you already knew that one.",
+    "Okay, okay, moving on.",
+]
+
+FIXTURES = [
+    {
+        "name": "short speech (within budget)",
+        "ocr": False,
+        "text": "Here is how to undo a git commit without losing your changes. Run git reset soft head tilde one "
+                "and your files stay staged. #git #coding",
+        "keep": ["git", "reset", "soft", "staged", "#git", "#coding"],
+    },
+    {
+        "name": "short speech with units and emphasis",
+        "ocr": False,
+        "text": "I shot this on a 35 mm lens, um, at f 1.8. No no no way this is a phone. #photography",
+        "keep": ["35 mm lens", "no no no way", "#photography"],
+    },
+    {
+        "name": "long tutorial with filler",
+        "ocr": False,
+        "text": "[Music] Seven VS Code tricks that save me an hour every week. " + " ".join(
+            step + " " + FILLER[i % len(FILLER)] + " " + FILLER[(i + 1) % len(FILLER)]
+            for i, step in enumerate(TUTORIAL_STEPS * 3)) + " Follow for part two. #vscode #productivity",
+        "keep": ["vs", "code", "prettier", "palette", "#vscode", "#productivity", "seven"],
+    },
+    {
+        "name": "OCR captions re-read every frame",
+        "ocr": True,
+        "text": "\n".join(
+            ["STOP using print()", "STOP using print() for debugging", "| l _ ~", "use breakpoint() instead",
+             "use breakpoint() instead", "python 3.7+", "follow for more python tips follow for more python tips"]
+            * 12),
+        "keep": ["print", "debugging", "breakpoint", "python", "3.7"],
+    },
+    {
+        "name": "OCR caption build-up with noise",
+        "ocr": True,
+        "text": "\n".join(
+            ["ChatGPT", "ChatGPT can", "ChatGPT can write", "ChatGPT can write your SQL", "~~ | ^^",
+             "ChatGPT can write your SQL queries", "try it: 'show top 10 customers by revenue'",
+             "@techtips", "#sql #ai"] * 12),
+        "keep": ["chatgpt", "sql", "queries", "10", "customers", "revenue", "#sql", "#ai"],
+    },
+    {
+        "name": "code identifiers and handles",
+        "ocr": False,
+        "text": "Stop using string concatenation for paths. Use os.path.join, or better pathlib. "
+                "Put the setup in __init__ and call my_function from main. The type hint is str -> Path. "
+                + " ".join(FILLER * 9) + " Credit to @code_with_ana for this one. #python",
+        "keep": ["os.path.join", "__init__", "my_function", "->", "@code_with_ana", "pathlib", "#python"],
+    },
+    {
+        "name": "rambling review with numbers",
+        "ocr": False,
+        "text": " ".join(
+            [f"The M3 MacBook Air gets about {h} hours of battery in my testing, which honestly surprised me."
+             for h in (15, 15, 16)]
+            + [f"{s} I mean it. Really." for s in FILLER * 10]
+            + ["It costs 1099 dollars and the base model has 8 gigabytes of memory, which is the one catch.",
+               "For students and writers it is the laptop I would buy. #macbook #apple #review"]),
+        "keep": ["m3", "macbook", "air", "battery", "1099", "8", "gigabytes", "#macbook", "#apple"],
+    },
+]
+
+
+def contains(text, word):
+    return re.search(rf"(?<![\w#@]){re.escape(word.lower())}(?![\w])", text.lower()) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", type=int, default=prompt_compaction.PROMPT_TOKEN_BUDGET)
+    parser.add_argument("--transcripts-dir", help="also compact every .txt in this directory")
+    parser.add_argument("--repeat", type=int, default=20, help="timing repetitions per transcript")
+    args = parser.parse_args()
+
+    cases = list(FIXTURES)
+    if args.transcripts_dir:
+        for name in sorted(os.listdir(args.transcripts_dir)):
+            if name.endswith(".txt"):
+                with open(os.path.join(args.transcripts_dir, name)) as f:
+                    cases.append({"name": name, "ocr": False, "text": f.read(), "keep": []})
+
+    failures = 0
+    total_before = total_after = 0
+    print(f"budget {args.budget} tokens\n")
+    for case in cases:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            compacted, report = prompt_compaction.compact_transcript(case["text"], args.budget, ocr=case["ocr"])
+        ms = (time.perf_counter() - start) / args.repeat * 1000
+        before, after = report["tokens_before"], report["tokens_after"]
+        total_before += before
+        total_after += after
+        missing = [w for w in case["keep"] if not contains(compacted, w)]
+        over = after > args.budget
+        failures += bool(missing or over)
+        status = "ok" if not (missing or over) else "REGRESSION"
+        print(f"{case['name'][:34]:<34} {before:5} -> {after:4} tokens ({1 - after / max(1, before):4.0%} smaller)  "
+              f"{ms:5.1f} ms  {status}")
+        if missing:
+            print(f"    lost: {', '.join(missing)}")
+        if over:
+            print(f"    over budget by {after - args.budget} tokens")
+
+    print(f"\ntotal {total_before} -> {total_after} tokens ({1 - total_after / max(1, total_before):.0%} smaller), "
+          f"{failures} regressions")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Measure egress for resumable vs restart-from-scratch downloads over a flaky server.
+
+A local HTTP server serves multi-MB clips (with Range support) and drops the
+connection part-way through the first few responses for every clip. Reports
+bytes sent by the server and wall time for each mode, and checks that every
+downloaded file matches the source. Run from the project root:
+
+    python -m benchmarks.bench_resumable_downloads --clips 8 --size-mb 8
+"""
+import os
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+from scripts.downloader import fetch_to_file, get_session
+
+
+class FlakyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, payload, drops, drop_fraction):
+        super().__init__(address, FlakyHandler)
+        self.payload = payload
+        self.drops = drops
+        self.drop_fraction = drop_fraction
+        self.attempts = defaultdict(int)
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        payload = server.payload
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            start = int(range_header[6:].split("-")[0])
+        if start >= len(payload):
+            self.send_response(416)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = payload[start:]
+        self.send_response(206 if start else 200)
+        if start:
+            self.send_header("Content-Range", f"bytes {start}-{len(payload) - 1}/{len(payload)}")
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        with server.lock:
+            server.attempts[self.path] += 1
+            drop = server.attempts[self.path] <= server.drops
+        limit = int(len(body) * server.drop_fraction) if drop else len(body)
+        sent = 0
+        step = 64 * 1024
+        while sent < limit:
+            chunk = body[sent:min(sent + step, limit)]
+            self.wfile.write(chunk)
+            sent += len(chunk)
+        with server.lock:
+            server.bytes_sent += sent
+        if drop:
+            self.close_connection = True
+            self.connection.shutdown(2)
+
+
+def download_restarting(url, filepath, max_attempts=10):
+    """Old behaviour: plain GET straight to the final path, start over on failure."""
+    for _ in range(max_attempts):
+        try:
+            response = requests.get(url, stream=True, timeout=(10, 60))
+            response.raise_for_status()
+            with open(filepath, "wb") as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    f.write(chunk)
+            if os.path.getsize(filepath) == int(response.headers["Content-Length"]):
+                return
+        except requests.exceptions.RequestException:
+            pass
+    raise RuntimeError(f"gave up on {url}")
+
+
+def run(mode, args, payload, expected_md5, out_dir):
+    server = FlakyServer(("127.0.0.1", 0), payload, args.drops, args.drop_fraction)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    start = time.perf_counter()
+    try:
+        for i in range(args.clips):
+            url = f"{base_url}/clip_{i}.mp4"
+            path = os.path.join(out_dir, f"{mode}_{i}.mp4")
+            if mode == "resumable":
+                fetch_to_file(url, path, session=get_session(), max_attempts=args.drops + 2)
+            else:
+                download_restarting(url, path, max_attempts=args.drops + 2)
+            with open(path, "rb") as f:
+                assert hashlib.md5(f.read()).hexdigest() == expected_md5, f"{path} is corrupt"
+    finally:
+        server.shutdown()
+    return server.bytes_sent, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=8)
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--drops", type=int, default=2, help="dropped responses per clip")
+    parser.add_argument("--drop-fraction", type=float, default=0.6, help="share of the body sent before a drop")
+    args = parser.parse_args()
+
+    payload = os.urandom(int(args.size_mb * 1024 * 1024))
+    expected_md5 = hashlib.md5(payload).hexdigest()
+    ideal = len(payload) * args.clips
+    out_dir = tempfile.mkdtemp(prefix="resume_bench_")
+    try:
+        print(f"{args.clips} clips x {args.size_mb} MB, {args.drops} drops per clip "
+              f"at {args.drop_fraction:.0%} of each response")
+        for mode in ("restart", "resumable"):
+            sent, elapsed = run(mode, args, payload, expected_md5, out_dir)
+            print(f"{mode:>10}: {sent / 1e6:8.1f} MB sent ({sent / ideal:5.2f}x the clip bytes)  "
+                  f"{elapsed:6.2f}s  all files intact")
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""Chunked resumable uploads vs the old single-request upload, over a flaky stand-in YouTube.
+
+A local HTTP server implements the resumable-upload protocol (session POST
+with a Location header, Content-Range PUTs answered with 308 + Range,
+"bytes */size" status queries, 200 + video JSON at the end) and injects a
+failure every --fail-every-mb of received bytes, alternating a dropped
+connection (the bytes read so far are kept) and a 503 after the whole
+request body (nothing from that request is kept). Halfway through, the
+uploading "process" crashes once and is started again. Reports bytes the
+server had to receive, wall time and retries per mode, and checks that the
+server assembled the exact file. Run from the project root:
+
+    python -m benchmarks.bench_resumable_upload --size-mb 64 --chunk-mb 8
+"""
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from urllib.parse import urlsplit
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import httplib2
+from googleapiclient.discovery import build
+
+from scripts import api_scheduler, resumable_upload
+
+GRANULARITY = resumable_upload.CHUNK_GRANULARITY
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fail_every, crash_at, mbps):
+        super().__init__(address, StandInHandler)
+        self.fail_every = fail_every
+        self.crash_at = crash_at
+        self.bytes_per_second = mbps * 1e6 / 8
+        self.sessions = {}  # id -> {"size", "data"}
+        self.received = 0
+        self.failures = 0
+        self.crash_pending = False
+        self.finished = {}  # video id -> md5 of the assembled file
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        pass
+
+    def transfer_time(self, nbytes):
+        """Seconds nbytes take on one connection."""
+        return nbytes / self.bytes_per_second
+
+    def next_failure(self, nbytes):
+        """Count nbytes more on the link. Returns None, "drop", "503" or "crash" if a failure point was crossed."""
+        with self.lock:
+            before, self.received = self.received, self.received + nbytes
+            if self.crash_at and before < self.crash_at <= self.received:
+                self.crash_pending = True
+                return "crash"
+            if self.fail_every and before // self.fail_every != self.received // self.fail_every:
+                self.failures += 1
+                return "drop" if self.failures % 2 else "503"
+        return None
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def reply(self, status, headers=None, body=b""):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        """Start a session: the metadata body comes now, the bytes in later PUTs."""
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        server = self.server
+        with server.lock:
+            session_id = str(len(server.sessions) + 1)
+            server.sessions[session_id] = {"size": int(self.headers["X-Upload-Content-Length"]), "data": bytearray()}
+        host, port = server.server_address
+        self.reply(200, {"Location": f"http://{host}:{port}/upload/session/{session_id}"})
+
+    def progress(self, session, status=308):
+        committed = len(session["data"])
+        if committed == session["size"]:
+            video_id = f"stand-in-{hashlib.md5(session['data']).hexdigest()[:8]}"
+            self.server.finished[video_id] = hashlib.md5(session["data"]).hexdigest()
+            body = json.dumps({"kind": "youtube#video", "id": video_id}).encode()
+            return self.reply(200, {"Content-Type": "application/json"}, body)
+        self.reply(status, {"Range": f"bytes=0-{committed - 1}"} if committed else {})
+
+    def do_PUT(self):
+        server = self.server
+        session = server.sessions.get(self.path.rsplit("/", 1)[-1])
+        length = int(self.headers.get("Content-Length", 0))
+        if session is None:
+            self.rfile.read(length)
+            return self.reply(404)
+        match = re.match(r"bytes (\d+)-(\d+)/(\d+)", self.headers.get("Content-Range", ""))
+        if not match:  # "bytes */size": status query
+            return self.progress(session)
+        start, end = int(match.group(1)), int(match.group(2))
+        if length != end - start + 1 or end >= session["size"]:
+            self.rfile.read(max(0, length))
+            return self.reply(400, {"Connection": "close"})
+        if start != len(session["data"]):
+            self.rfile.read(length)
+            return self.progress(session)
+
+        body, failure = bytearray(), None
+        while len(body) < length:
+            piece = self.rfile.read(min(64 * 1024, length - len(body)))
+            if not piece:
+                return
+            body += piece
+            time.sleep(server.transfer_time(len(piece)))
+            failure = failure or server.next_failure(len(piece))
+            if failure in ("drop", "crash"):
+                # The server keeps what arrived, in whole 256 KB units
+                session["data"] += body[:len(body) // GRANULARITY * GRANULARITY]
+                self.close_connection = True
+                self.connection.shutdown(2)
+                return
+        if failure == "503":
+            return self.reply(503, {"Connection": "close"})
+        session["data"] += body
+        self.progress(session)
+
+
+class SimulatedCrash(BaseException):
+    """The uploading process died (BaseException, so nothing in the upload path catches it)."""
+
+
+class StandInHttp(httplib2.Http):
+    """Sends every API request to the stand-in server, and turns its crash signal into SimulatedCrash."""
+
+    def __init__(self, server):
+        super().__init__(timeout=30)
+        # 308 is "resume incomplete" here, not a redirect (googleapiclient's build_http does the same)
+        self.redirect_codes = self.redirect_codes - {308}
+        self.server = server
+        host, port = server.server_address
+        self.netloc = f"{host}:{port}"
+
+    def request(self, uri, method="GET", body=None, headers=None, *args, **kwargs):
+        uri = urlsplit(uri)._replace(scheme="http", netloc=self.netloc).geturl()
+        try:
+            return super().request(uri, method, body, headers, *args, **kwargs)
+        finally:
+            # httplib2 may have resent the request and succeeded; the process dies either way
+            with self.server.lock:
+                crashed, self.server.crash_pending = self.server.crash_pending, False
+            if crashed:
+                raise SimulatedCrash()
+
+
+def youtube_client(server):
+    return build("youtube", "v3", http=StandInHttp(server), static_discovery=True)
+
+
+def upload_single_request(youtube, path, body, session_key, sessions_dir, max_runs=5):
+    """Old behaviour: one PUT for the whole file via execute(), nothing saved between runs.
+
+    An upload that fails for good (googleapiclient resumes a chunksize=-1
+    upload with a wrong Content-Range once more than half the file is in)
+    is skipped by the old uploader and sent again from scratch on the next
+    run.
+    """
+    for _ in range(max_runs):
+        request = resumable_upload.insert_request(youtube, path, body, chunk_size=-1)
+        try:
+            return api_scheduler.get_scheduler().call("youtube_upload", request.execute), None
+        except Exception as e:
+            print(f"❌ single request: upload failed ({type(e).__name__}), next run starts over")
+    raise RuntimeError("single request: gave up")
+
+
+def upload_chunked(youtube, path, body, session_key, sessions_dir):
+    return resumable_upload.upload_video(youtube, path, body, session_key, sessions_dir=sessions_dir)
+
+
+def run(mode, upload, args, path, expected_md5, sessions_dir):
+    size = os.path.getsize(path)
+    server = StandInServer(("127.0.0.1", 0), int(args.fail_every_mb * 1024 * 1024),
+                           int(size * args.crash_at), args.mbps)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    scheduler = api_scheduler.ApiScheduler(backoff_base=0.05, backoff_max=1, max_retries=8)
+    api_scheduler._scheduler = scheduler
+    body = {"snippet": {"title": "bench", "description": ""}, "status": {"privacyStatus": "private"}}
+    restarts, result = 0, "gave up"
+    start = time.perf_counter()
+    try:
+        while True:
+            try:
+                # A fresh client each time, like a restarted process
+                response, _ = upload(youtube_client(server), path, body, "bench", sessions_dir)
+                assert server.finished.get(response["id"]) == expected_md5, f"{mode}: server assembled a different file"
+                result = "file intact"
+                break
+            except SimulatedCrash:
+                restarts += 1
+                print(f"💥 {mode}: upload process crashed, restarting")
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                break
+    finally:
+        server.shutdown()
+    elapsed = time.perf_counter() - start
+    retried = sum(s["retried"] for s in scheduler.stats().values())
+    return server.received, elapsed, retried, restarts, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=float, default=64)
+    parser.add_argument("--chunk-mb", type=float, default=8, help="chunk size (rounded to 256 KB)")
+    parser.add_argument("--fail-every-mb", type=float, default=24, help="inject a failure every N MB received")
+    parser.add_argument("--crash-at", type=float, default=0.5, help="crash once at this share of the file (0 = never)")
+    parser.add_argument("--mbps", type=float, default=400, help="simulated uplink in megabits/s")
+    args = parser.parse_args()
+
+    chunk_size = max(1, int(args.chunk_mb * 1024 * 1024) // GRANULARITY) * GRANULARITY
+    resumable_upload.UPLOAD_CHUNK_SIZE = chunk_size
+    work_dir = tempfile.mkdtemp(prefix="upload_bench_")
+    try:
+        path = os.path.join(work_dir, "clip.mp4")
+        payload = os.urandom(int(args.size_mb * 1024 * 1024))
+        with open(path, "wb") as f:
+            f.write(payload)
+        expected_md5 = hashlib.md5(payload).hexdigest()
+
+        rows = []
+        for mode, upload in (("single request", upload_single_request), ("chunked", upload_chunked)):
+            sessions_dir = os.path.join(work_dir, f"sessions_{mode.replace(' ', '_')}")
+            rows.append((mode,) + run(mode, upload, args, path, expected_md5, sessions_dir))
+
+        size = len(payload)
+        print(f"\n{args.size_mb} MB file, {chunk_size / 1024 / 1024:g} MB chunks, a failure every "
+              f"{args.fail_every_mb} MB, crash at {args.crash_at:.0%}, {args.mbps} Mbit/s uplink")
+        for mode, received, elapsed, retried, restarts, result in rows:
+            print(f"{mode:<15} {received / 1024 / 1024:7.1f} MB received ({received / size:4.2f}x the file)  "
+                  f"{elapsed:6.2f}s  {retried} retries, {restarts} restarts, {result}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
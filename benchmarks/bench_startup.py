@@ -0,0 +1,72 @@
+"""Pipeline startup cost: wall time and peak RSS of `python -c "import run"`.
+
+Measures the working tree and, with --baseline, the same import in a git
+revision exported to a temp dir, so a change can be compared before/after.
+A dummy OPENAI_API_KEY is set so revisions that check it at import time
+still load. Run from the project root:
+
+    python -m benchmarks.bench_startup --runs 5 --baseline HEAD~1
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+
+def measure(tree, code):
+    """One cold interpreter run. Returns (seconds, peak RSS in MB, returncode, stderr)."""
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "sk-bench"))
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-c", code], cwd=tree, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = proc.stderr.read()
+    _pid, status, usage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return elapsed, usage.ru_maxrss / 1024, proc.returncode, stderr.decode("utf-8", "replace")
+
+
+def export_revision(rev, dest):
+    archive = subprocess.run(["git", "archive", rev], capture_output=True, check=True).stdout
+    subprocess.run(["tar", "-x", "-C", dest], input=archive, check=True)
+
+
+def report(label, tree, code, runs):
+    samples = []
+    for _ in range(runs):
+        elapsed, rss, returncode, stderr = measure(tree, code)
+        if returncode != 0:
+            last_line = stderr.strip().splitlines()[-1] if stderr.strip() else f"exit {returncode}"
+            print(f"{label:<12} import failed: {last_line}")
+            return
+        samples.append((elapsed, rss))
+    times = [t for t, _ in samples]
+    rss = [r for _, r in samples]
+    print(f"{label:<12} median {statistics.median(times):6.2f}s  min {min(times):6.2f}s  "
+          f"peak RSS {statistics.median(rss):7.1f} MB  ({runs} runs)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--module", default="run", help="module to import")
+    parser.add_argument("--baseline", help="git revision to compare against, e.g. HEAD~1")
+    args = parser.parse_args()
+
+    code = f"import {args.module}"
+    if args.baseline:
+        baseline_dir = tempfile.mkdtemp(prefix="startup_bench_")
+        try:
+            export_revision(args.baseline, baseline_dir)
+            report(args.baseline, baseline_dir, code, args.runs)
+        finally:
+            shutil.rmtree(baseline_dir, ignore_errors=True)
+    report("working tree", os.getcwd(), code, args.runs)
+
+
+if __name__ == "__main__":
+    main()
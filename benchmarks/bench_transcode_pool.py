@@ -0,0 +1,63 @@
+"""Aggregate encode throughput of the transcode pool against parallel job count.
+
+Renders synthetic lavfi testsrc clips, then transcodes the whole set once per
+job count with the same total CPU budget. Run from the project root:
+
+    python -m benchmarks.bench_transcode_pool --clips 8 --seconds 10 --jobs 1 2 4 8
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from scripts.editor import plan_jobs, transcode_batch
+
+
+def make_clip(path, seconds, size):
+    subprocess.run([
+        "ffmpeg", "-f", "lavfi", "-i", f"testsrc=size={size}:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", "-y", path
+    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", type=int, default=8)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--size", default="1080x1920", help="source resolution")
+    parser.add_argument("--cpu-budget", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="transcode_bench_")
+    try:
+        inputs = []
+        for i in range(args.clips):
+            path = os.path.join(work_dir, f"src_{i}.mp4")
+            make_clip(path, args.seconds, args.size)
+            inputs.append(path)
+        video_seconds = args.clips * args.seconds
+        print(f"{args.clips} clips x {args.seconds}s at {args.size}, CPU budget {args.cpu_budget}")
+
+        for jobs in args.jobs:
+            jobs, threads = plan_jobs(args.cpu_budget, jobs)
+            pairs = [(src, os.path.join(work_dir, f"out_{jobs}_{i}.mp4")) for i, src in enumerate(inputs)]
+            start = time.perf_counter()
+            results = transcode_batch(pairs, jobs=jobs, cpu_budget=args.cpu_budget)
+            elapsed = time.perf_counter() - start
+            failed = sum(1 for r in results if not r["ok"])
+            print(f"jobs={jobs:<3} threads/job={threads:<3} wall {elapsed:7.2f}s  "
+                  f"{video_seconds / elapsed:6.2f} video-s/s  {video_seconds * 30 / elapsed:7.1f} fps"
+                  + (f"  ({failed} failed)" if failed else ""))
+            for _src, dst in pairs:
+                if os.path.exists(dst):
+                    os.remove(dst)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Upload a batch: the old serial loop with a 1 s pause vs scripts.upload_queue.
+
+Uses the stand-in resumable-upload server from bench_resumable_upload with
+a per-connection speed limit (--conn-mbps) under a shared uplink
+(--uplink-mbps), and a server-side daily quota: once --quota-units run
+out, videos.insert answers 403 quotaExceeded. The serial loop uploads
+one video at a time and fails whatever is past the quota. The queue
+runs --workers uploads at once, highest priority first, spends quota
+from a ledger and defers the rest. A second run of the queue on the same
+day then makes no API calls at all. Run from the project root:
+
+    python -m benchmarks.bench_upload_queue --videos 12 --size-mb 16 --workers 4
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+from benchmarks.bench_resumable_upload import StandInServer, StandInHandler, youtube_client
+from scripts import api_scheduler, resumable_upload, upload_queue
+
+
+class QuotaServer(StandInServer):
+    def __init__(self, address, conn_mbps, uplink_mbps, quota_units, insert_cost):
+        super().__init__(address, fail_every=0, crash_at=0, mbps=conn_mbps)
+        self.RequestHandlerClass = QuotaHandler
+        self.uplink_bytes_per_second = uplink_mbps * 1e6 / 8
+        self.uplink_free_at = 0.0
+        self.quota_left = quota_units
+        self.insert_cost = insert_cost
+        self.inserts = self.rejected = 0
+
+    def transfer_time(self, nbytes):
+        """The slower of the connection's own limit and a turn on the shared uplink."""
+        with self.lock:
+            now = time.monotonic()
+            self.uplink_free_at = max(self.uplink_free_at, now) + nbytes / self.uplink_bytes_per_second
+            link_wait = self.uplink_free_at - now
+        return max(super().transfer_time(nbytes), link_wait)
+
+
+class QuotaHandler(StandInHandler):
+    def do_POST(self):
+        server = self.server
+        with server.lock:
+            allowed = server.quota_left >= server.insert_cost
+            if allowed:
+                server.quota_left -= server.insert_cost
+                server.inserts += 1
+            else:
+                server.rejected += 1
+        if allowed:
+            return super().do_POST()
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = (b'{"error": {"code": 403, "message": "The request cannot be completed because you have exceeded '
+                b'your quota.", "errors": [{"reason": "quotaExceeded", "domain": "youtube.quota"}]}}')
+        self.reply(403, {"Content-Type": "application/json"}, body)
+
+
+def make_videos(work_dir, count, size_mb):
+    payload = os.urandom(int(size_mb * 1024 * 1024))
+    videos = []
+    for i in range(count):
+        path = os.path.join(work_dir, f"video_{i:02}.mp4")
+        with open(path, "wb") as f:
+            f.write(payload[i:] + payload[:i])  # distinct bytes per video
+        # Every third video is marked urgent; the rest keep their queue order
+        videos.append({"video_id": os.path.basename(path), "path": path, "priority": 1 if i % 3 == 2 else 0,
+                       "added_at": f"2024-01-01T00:00:{i:02}"})
+    return videos
+
+
+def uploader(server, sessions_dir, started):
+    clients = threading.local()
+
+    def upload(video):
+        if not hasattr(clients, "youtube"):
+            clients.youtube = youtube_client(server)
+        started.append(video["video_id"])
+        body = {"snippet": {"title": video["video_id"], "description": ""}, "status": {"privacyStatus": "private"}}
+        response, _ = resumable_upload.upload_video(clients.youtube, video["path"], body, video["video_id"],
+                                                    sessions_dir=sessions_dir)
+        return response["id"]
+    return upload
+
+
+def serial(videos, upload):
+    """Old behaviour: one at a time in name order, a fixed pause after each, quota errors are failures."""
+    outcomes = {}
+    for index, video in enumerate(videos):
+        try:
+            outcomes[index] = (upload_queue.DONE, upload(video))
+        except Exception as e:
+            print(f"❌ Upload failed for {video['video_id']}: {type(e).__name__}")
+            outcomes[index] = (upload_queue.FAILED, e)
+        time.sleep(1)  # prevent hitting rate limits
+    return outcomes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--videos", type=int, default=12)
+    parser.add_argument("--size-mb", type=float, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--conn-mbps", type=float, default=100, help="upload speed of one connection")
+    parser.add_argument("--uplink-mbps", type=float, default=400, help="upload speed shared by all connections")
+    parser.add_argument("--quota-units", type=int, default=10000, help="daily quota on the stand-in server")
+    args = parser.parse_args()
+
+    cost = upload_queue.INSERT_COST
+    work_dir = tempfile.mkdtemp(prefix="upload_queue_bench_")
+    try:
+        videos = make_videos(work_dir, args.videos, args.size_mb)
+        ordered = sorted(videos, key=lambda v: upload_queue.upload_priority(v, v))
+        ledger_path = os.path.join(work_dir, "youtube_quota.json")  # shared by both queue runs
+        rows = []
+        for mode in ("serial + 1s pause", "upload queue", "queue, same day again"):
+            server = QuotaServer(("127.0.0.1", 0), args.conn_mbps, args.uplink_mbps, args.quota_units, cost)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            api_scheduler._scheduler = api_scheduler.ApiScheduler(backoff_base=0.05)
+            sessions_dir = os.path.join(work_dir, "sessions")
+            started = []
+            upload = uploader(server, sessions_dir, started)
+            start = time.perf_counter()
+            try:
+                if mode.startswith("serial"):
+                    outcomes = serial(videos, upload)
+                else:
+                    ledger = upload_queue.QuotaLedger(ledger_path, daily_quota=args.quota_units)
+                    outcomes = upload_queue.run_uploads(ordered, upload, ledger=ledger, workers=args.workers,
+                                                        cost=cost, label=lambda v: v["video_id"])
+            finally:
+                server.shutdown()
+            elapsed = time.perf_counter() - start
+            counts = {k: sum(1 for outcome, _ in outcomes.values() if outcome == k)
+                      for k in (upload_queue.DONE, upload_queue.DEFERRED, upload_queue.FAILED)}
+            uploaded_mb = counts[upload_queue.DONE] * args.size_mb
+            rows.append((mode, elapsed, counts, uploaded_mb, server.inserts + server.rejected, started))
+
+        link_mb_per_s = args.uplink_mbps / 8
+        print(f"\n{args.videos} videos x {args.size_mb} MB, {args.conn_mbps} Mbit/s per connection, "
+              f"{args.uplink_mbps} Mbit/s uplink, quota for {args.quota_units // cost} inserts")
+        for mode, elapsed, counts, uploaded_mb, calls, started in rows:
+            print(f"{mode:<22} {elapsed:6.2f}s  {counts['done']} uploaded, {counts['deferred']} deferred, "
+                  f"{counts['failed']} failed  {calls} insert calls  "
+                  f"uplink {uploaded_mb * 1.048576 / max(elapsed, 1e-6) / link_mb_per_s:4.0%} used")
+        queue_started = rows[1][5]
+        expected = [v["video_id"] for v in ordered[:len(queue_started)]]
+        print(f"queue started the {len(queue_started)} highest-priority videos: "
+              f"{'yes' if sorted(queue_started) == sorted(expected) else 'NO'} ({', '.join(queue_started)})")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
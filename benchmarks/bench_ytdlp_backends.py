@@ -0,0 +1,97 @@
+"""Compare per-URL overhead of the in-process and subprocess yt-dlp backends.
+
+Serves a fixture clip from a local HTTP server and downloads it N times
+through each backend. Run from the project root:
+
+    python -m benchmarks.bench_ytdlp_backends --urls 20
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+import subprocess
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+from scripts.ytdlp_backend import InProcessBackend, SubprocessBackend
+
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Maps every /clip_<n>.mp4 path onto the same fixture file."""
+
+    def translate_path(self, path):
+        return os.path.join(self.directory, "fixture.mp4")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QuietServer(ThreadingHTTPServer):
+    """yt-dlp probes and hangs up early; don't print those broken pipes."""
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def make_fixture(path, seconds):
+    """Render a small real clip with ffmpeg, or fall back to random bytes."""
+    cmd = [
+        "ffmpeg", "-f", "lavfi", "-i", f"testsrc=size=720x1280:rate=30:duration={seconds}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-shortest", "-y", path
+    ]
+    try:
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        with open(path, "wb") as f:
+            f.write(os.urandom(2 * 1024 * 1024))
+
+
+def run_backend(backend, base_url, out_dir, count):
+    timings = []
+    for i in range(count):
+        outtmpl = os.path.join(out_dir, f"{backend.name}_{i}.%(ext)s")
+        start = time.perf_counter()
+        filepath, _info = backend.download(f"{base_url}/clip_{i}.mp4", outtmpl)
+        timings.append(time.perf_counter() - start)
+        os.remove(filepath)
+    backend.close()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=20, help="downloads per backend")
+    parser.add_argument("--seconds", type=int, default=5, help="fixture clip length")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="ytdlp_bench_")
+    serve_dir = os.path.join(work_dir, "serve")
+    out_dir = os.path.join(work_dir, "out")
+    os.makedirs(serve_dir)
+    os.makedirs(out_dir)
+    make_fixture(os.path.join(serve_dir, "fixture.mp4"), args.seconds)
+
+    server = QuietServer(("127.0.0.1", 0), partial(FixtureHandler, directory=serve_dir))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        print(f"Fixture: {os.path.getsize(os.path.join(serve_dir, 'fixture.mp4'))} bytes, "
+              f"{args.urls} URLs per backend")
+        for backend in (SubprocessBackend(), InProcessBackend()):
+            timings = run_backend(backend, base_url, out_dir, args.urls)
+            total = sum(timings)
+            print(f"{backend.name:>10}: total {total:7.2f}s  "
+                  f"per-URL mean {total / len(timings) * 1000:7.1f} ms  "
+                  f"first {timings[0] * 1000:7.1f} ms  "
+                  f"rest {sum(timings[1:]) / max(len(timings) - 1, 1) * 1000:7.1f} ms")
+    finally:
+        server.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
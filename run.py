@@ -1,16 +1,36 @@
 import os
 import json
+import time
 import shutil
+import threading
 from datetime import datetime
+from scripts import ffmpeg_progress
 from scripts.editor import resize_videos
 from scripts.openai_helper import process_videos
 from scripts.tiktok_scraper import TikTokScraper
-from uploader import upload_to_youtube
+from scripts.manifest import VideoManifest, atomic_write_json
+from uploader import DEFERRED_DIR, defer_unfinished_uploads, upload_to_youtube
 
 STATUS_FILE = "pipeline_status.json"
+# Which pipeline step each ffmpeg_progress stage belongs to
+PROGRESS_STEPS = {'resize': 'step2_resize', 'audio': 'step3_metadata'}
+# Minimum seconds between progress writes to the status file
+PROGRESS_WRITE_INTERVAL = float(os.getenv("PROGRESS_WRITE_INTERVAL", "1"))
 
-def update_status(step_key, status, message="", count=None):
-    """Update pipeline status for UI."""
+# ffmpeg jobs report progress from worker threads
+_status_lock = threading.RLock()
+_last_progress_write = {}
+
+def write_status(data):
+    """Write the status file atomically so the dashboard never reads half a file."""
+    atomic_write_json(STATUS_FILE, data)
+
+def update_status(step_key, status, message="", count=None, progress=None):
+    """Update pipeline status for UI. progress is a list of per-file ffmpeg metrics."""
+    with _status_lock:
+        _update_status(step_key, status, message, count, progress)
+
+def _update_status(step_key, status, message, count, progress):
     try:
         with open(STATUS_FILE, 'r') as f:
             data = json.load(f)
@@ -38,9 +58,35 @@ def update_status(step_key, status, message="", count=None):
         data[step_key]['message'] = message
         if count is not None:
             data[step_key]['count'] = count
+        if progress is not None:
+            data[step_key]['progress'] = progress
             
-    with open(STATUS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    write_status(data)
+
+def update_progress(step_key, progress):
+    """Replace a step's per-file progress without touching its status or message."""
+    with _status_lock:
+        try:
+            with open(STATUS_FILE, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if step_key in data:
+            data[step_key]['progress'] = progress
+            write_status(data)
+
+def publish_progress(job):
+    """ffmpeg_progress listener: mirror per-file metrics into the status file, throttled."""
+    step_key = PROGRESS_STEPS.get(job['stage'])
+    if step_key is None:
+        return
+    now = time.time()
+    with _status_lock:
+        # Always write when a job finishes so the final numbers aren't lost to the throttle
+        if job['status'] == 'running' and now - _last_progress_write.get(step_key, 0) < PROGRESS_WRITE_INTERVAL:
+            return
+        _last_progress_write[step_key] = now
+        update_progress(step_key, ffmpeg_progress.snapshot(job['stage']))
 
 def clear_workspace():
     """Cleans up directories and data files from previous runs."""
@@ -60,6 +106,9 @@ def clear_workspace():
     with open(STATUS_FILE, 'w') as f:
         json.dump(status, f, indent=2)
 
+    # Uploads cut off mid-way move to videos/deferred to be resumed, not deleted
+    defer_unfinished_uploads()
+
     # Directories to clear
     video_dirs = ['videos/raw_videos', 'videos/edited', 'videos/final']
     for directory in video_dirs:
@@ -81,30 +130,48 @@ def main():
     failed_step = None
     try:
         clear_workspace()
+        ffmpeg_progress.add_listener(publish_progress)
 
         # Step 1: Download Videos
         update_status('step1_download', 'processing', 'Downloading new videos...')
         scraper = TikTokScraper()
         downloaded_count = scraper.scrape_and_download()
         
-        if downloaded_count == 0:
+        # Videos deferred by an earlier run (quota, transient errors) are uploaded
+        # even when nothing new came in
+        deferred_count = len(VideoManifest(DEFERRED_DIR).entries())
+        if downloaded_count == 0 and deferred_count == 0:
             message = "No new videos found. Add URLs to scripts/tiktok_scraper.py"
             print(f"⚠️ {message}")
             update_status('step1_download', 'error', message)
             # Since this is a critical error, we can stop the pipeline
             raise Exception("No new videos to process.")
         
-        update_status('step1_download', 'success', f'Downloaded {downloaded_count} new videos!', count=downloaded_count)
+        if downloaded_count == 0:
+            message = f'No new videos; uploading {deferred_count} deferred videos.'
+            print(f"⚠️ {message}")
+            update_status('step1_download', 'success', message)
+            update_status('step2_resize', 'success', 'Skipped: no new videos.')
+            update_status('step3_metadata', 'success', 'Skipped: no new videos.')
+        else:
+            update_status('step1_download', 'success', f'Downloaded {downloaded_count} new videos!', count=downloaded_count)
 
-        # Step 2: Resize Videos
-        update_status('step2_resize', 'processing', 'Resizing videos for YouTube Shorts...')
-        resize_videos()
-        update_status('step2_resize', 'success', 'Videos resized successfully.')
+            # Step 2: Resize Videos
+            update_status('step2_resize', 'processing', 'Resizing videos for YouTube Shorts...')
+            resize_results = resize_videos()
+            resized_count = sum(1 for r in resize_results if r['ok'])
+            failed = [r['video_id'] for r in resize_results if not r['ok']]
+            cache_hits = sum(1 for r in resize_results if r.get('cached'))
+            message = f'Resized {resized_count} videos ({cache_hits} from cache).'
+            if failed:
+                message += f" Failed: {', '.join(failed)}"
+            update_status('step2_resize', 'success', message, count=resized_count,
+                          progress=ffmpeg_progress.snapshot('resize'))
 
-        # Step 3: Generate Metadata
-        update_status('step3_metadata', 'processing', 'Generating metadata (transcripts, titles)...')
-        process_videos()
-        update_status('step3_metadata', 'success', 'Metadata generated successfully.')
+            # Step 3: Generate Metadata
+            update_status('step3_metadata', 'processing', 'Generating metadata (transcripts, titles)...')
+            process_videos()
+            update_status('step3_metadata', 'success', 'Metadata generated successfully.')
 
         # Step 4: Upload to YouTube
         update_status('step4_upload', 'processing', 'Uploading videos to YouTube...')
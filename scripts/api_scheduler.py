@@ -0,0 +1,233 @@
+import os
+import sys
+import time
+import random
+import asyncio
+import threading
+
+# ----- Settings --------------------------------------------------------------
+# Per-endpoint limits: requests/minute, tokens/minute (0 = unlimited) and
+# calls in flight. Set them a little under the account's published limits
+API_LIMITS = {
+    "whisper": {
+        "rpm": int(os.getenv("WHISPER_RPM", "50")),
+        "tpm": 0,
+        "concurrency": int(os.getenv("WHISPER_MAX_IN_FLIGHT", "4")),
+    },
+    "chat": {
+        "rpm": int(os.getenv("CHAT_RPM", "500")),
+        "tpm": int(os.getenv("CHAT_TPM", "200000")),
+        "concurrency": int(os.getenv("CHAT_MAX_IN_FLIGHT", "8")),
+    },
+    "youtube": {
+        "rpm": int(os.getenv("YOUTUBE_RPM", "30")),
+        "tpm": 0,
+        "concurrency": int(os.getenv("YOUTUBE_MAX_IN_FLIGHT", "2")),
+    },
+    # Resumable uploads, chunk by chunk: bandwidth-bound, so no rate limit here. The first
+    # chunk opens the videos.insert session; scripts.upload_queue budgets those against the daily quota
+    "youtube_upload": {"rpm": 0, "tpm": 0, "concurrency": 0},
+}
+# Retries after the first attempt, for 429s, 5xx and connection errors
+API_MAX_RETRIES = int(os.getenv("API_MAX_RETRIES", "5"))
+# Exponential backoff: a random delay in [0, base * 2^attempt], capped
+API_BACKOFF_BASE = float(os.getenv("API_BACKOFF_BASE", "1.0"))
+API_BACKOFF_MAX = float(os.getenv("API_BACKOFF_MAX", "60"))
+# A bucket holds this many seconds' worth of its per-minute limit: providers
+# enforce limits over short windows, so a burst can't spend the whole minute
+BURST_SECONDS = 1
+
+RETRY_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at per_minute / 60 per second."""
+
+    def __init__(self, per_minute, burst_seconds=BURST_SECONDS):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Take amount now, going into debt if needed. Returns the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            self.level -= amount
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+def error_status(error):
+    """HTTP status of an OpenAI or Google API error, or None."""
+    status = getattr(error, "status_code", None)  # openai.APIStatusError
+    if status is None:
+        status = getattr(getattr(error, "resp", None), "status", None)  # googleapiclient HttpError
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after(error):
+    """Seconds from a Retry-After (or retry-after-ms) header on the error's response, or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None)  # openai
+    if headers is None:
+        headers = getattr(error, "resp", None)  # googleapiclient: httplib2 response is a dict
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers.get("retry-after-ms")) / 1000
+        if headers.get("retry-after"):
+            return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        pass  # HTTP-date form: fall back to backoff
+    return None
+
+
+def is_retryable(error):
+    status = error_status(error)
+    if status is not None:
+        # A 429 for an exhausted quota won't clear by waiting
+        return status in RETRY_STATUSES and "insufficient_quota" not in str(error)
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    openai = sys.modules.get("openai")  # only check if a caller already imported it
+    return openai is not None and isinstance(error, openai.APIConnectionError)
+
+
+class Endpoint:
+    def __init__(self, name, rpm=0, tpm=0, concurrency=0):
+        self.name = name
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = concurrency or 1_000_000
+        self.slots = threading.BoundedSemaphore(self.concurrency)
+        self.async_slots = {}  # event loop -> asyncio.Semaphore
+        self.cooldown_until = 0.0
+        self.counters = {"calls": 0, "throttled": 0, "retried": 0, "failed": 0, "waited": 0.0}
+
+    def admit_delay(self, tokens):
+        """Seconds to wait before the next request: rate limits plus any server-requested cool-down."""
+        wait = max(0.0, self.cooldown_until - time.monotonic())
+        if self.requests:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+
+class ApiScheduler:
+    """Central gate for outbound API calls (OpenAI, YouTube).
+
+    Every call goes through its endpoint's request- and token-per-minute
+    buckets and concurrency cap. Transient failures (429, 5xx, connection
+    errors) are retried with jittered exponential backoff; a Retry-After
+    from the server is honoured and also pauses every other call to that
+    endpoint. Anything else, or the last failed retry, is re-raised to the
+    caller. call() is for threads, acall() for coroutines.
+    """
+
+    def __init__(self, limits=None, max_retries=None, backoff_base=None, backoff_max=None):
+        self.endpoints = {name: Endpoint(name, **spec) for name, spec in (API_LIMITS if limits is None else limits).items()}
+        self.max_retries = API_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base or API_BACKOFF_BASE
+        self.backoff_max = backoff_max or API_BACKOFF_MAX
+        self._lock = threading.Lock()
+
+    def _endpoint(self, name):
+        with self._lock:
+            if name not in self.endpoints:
+                self.endpoints[name] = Endpoint(name)
+            return self.endpoints[name]
+
+    def _count(self, endpoint, key, amount=1):
+        with self._lock:
+            endpoint.counters[key] += amount
+
+    def _admit(self, endpoint, tokens):
+        wait = endpoint.admit_delay(tokens)
+        if wait > 0:
+            self._count(endpoint, "throttled")
+            self._count(endpoint, "waited", wait)
+        return wait
+
+    def _retry_delay(self, endpoint, error, attempt):
+        """Seconds to back off before retry number attempt + 1, or None to give up."""
+        if attempt >= self.max_retries or not is_retryable(error):
+            self._count(endpoint, "failed")
+            return None
+        self._count(endpoint, "retried")
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        server_delay = retry_after(error)
+        if server_delay is not None:
+            delay = server_delay + random.uniform(0, self.backoff_base)
+        if server_delay is not None or error_status(error) == 429:
+            self._count(endpoint, "throttled")
+            with self._lock:
+                endpoint.cooldown_until = max(endpoint.cooldown_until, time.monotonic() + delay)
+        print(f"🔁 {endpoint.name}: {type(error).__name__} ({error_status(error) or 'no status'}), "
+              f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def call(self, endpoint_name, func, *args, tokens=0, **kwargs):
+        """Run func(*args, **kwargs) under the endpoint's limits, retrying transient errors."""
+        endpoint = self._endpoint(endpoint_name)
+        self._count(endpoint, "calls")
+        attempt = 0
+        while True:
+            with endpoint.slots:
+                time.sleep(self._admit(endpoint, tokens))
+                try:
+                    return func(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(endpoint, e, attempt)
+                    if delay is None:
+                        raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, endpoint_name, func, *args, tokens=0, **kwargs):
+        """Async call(): awaits func(*args, **kwargs) under the same limits and retries."""
+        endpoint = self._endpoint(endpoint_name)
+        self._count(endpoint, "calls")
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            slots = endpoint.async_slots.setdefault(loop, asyncio.Semaphore(endpoint.concurrency))
+        attempt = 0
+        while True:
+            async with slots:
+                await asyncio.sleep(self._admit(endpoint, tokens))
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    delay = self._retry_delay(endpoint, e, attempt)
+                    if delay is None:
+                        raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self):
+        with self._lock:
+            return {name: dict(e.counters) for name, e in self.endpoints.items() if e.counters["calls"]}
+
+    def report(self):
+        for name, c in self.stats().items():
+            print(f"📡 {name}: {c['calls']} calls, {c['throttled']} throttled ({c['waited']:.1f}s waiting), "
+                  f"{c['retried']} retried, {c['failed']} failed")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide ApiScheduler shared by openai_helper, the metadata engine and the uploader."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ApiScheduler()
+        return _scheduler
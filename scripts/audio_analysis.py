@@ -0,0 +1,115 @@
+import os
+import wave
+
+import numpy as np
+
+# ----- Settings --------------------------------------------------------------
+VAD_ENABLED = os.getenv("VAD_ENABLED", "1") == "1"
+FRAME_MS = 30
+# Frames below this level are silence; clips whose loudest frames stay below it are silent
+SILENCE_DBFS = float(os.getenv("VAD_SILENCE_DBFS", "-45"))
+# Speech rises and falls with syllables and stops between phrases, so its
+# frame energy swings widely; sustained music is much steadier. Speech mixed
+# over a music bed swings less, but its zero-crossing rate still jumps
+# between voiced and unvoiced sounds. Percussion also moves the ZCR, so that
+# only counts together with some energy swing. Borderline clips go to
+# Whisper: a wasted call is cheaper than a lost transcript
+SPEECH_MIN_ENERGY_SPREAD_DB = float(os.getenv("VAD_MIN_ENERGY_SPREAD_DB", "7"))
+MIXED_MIN_ENERGY_SPREAD_DB = 3
+SPEECH_MIN_ZCR_SPREAD = float(os.getenv("VAD_MIN_ZCR_SPREAD", "0.04"))
+SPEECH_MIN_ACTIVE = 0.1  # share of frames that must be audible
+# Silence kept around the trimmed speech, so first/last words aren't clipped
+TRIM_PAD_SECONDS = 0.3
+# Only write a trimmed copy when it saves at least this much audio
+MIN_TRIM_SECONDS = 1.0
+
+SILENT = "silent"
+MUSIC = "music"
+SPEECH = "speech"
+
+
+def read_wav(path):
+    """(samples as float32 in [-1, 1], sample rate) for a 16-bit PCM WAV, mixed down to mono."""
+    with wave.open(path, "rb") as f:
+        rate, channels, width = f.getframerate(), f.getnchannels(), f.getsampwidth()
+        raw = f.readframes(f.getnframes())
+    if width != 2:
+        raise ValueError(f"expected 16-bit PCM, got {8 * width}-bit")
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, rate
+
+
+def frame_features(samples, rate, frame_ms=FRAME_MS):
+    """Per-frame RMS level (dBFS) and zero-crossing rate, computed over non-overlapping frames."""
+    size = max(1, int(rate * frame_ms / 1000))
+    count = len(samples) // size
+    if count == 0:
+        return np.empty(0), np.empty(0)
+    frames = samples[:count * size].reshape(count, size)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    level = 20 * np.log10(np.maximum(rms, 1e-6))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / size
+    return level, zcr
+
+
+def analyze_audio(samples, rate):
+    """Classify a clip as silent, music or speech and find where its active audio starts and ends.
+
+    Returns a dict with the verdict, the metrics behind it and the active
+    span in seconds (start, end), padded by TRIM_PAD_SECONDS.
+    """
+    level, zcr = frame_features(samples, rate)
+    duration = len(samples) / rate if rate else 0
+    result = {"verdict": SILENT, "duration": round(duration, 2), "start": 0.0, "end": round(duration, 2),
+              "peak_dbfs": None, "active_share": 0.0, "energy_spread_db": 0.0, "zcr_spread": 0.0}
+    if level.size == 0:
+        return result
+
+    peak = float(np.percentile(level, 95))
+    active = level > SILENCE_DBFS
+    result["peak_dbfs"] = round(peak, 1)
+    result["active_share"] = round(float(active.mean()), 3)
+    if peak < SILENCE_DBFS or not active.any():
+        return result
+
+    # Spread of loudness over the whole clip (syllables and pauses vs a steady bed)
+    spread = float(np.percentile(level, 90) - np.percentile(level, 10))
+    zcr_spread = float(np.std(zcr[active]))
+    result["energy_spread_db"] = round(spread, 1)
+    result["zcr_spread"] = round(zcr_spread, 3)
+
+    frame_seconds = FRAME_MS / 1000
+    indices = np.flatnonzero(active)
+    result["start"] = round(max(0.0, indices[0] * frame_seconds - TRIM_PAD_SECONDS), 2)
+    result["end"] = round(min(duration, (indices[-1] + 1) * frame_seconds + TRIM_PAD_SECONDS), 2)
+
+    is_speech = result["active_share"] >= SPEECH_MIN_ACTIVE and (
+        spread >= SPEECH_MIN_ENERGY_SPREAD_DB
+        or (spread >= MIXED_MIN_ENERGY_SPREAD_DB and zcr_spread >= SPEECH_MIN_ZCR_SPREAD))
+    result["verdict"] = SPEECH if is_speech else MUSIC
+    return result
+
+
+def analyze_wav(path):
+    """analyze_audio for a WAV file, or None if it can't be read (caller should just transcribe)."""
+    try:
+        samples, rate = read_wav(path)
+    except (OSError, EOFError, ValueError, wave.Error):
+        return None
+    return analyze_audio(samples, rate)
+
+
+def write_trimmed(path, output_path, start, end):
+    """Copy the [start, end) seconds of a WAV to output_path, keeping its format."""
+    with wave.open(path, "rb") as src:
+        params = src.getparams()
+        frame_bytes = params.sampwidth * params.nchannels
+        src.setpos(int(start * params.framerate))
+        raw = src.readframes(int((end - start) * params.framerate))
+    with wave.open(output_path, "wb") as dst:
+        dst.setparams(params)
+        dst.writeframes(raw[:len(raw) - len(raw) % frame_bytes])
+    return output_path
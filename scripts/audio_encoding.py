@@ -0,0 +1,117 @@
+import os
+import shutil
+import subprocess
+import wave
+
+# ----- Settings --------------------------------------------------------------
+# Format the transcription path uploads to Whisper: mp3, opus (Ogg/Opus) or wav.
+# Step 3 still extracts 16 kHz mono WAV locally (VAD and trimming need PCM);
+# only what crosses the network is compressed. Opus is ~30% smaller than MP3
+# but several times slower to encode, so MP3 is the default
+UPLOAD_AUDIO_FORMAT = os.getenv("UPLOAD_AUDIO_FORMAT", "mp3")
+# Format of the audio kept in videos/processed/audio
+ARCHIVE_AUDIO_FORMAT = os.getenv("ARCHIVE_AUDIO_FORMAT", UPLOAD_AUDIO_FORMAT)
+# 16 kHz mono speech stays intelligible to Whisper well below these
+OPUS_BITRATE = os.getenv("OPUS_BITRATE", "24k")
+MP3_BITRATE = os.getenv("MP3_BITRATE", "32k")
+# Whisper rejects files over 25 MB; split below that, with room for container overhead
+MAX_UPLOAD_BYTES = int(float(os.getenv("WHISPER_MAX_UPLOAD_MB", "24")) * 1024 * 1024)
+
+AUDIO_FORMATS = {
+    "opus": {"ext": ".ogg", "args": ["-c:a", "libopus", "-b:a", OPUS_BITRATE, "-application", "voip",
+                      "-compression_level", "5"]},
+    "mp3": {"ext": ".mp3", "args": ["-c:a", "libmp3lame", "-b:a", MP3_BITRATE]},
+    "wav": {"ext": ".wav", "args": ["-c:a", "pcm_s16le"]},
+}
+
+
+def _ffmpeg(cmd):
+    """Run a short ffmpeg job quietly. Returns True on success."""
+    proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["no output"]
+        print(f"❌ ffmpeg failed ({proc.returncode}): {tail[0]}")
+    return proc.returncode == 0
+
+
+def wav_duration(path):
+    """Length of a WAV in seconds, or None if it can't be read."""
+    try:
+        with wave.open(path, "rb") as f:
+            return f.getnframes() / f.getframerate()
+    except (OSError, EOFError, wave.Error):
+        return None
+
+
+def encode_audio(wav_path, output_path, fmt):
+    """Encode a WAV as 16 kHz mono in fmt. Returns True on success."""
+    return _ffmpeg(["ffmpeg", "-hide_banner", "-nostats", "-i", wav_path, "-vn", "-ac", "1", "-ar", "16000",
+                    *AUDIO_FORMATS[fmt]["args"], "-y", output_path])
+
+
+def split_audio(path, chunk_seconds):
+    """Cut an encoded file into chunk_seconds-long pieces without re-encoding. Returns their paths."""
+    base, ext = os.path.splitext(path)
+    pattern = f"{base}.part%03d{ext}"
+    if not _ffmpeg(["ffmpeg", "-hide_banner", "-nostats", "-i", path, "-f", "segment",
+                    "-segment_time", f"{chunk_seconds:.2f}", "-c", "copy", "-y", pattern]):
+        return []
+    parts = []
+    while os.path.exists(pattern % len(parts)):
+        parts.append(pattern % len(parts))
+    return parts
+
+
+def upload_chunks(wav_path, fmt=None, max_bytes=None):
+    """Files to send to Whisper for wav_path: one compact file, or several if it is over max_bytes.
+
+    Encoded files are written next to wav_path; pass the result to
+    discard_chunks() when done. If encoding fails the WAV itself is sent.
+    """
+    fmt = fmt or UPLOAD_AUDIO_FORMAT
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    path = wav_path
+    if fmt != "wav":
+        path = os.path.splitext(wav_path)[0] + ".upload" + AUDIO_FORMATS[fmt]["ext"]
+        if not encode_audio(wav_path, path, fmt):
+            path = wav_path
+    size = os.path.getsize(path)
+    duration = wav_duration(wav_path)
+    if size <= max_bytes or not duration:
+        return [path]
+
+    # Splits fall on time, not bytes: aim 10% under the limit so VBR pieces fit
+    chunk_seconds = duration * max_bytes / size * 0.9
+    if path == wav_path:
+        wav_copy = os.path.splitext(wav_path)[0] + ".upload.wav"
+        shutil.copyfile(wav_path, wav_copy)
+        path = wav_copy
+    parts = split_audio(path, chunk_seconds)
+    if not parts:
+        return [path]
+    os.remove(path)
+    return parts
+
+
+def discard_chunks(wav_path, chunks):
+    for chunk in chunks:
+        if chunk != wav_path and os.path.exists(chunk):
+            os.remove(chunk)
+
+
+def archive_audio(wav_path, archive_dir, fmt=None):
+    """Move a processed WAV into archive_dir, encoded in ARCHIVE_AUDIO_FORMAT. Returns the archived path."""
+    fmt = fmt or ARCHIVE_AUDIO_FORMAT
+    base = os.path.splitext(os.path.basename(wav_path))[0]
+    archived_path = os.path.join(archive_dir, base + AUDIO_FORMATS[fmt]["ext"])
+    if os.path.abspath(wav_path) == os.path.abspath(archived_path):
+        return archived_path
+    if fmt == "wav":
+        shutil.move(wav_path, archived_path)
+    elif encode_audio(wav_path, archived_path, fmt):
+        os.remove(wav_path)
+    else:
+        archived_path = os.path.join(archive_dir, os.path.basename(wav_path))
+        if os.path.abspath(wav_path) != os.path.abspath(archived_path):
+            shutil.move(wav_path, archived_path)
+    return archived_path
@@ -1,50 +1,299 @@
 import os
 import json
+import time
+import argparse
 import requests
 import hashlib
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from scripts.manifest import VideoManifest, atomic_write
 
 # Paths
 RAW_JSON_FILE = os.path.join("videos", "raw", "dataset_free-tiktok-scraper_2025-04-22_16-51-02-017.json")
 DOWNLOAD_DIR = os.path.join("videos", "raw_videos")
-os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+CACHE_DIR = os.path.join("videos", "raw", ".cache")
 
-# Load the JSON data
-with open(RAW_JSON_FILE, "r") as f:
-    data = json.load(f)
+# Filters
+MIN_DIGGS = 100
+MIN_PLAYS = 1000
 
-# Filter videos and collect URLs
-filtered_videos = []
-for item in data:
-    digg_count = item.get("diggCount", 0)
-    play_count = item.get("playCount", 0)
-    media_urls = item.get("mediaUrls", [])
+# Bump when the projected columns change so stale caches are ignored
+CACHE_VERSION = 1
+READ_CHUNK_SIZE = 1024 * 1024
 
-    if (
-        media_urls and
-        digg_count > 100 and
-        play_count > 1000
-    ):
-        filtered_videos.append(media_urls[0])  # Use first media URL
+# Download engine
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOADER_WORKERS", "4"))
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOADER_CHUNK_SIZE", str(256 * 1024)))
+WRITE_BUFFER_SIZE = int(os.getenv("DOWNLOADER_WRITE_BUFFER", str(4 * 1024 * 1024)))
+MAX_ATTEMPTS = int(os.getenv("DOWNLOADER_MAX_ATTEMPTS", "5"))
+REQUEST_TIMEOUT = (10, 60)  # connect, read
+
+
+def iter_items(path, chunk_size=READ_CHUNK_SIZE):
+    """Yield the items of a JSON array export one at a time.
+
+    Reads the file in fixed-size chunks and decodes one item at a time, so
+    memory stays bounded by the chunk size plus the largest single item.
+    Newline-delimited exports (no surrounding brackets) work too.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer = f.read(chunk_size)
+        pos = 0
+        eof = not buffer
+
+        def skip(pos, chars):
+            while pos < len(buffer) and buffer[pos] in chars:
+                pos += 1
+            return pos
+
+        pos = skip(pos, " \t\r\n")
+        if buffer[pos:pos + 1] == "[":
+            pos += 1
+
+        while True:
+            pos = skip(pos, " \t\r\n,")
+            if pos >= len(buffer) and not eof:
+                buffer, pos = buffer[pos:] + f.read(chunk_size), 0
+                eof = pos >= len(buffer)
+                continue
+            if pos >= len(buffer) or buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Item straddles the chunk boundary: drop what we've consumed and read more
+                more = f.read(chunk_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+            yield item
+            pos = end
+
+
+class Columns:
+    """Projection of an export onto the fields the filters need."""
+
+    def __init__(self, digg, play, url_offsets, url_blob):
+        self.digg = digg
+        self.play = play
+        self.url_offsets = url_offsets  # url i is url_blob[url_offsets[i]:url_offsets[i + 1]]
+        self.url_blob = url_blob
+
+    def __len__(self):
+        return len(self.digg)
+
+    @property
+    def has_media(self):
+        return np.diff(self.url_offsets) > 0
+
+    def url(self, i):
+        return bytes(self.url_blob[self.url_offsets[i]:self.url_offsets[i + 1]]).decode("utf-8")
+
+    @classmethod
+    def from_items(cls, items):
+        digg, play = array("q"), array("q")
+        offsets = array("q", [0])
+        blob = bytearray()
+        for item in items:
+            digg.append(int(item.get("diggCount") or 0))
+            play.append(int(item.get("playCount") or 0))
+            media_urls = item.get("mediaUrls") or []
+            if media_urls:
+                blob += media_urls[0].encode("utf-8")  # Use first media URL
+            offsets.append(len(blob))
+        return cls(
+            np.frombuffer(digg, dtype=np.int64),
+            np.frombuffer(play, dtype=np.int64),
+            np.frombuffer(offsets, dtype=np.int64),
+            np.frombuffer(bytes(blob), dtype=np.uint8),
+        )
+
+    def save(self, path):
+        atomic_write(path, lambda f: np.savez(f, digg=self.digg, play=self.play,
+                                              url_offsets=self.url_offsets, url_blob=self.url_blob), mode="wb")
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data["digg"], data["play"], data["url_offsets"], data["url_blob"])
+
+
+def cache_path_for(path, cache_dir=CACHE_DIR):
+    """Cache file name tied to the export's path, size and mtime."""
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}:{CACHE_VERSION}"
+    return os.path.join(cache_dir, hashlib.md5(key.encode()).hexdigest() + ".npz")
+
+
+def load_columns(path, use_cache=True, cache_dir=CACHE_DIR):
+    """Columnar projection of an export, reusing the on-disk cache when it's fresh."""
+    cache_path = cache_path_for(path, cache_dir)
+    if use_cache and os.path.exists(cache_path):
+        return Columns.load(cache_path)
+
+    columns = Columns.from_items(iter_items(path))
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        columns.save(cache_path)
+    return columns
+
+
+def select_videos(columns, min_diggs=MIN_DIGGS, min_plays=MIN_PLAYS, top_k=None):
+    """Media URLs passing the engagement filters.
+
+    With top_k, returns the k items with the best digg/play ratio, best first;
+    otherwise every match in export order.
+    """
+    mask = columns.has_media & (columns.digg > min_diggs) & (columns.play > min_plays)
+    indices = np.flatnonzero(mask)
+
+    if top_k is not None and len(indices):
+        ratio = columns.digg[indices] / np.maximum(columns.play[indices], 1)
+        k = min(top_k, len(indices))
+        best = np.argpartition(-ratio, k - 1)[:k]
+        indices = indices[best[np.argsort(-ratio[best], kind="stable")]]
+
+    return [columns.url(i) for i in indices]
+
+
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=DOWNLOAD_WORKERS):
+    """Shared requests session with a connection pool sized for the largest worker count asked for so far."""
+    global _session, _session_pool_size
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _session_pool_size:
+            # A bigger pool replaces the adapter; requests already in flight finish on the old one
+            retry = Retry(total=3, connect=3, backoff_factor=0.5,
+                          status_forcelist=(429, 500, 502, 503, 504), allowed_methods=("GET", "HEAD"))
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session_pool_size = pool_size
+        return _session
+
+
+def fetch_to_file(url, filepath, session=None, chunk_size=DOWNLOAD_CHUNK_SIZE,
+                  write_buffer=WRITE_BUFFER_SIZE, max_attempts=MAX_ATTEMPTS):
+    """Download url to filepath via a .part file, resuming with Range after drops.
+
+    The final path only appears (atomically renamed) once the whole body has
+    arrived, so later stages never see a truncated video. A .part left by an
+    earlier run is resumed rather than started over. Returns bytes received.
+    """
+    session = session or get_session()
+    part_path = filepath + ".part"
+    received = 0
+
+    for attempt in range(1, max_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        try:
+            with session.get(url, stream=True, headers=headers, timeout=REQUEST_TIMEOUT) as response:
+                if response.status_code == 416 and offset:
+                    # .part already holds the whole body
+                    break
+                response.raise_for_status()
+
+                content_range = response.headers.get("Content-Range", "")
+                if offset and (response.status_code != 206
+                               or not content_range.startswith(f"bytes {offset}-")):
+                    offset = 0  # server ignored the Range header, start over
+                expected = response.headers.get("Content-Length")
+                expected = offset + int(expected) if expected is not None else None
+
+                with open(part_path, "ab" if offset else "wb", buffering=write_buffer) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+                        received += len(chunk)
+
+            if expected is not None and os.path.getsize(part_path) < expected:
+                raise requests.exceptions.ChunkedEncodingError("connection closed before the body ended")
+            break
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.ChunkedEncodingError,
+                requests.exceptions.Timeout) as e:
+            if attempt == max_attempts:
+                raise
+            print(f"↻ {os.path.basename(filepath)}: {e.__class__.__name__}, resuming (attempt {attempt + 1})")
+            made_progress = os.path.exists(part_path) and os.path.getsize(part_path) > offset
+            if not made_progress:
+                time.sleep(min(2 ** attempt * 0.25, 5))
+
+    os.replace(part_path, filepath)
+    return received
+
+
+# One instance (one lock) for every download_all worker appending to the manifest
+download_manifest = VideoManifest(DOWNLOAD_DIR)
 
-print(f"Found {len(filtered_videos)} videos to download.\n")
 
 # Download videos
-def download_video(url, index):
+def download_video(url, index, session=None):
     filename = hashlib.md5(url.encode()).hexdigest() + ".mp4"
     filepath = os.path.join(DOWNLOAD_DIR, filename)
 
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-
-        with open(filepath, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-
+        fetch_to_file(url, filepath, session=session)
+        download_manifest.record(os.path.splitext(filename)[0], filepath, source_url=url)
         print(f"[{index + 1}] Downloaded: {filename}")
+        return filepath
     except Exception as e:
         print(f"[{index + 1}] Failed: {e}")
+        return None
+
+
+def download_all(urls, workers=DOWNLOAD_WORKERS):
+    """Download urls concurrently over one pooled session. Returns the saved paths in order."""
+    os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+    session = get_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(download_video, url, idx, session) for idx, url in enumerate(urls)]
+        return [future.result() for future in futures]
+
+
+def download_filtered(path=RAW_JSON_FILE, min_diggs=MIN_DIGGS, min_plays=MIN_PLAYS,
+                      top_k=None, use_cache=True, dry_run=False, workers=DOWNLOAD_WORKERS):
+    """Filter an Apify export and download the selected videos. Returns the URLs."""
+    columns = load_columns(path, use_cache=use_cache)
+    filtered_videos = select_videos(columns, min_diggs, min_plays, top_k)
+    print(f"Found {len(filtered_videos)} videos to download.\n")
+
+    if dry_run:
+        for url in filtered_videos:
+            print(url)
+        return filtered_videos
+
+    download_all(filtered_videos, workers=workers)
+    return filtered_videos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download high-engagement videos from an Apify TikTok export.")
+    parser.add_argument("input", nargs="?", default=RAW_JSON_FILE, help="path to the dataset JSON")
+    parser.add_argument("--min-diggs", type=int, default=MIN_DIGGS)
+    parser.add_argument("--min-plays", type=int, default=MIN_PLAYS)
+    parser.add_argument("--top-k", type=int, default=None, help="keep only the k best digg/play ratios")
+    parser.add_argument("--no-cache", action="store_true", help="re-parse the export even if cached")
+    parser.add_argument("--dry-run", action="store_true", help="list the URLs without downloading")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="concurrent downloads")
+    args = parser.parse_args(argv)
+
+    download_filtered(args.input, args.min_diggs, args.min_plays, args.top_k,
+                      use_cache=not args.no_cache, dry_run=args.dry_run, workers=args.workers)
+
 
-# Loop through and download
-for idx, url in enumerate(filtered_videos):
-    download_video(url, idx)
+if __name__ == "__main__":
+    main()
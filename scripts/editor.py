@@ -1,9 +1,191 @@
 
 import os
+import time
 import shutil
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from scripts import ffmpeg_progress
+from scripts.manifest import VideoManifest
+from scripts.probe import COPY, FULL, VIDEO, classify, probe_video
+from scripts.transcode_cache import TranscodeCache
 
-def resize_videos():
+# ----- Transcode scheduling --------------------------------------------------
+# Total CPU threads ffmpeg may use across all parallel jobs
+TRANSCODE_CPU_BUDGET = int(os.getenv("TRANSCODE_CPU_BUDGET", str(os.cpu_count() or 1)))
+# Parallel ffmpeg jobs (0 = derive from the CPU budget)
+TRANSCODE_JOBS = int(os.getenv("TRANSCODE_JOBS", "0"))
+# libx264 gains little past a handful of threads at 720x1280, so auto mode
+# prefers more jobs with fewer threads each
+THREADS_PER_JOB_TARGET = 4
+
+# ----- Fused media pass ------------------------------------------------------
+# One ffmpeg run produces the Shorts output and the 16 kHz mono WAV for Whisper,
+# plus, when the video is re-encoded (decoded anyway), the sparse grayscale
+# frames for OCR, so step 3 doesn't decode the video again
+FUSED_MEDIA_PASS = os.getenv("FUSED_MEDIA_PASS", "1") == "1"
+OCR_FRAME_INTERVAL = float(os.getenv("OCR_FRAME_INTERVAL", "2"))  # seconds between OCR frames
+PROCESSED_AUDIO_DIR = os.path.join("videos", "processed", "audio")
+FRAMES_DIR = os.path.join("videos", "processed", "frames")
+
+# Reuse earlier encodes of the same input bytes + ffmpeg arguments
+TRANSCODE_CACHE = os.getenv("TRANSCODE_CACHE", "1") == "1"
+
+
+def plan_jobs(cpu_budget=None, jobs=None):
+    """Split the CPU budget into (parallel jobs, ffmpeg -threads per job)."""
+    cpu_budget = max(1, cpu_budget or TRANSCODE_CPU_BUDGET)
+    jobs = jobs or TRANSCODE_JOBS or max(1, cpu_budget // THREADS_PER_JOB_TARGET)
+    jobs = max(1, min(jobs, cpu_budget))
+    return jobs, max(1, cpu_budget // jobs)
+
+
+VIDEO_ENCODE_ARGS = [
+    "-c:v", "libx264", "-preset", "fast", "-crf", "23",  # Better compression, fast preset
+    "-pix_fmt", "yuv420p",
+]
+AUDIO_ENCODE_ARGS = ["-c:a", "aac", "-b:a", "128k"]
+
+
+def build_command(input_path, output_path, threads, decision=FULL,
+                  audio_path=None, frames_dir=None, frame_interval=OCR_FRAME_INTERVAL):
+    """ffmpeg command for a transcode decision; compliant streams are copied untouched.
+
+    With audio_path and/or frames_dir the same invocation also writes the
+    16 kHz mono WAV and one grayscale PNG every frame_interval seconds, all
+    from a single read and decode of the source.
+    """
+    reencode_video = decision in (VIDEO, FULL)
+    filters = []
+    video_map = "0:v:0"
+    if frames_dir:
+        ocr_source = "[0:v:0]"
+        if reencode_video:
+            # Sample OCR frames after scaling, i.e. from the same picture step 3 used to decode
+            filters.append("[0:v:0]scale=720:1280,split=2[vout][ocr]")
+            video_map, ocr_source = "[vout]", "[ocr]"
+        filters.append(f"{ocr_source}fps=1/{frame_interval:g},format=gray[frames]")
+    elif reencode_video:
+        filters.append("[0:v:0]scale=720:1280[vout]")
+        video_map = "[vout]"
+
+    video_args = VIDEO_ENCODE_ARGS if reencode_video else ["-c:v", "copy"]
+    audio_args = ["-c:a", "copy"] if decision in (COPY, VIDEO) else AUDIO_ENCODE_ARGS
+
+    # Use FFmpeg to resize the video and optimize it
+    command = ["ffmpeg", "-i", input_path]
+    if filters:
+        command += ["-filter_complex", ";".join(filters)]
+    command += [
+        "-map", video_map, "-map", "0:a:0?",
+        *video_args,
+        *audio_args,
+        "-movflags", "+faststart",
+        "-threads", str(threads),
+        "-y", output_path
+    ]
+    if audio_path:
+        command += ["-map", "0:a:0", "-vn", "-ac", "1", "-ar", "16000", "-y", audio_path]
+    if frames_dir:
+        command += ["-map", "[frames]", "-y", os.path.join(frames_dir, "%05d.png")]
+    return command
+
+
+def run_ffmpeg(command, job_id=None, duration=None):
+    """Run ffmpeg, returning (ok, error message with the stderr tail).
+
+    Live frames/fps/speed for the job are published under the "resize" stage
+    of scripts.ffmpeg_progress.
+    """
+    return ffmpeg_progress.run_ffmpeg(command, job_id or command[-1], stage="resize", duration=duration)
+
+
+def cached_run(cache, input_path, input_md5, command, outputs, job_id=None, duration=None):
+    """Restore outputs from the transcode cache, or run ffmpeg and store them.
+
+    outputs maps placeholder names (output/audio/frames) to the paths used in
+    command. Returns (ok, error, cached).
+    """
+    key = None
+    if cache is not None and input_md5:
+        key = cache.key(input_md5, command, {"input": input_path, **outputs})
+        cache_outputs = {name: path for name, path in outputs.items() if path}
+        if cache.restore(key, cache_outputs):
+            return True, None, True
+    ok, error = run_ffmpeg(command, job_id, duration)
+    if ok and key:
+        cache.store(key, {name: path for name, path in outputs.items() if path})
+    return ok, error, False
+
+
+def transcode(input_path, output_path, threads, audio_path=None, frames_dir=None,
+              input_md5=None, cache=None):
+    """Probe, then run one ffmpeg job (or reuse a cached one). Returns a result dict instead of raising."""
+    start = time.perf_counter()
+    probe = probe_video(input_path)
+    decision, reasons = classify(probe)
+
+    # Only ask for a WAV when we know there is an audio track to extract
+    if probe is None or probe["audio"] is None:
+        audio_path = None
+    # OCR frames are only free when the video is decoded anyway; a stream copy
+    # would pay a full decode for frames step 3 only needs when Whisper fails,
+    # and step 3 samples those on demand (scripts.frame_sampler)
+    if decision not in (VIDEO, FULL):
+        frames_dir = None
+    if frames_dir:
+        shutil.rmtree(frames_dir, ignore_errors=True)
+        os.makedirs(frames_dir)
+
+    job_id = os.path.splitext(os.path.basename(output_path))[0]
+    duration = probe["duration"] if probe else None
+    command = build_command(input_path, output_path, threads, decision, audio_path, frames_dir)
+    outputs = {"output": output_path, "audio": audio_path, "frames": frames_dir}
+    ok, error, cached = cached_run(cache, input_path, input_md5, command, outputs, job_id, duration)
+    if not ok and (audio_path or frames_dir):
+        # Fall back to a plain transcode; step 3 will extract audio/frames itself
+        if audio_path and os.path.exists(audio_path):
+            os.remove(audio_path)
+        if frames_dir:
+            shutil.rmtree(frames_dir, ignore_errors=True)
+        audio_path = frames_dir = None
+        command = build_command(input_path, output_path, threads, decision)
+        ok, error, cached = cached_run(cache, input_path, input_md5, command, {"output": output_path},
+                                       job_id, duration)
+
+    result = {
+        "input": input_path,
+        "output": output_path,
+        "ok": ok,
+        "error": error,
+        "decision": decision,
+        "reasons": reasons,
+        "probe": probe,
+        "audio_path": audio_path if ok else None,
+        "frames_dir": frames_dir if ok else None,
+        "cached": cached,
+        "ffmpeg": None if cached else ffmpeg_progress.get(job_id, stage="resize"),
+        "seconds": time.perf_counter() - start,
+    }
+    return result
+
+
+def transcode_batch(pairs, jobs=None, cpu_budget=None, side_outputs=None, cache=None):
+    """Transcode (input, output) pairs in parallel. Results come back in input order.
+
+    side_outputs optionally gives, per pair, extra transcode() kwargs: the
+    audio_path/frames_dir of the fused pass and the input_md5 cache key.
+    """
+    jobs, threads = plan_jobs(cpu_budget, jobs)
+    side_outputs = side_outputs or [{}] * len(pairs)
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(transcode, src, dst, threads, cache=cache, **extra)
+            for (src, dst), extra in zip(pairs, side_outputs)
+        ]
+        return [future.result() for future in futures]
+
+
+def resize_videos(jobs=None, cpu_budget=None):
+    """Resize every raw video for Shorts. Returns one result dict per input, in manifest order."""
     input_dir = os.path.join("videos", "raw_videos")  # Changed from "raw" to "raw_videos"
     edited_dir = os.path.join("videos", "edited")
     final_dir = os.path.join("videos", "final")
@@ -11,41 +193,83 @@ def resize_videos():
     os.makedirs(edited_dir, exist_ok=True)
     os.makedirs(final_dir, exist_ok=True)
 
-    files = [f for f in os.listdir(input_dir) if f.endswith(".mp4")]
-    if not files:
-        print("⚠️ No videos found in /videos/raw_videos/")
-        return
+    raw_manifest = VideoManifest(input_dir)
+    final_manifest = VideoManifest(final_dir)
 
-    processed_count = 0
+    entries = [e for e in raw_manifest.entries().values() if e["container"] == "mp4"]
+    if not entries:
+        print("⚠️ No videos found in /videos/raw_videos/")
+        return []
 
-    for file in files:
-        input_path = os.path.join(input_dir, file)
-        edited_path = os.path.join(edited_dir, file)
-        final_path = os.path.join(final_dir, file)
+    jobs, threads = plan_jobs(cpu_budget, jobs)
+    print(f"🎞️ Resizing {len(entries)} videos ({jobs} parallel jobs x {threads} threads)...")
 
-        print(f"🎞️ Resizing {file}...")
+    pairs = [(e["path"], os.path.join(edited_dir, f"{e['video_id']}.mp4")) for e in entries]
+    side_outputs = [{"input_md5": e["md5"]} for e in entries]
+    if FUSED_MEDIA_PASS:
+        os.makedirs(PROCESSED_AUDIO_DIR, exist_ok=True)
+        for e, extra in zip(entries, side_outputs):
+            extra["audio_path"] = os.path.join(PROCESSED_AUDIO_DIR, f"{e['video_id']}.wav")
+            extra["frames_dir"] = os.path.join(FRAMES_DIR, e["video_id"])
+    cache = TranscodeCache() if TRANSCODE_CACHE else None
+    results = transcode_batch(pairs, jobs=jobs, cpu_budget=cpu_budget, side_outputs=side_outputs, cache=cache)
 
-        # Use FFmpeg to resize the video and optimize it
-        command = [
-            "ffmpeg", "-i", input_path,
-            "-vf", "scale=720:1280",
-            "-c:v", "libx264", "-preset", "fast", "-crf", "23",  # Better compression, fast preset
-            "-c:a", "aac", "-b:a", "128k",
-            "-y", edited_path
-        ]
+    # Move outputs and clean up sequentially, in input order, so the manifests
+    # and directories end up the same regardless of which job finished first
+    for i, (entry, result) in enumerate(zip(entries, results)):
+        video_id = entry["video_id"]
+        file = f"{video_id}.mp4"
+        input_path = entry["path"]
+        edited_path = result["output"]
+        final_path = os.path.join(final_dir, file)
+        result["video_id"] = video_id
 
-        try:
-            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
-            shutil.copy(edited_path, final_path)  # Copy to final folder
-            os.remove(input_path)  # Remove the original video from raw_videos
-            os.remove(edited_path)  # Clean up edited video
-            processed_count += 1
-            print(f"✅ Successfully processed: {file}")
+        if not result["ok"]:
+            if os.path.exists(edited_path):
+                os.remove(edited_path)  # Don't leave half-written output behind
+            if side_outputs[i].get("frames_dir"):
+                shutil.rmtree(side_outputs[i]["frames_dir"], ignore_errors=True)
+            if side_outputs[i].get("audio_path") and os.path.exists(side_outputs[i]["audio_path"]):
+                os.remove(side_outputs[i]["audio_path"])
+            continue
 
-        except subprocess.CalledProcessError:
-            print(f"❌ Failed to resize {file}. Skipping...")
+        shutil.copy(edited_path, final_path)  # Copy to final folder
+        # Keep the probe and the copy/encode decision next to the output for auditing
+        final_manifest.record(
+            video_id, final_path,
+            source_md5=entry["md5"],
+            decision=result["decision"],
+            reasons=result["reasons"],
+            probe=result["probe"],
+            audio_path=result["audio_path"],
+            frames_dir=result["frames_dir"],
+            frame_interval=OCR_FRAME_INTERVAL if result["frames_dir"] else None,
+        )
+        os.remove(input_path)  # Remove the original video from raw_videos
+        raw_manifest.remove(video_id)
+        os.remove(edited_path)  # Clean up edited video
+        result["output"] = final_path
 
+    processed_count = sum(1 for r in results if r["ok"])
     print(f"✅ Resized {processed_count} videos and moved to /videos/final/. Cleaned up /raw_videos/ and /edited/.")
+    decisions = {}
+    for result in results:
+        if result["ok"]:
+            decisions[result["decision"]] = decisions.get(result["decision"], 0) + 1
+    if decisions:
+        print("   " + ", ".join(f"{count} {decision}" for decision, count in sorted(decisions.items())))
+    if cache is not None:
+        stats = cache.stats()
+        print(f"   Transcode cache: {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions")
+    encoded = [r for r in results if r["ok"] and r["ffmpeg"] and r["ffmpeg"]["speed"]]
+    if encoded:
+        slowest = min(encoded, key=lambda r: r["ffmpeg"]["speed"])
+        print(f"   Slowest encode: {slowest['video_id']} at {slowest['ffmpeg']['speed']:g}x "
+              f"({slowest['ffmpeg']['fps']:g} fps, {slowest['ffmpeg']['wall_time']:g}s)")
+    for result in results:
+        if not result["ok"]:
+            print(f"❌ Failed to resize {result['video_id']}: {result['error']}")
+    return results
 
 if __name__ == "__main__":
     resize_videos()
@@ -0,0 +1,143 @@
+import time
+import threading
+import subprocess
+from collections import deque
+
+# How many stderr lines to keep for failure reports
+STDERR_TAIL_LINES = 20
+
+_lock = threading.Lock()
+_jobs = {}  # (stage, job_id) -> metrics: one video has a "resize" and an "audio" job
+_listeners = []
+
+
+def add_listener(callback):
+    """Call callback(job) on every progress update. Called from reader threads."""
+    with _lock:
+        _listeners.append(callback)
+
+
+def remove_listener(callback):
+    with _lock:
+        if callback in _listeners:
+            _listeners.remove(callback)
+
+
+def snapshot(stage=None):
+    """Copy of the current metrics of every job (optionally only one stage), oldest first."""
+    with _lock:
+        jobs = [dict(job) for job in _jobs.values()]
+    if stage is not None:
+        jobs = [job for job in jobs if job["stage"] == stage]
+    return sorted(jobs, key=lambda job: job["started_at"])
+
+
+def get(job_id, stage="ffmpeg"):
+    """Copy of one job's metrics, or None if it never ran."""
+    with _lock:
+        job = _jobs.get((stage, job_id))
+        return dict(job) if job else None
+
+
+def reset(stage=None):
+    with _lock:
+        for key in [key for key in _jobs if stage is None or key[0] == stage]:
+            del _jobs[key]
+
+
+def _publish(job_key, **changes):
+    with _lock:
+        job = _jobs[job_key]
+        job.update(changes)
+        job["wall_time"] = round(time.time() - job["started_at"], 2)
+        job_copy = dict(job)
+        listeners = list(_listeners)
+    for callback in listeners:
+        try:
+            callback(job_copy)
+        except Exception as e:
+            print(f"⚠️ Progress listener failed: {e}")
+
+
+def _parse_out_time(value):
+    try:
+        hours, minutes, seconds = value.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
+def run_ffmpeg(command, job_id, stage="ffmpeg", duration=None):
+    """Run ffmpeg with -progress reporting. Returns (ok, error message with stderr tail).
+
+    While it runs, the job's frames, fps, speed, out_time, bitrate and wall
+    time are kept up to date in the registry (see snapshot()) and pushed to
+    listeners. duration (seconds of input) enables a percent estimate.
+    """
+    command = [command[0], "-hide_banner", "-nostats", "-progress", "pipe:1", *command[1:]]
+    job_key = (stage, job_id)
+    with _lock:
+        _jobs[job_key] = {
+            "job_id": job_id,
+            "stage": stage,
+            "status": "running",
+            "frames": 0,
+            "fps": 0.0,
+            "speed": None,
+            "out_time": 0.0,
+            "bitrate": None,
+            "percent": None,
+            "duration": duration,
+            "started_at": time.time(),
+            "wall_time": 0.0,
+            "returncode": None,
+            "stderr_tail": [],
+        }
+
+    try:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                stdin=subprocess.DEVNULL, text=True, errors="replace")
+    except OSError as e:
+        _publish(job_key, status="failed", stderr_tail=[str(e)])
+        return False, f"could not start ffmpeg: {e}"
+
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    stderr_reader = threading.Thread(target=lambda: stderr_tail.extend(proc.stderr), daemon=True)
+    stderr_reader.start()
+
+    block = {}
+    for line in proc.stdout:
+        key, _, value = line.strip().partition("=")
+        if key != "progress":
+            block[key] = value
+            continue
+        changes = {}
+        if block.get("frame", "").isdigit():
+            changes["frames"] = int(block["frame"])
+        try:
+            changes["fps"] = float(block.get("fps", ""))
+        except ValueError:
+            pass
+        speed = block.get("speed", "").rstrip("x").strip()
+        try:
+            changes["speed"] = float(speed)
+        except ValueError:
+            pass
+        out_time = _parse_out_time(block.get("out_time", ""))
+        if out_time is not None:
+            changes["out_time"] = round(out_time, 2)
+            if duration:
+                changes["percent"] = round(min(100.0, out_time / duration * 100), 1)
+        if block.get("bitrate") and block["bitrate"] != "N/A":
+            changes["bitrate"] = block["bitrate"].strip()
+        _publish(job_key, **changes)
+        block = {}
+
+    returncode = proc.wait()
+    stderr_reader.join(timeout=5)
+    tail = [line.rstrip() for line in stderr_tail if line.strip()]
+    if returncode == 0:
+        _publish(job_key, status="done", returncode=0, percent=100.0 if duration else None)
+        return True, None
+    _publish(job_key, status="failed", returncode=returncode, stderr_tail=tail)
+    return False, f"ffmpeg exited with {returncode}: " + " | ".join(tail[-5:])
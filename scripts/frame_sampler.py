@@ -0,0 +1,125 @@
+import os
+import time
+
+# ----- Settings --------------------------------------------------------------
+# Only consider seeking when the next target is at least this many seconds
+# ahead; shorter gaps are always cheaper to walk with grab()
+SEEK_MIN_GAP = float(os.getenv("FRAME_SEEK_MIN_GAP", "1"))
+
+
+def frame_timestamps(duration, interval=None, max_frames=None):
+    """Target timestamps (seconds): one every interval, or max_frames spread evenly, or both (capped)."""
+    if duration <= 0:
+        return []
+    if interval:
+        times = []
+        t = 0.0
+        while t < duration:
+            times.append(round(t, 3))
+            t += interval
+        if not max_frames or len(times) <= max_frames:
+            return times
+    if not max_frames:
+        return [0.0]
+    # Centre of each of max_frames equal slices, so the first/last seconds aren't favoured
+    return [round(duration * (i + 0.5) / max_frames, 3) for i in range(max_frames)]
+
+
+def sample_frames(video_path, interval=2.0, max_frames=None, gray=True, stats=None):
+    """Yield (timestamp, frame) for sparse target timestamps without decoding every frame.
+
+    Walks the targets in order, skipping frames with grab() (demux + decode
+    but no colour conversion or copy) or a seek. A seek decodes forward from
+    the previous keyframe, so it only pays off when keyframes are closer
+    together than the gap: the sampler times both and seeks only while a seek
+    is cheaper than grabbing through the gap. If the
+    container reports no frame count or a seek lands on the wrong frame, it
+    reopens the file and finishes with grab() only, so the frames returned
+    are always exactly the targets. stats, if given, is filled with the
+    mode used and how many frames were grabbed, retrieved and seeked to.
+    """
+    import cv2
+
+    stats = stats if stats is not None else {}
+    stats.update(mode="seek", grabbed=0, retrieved=0, seeks=0, targets=0)
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    if fps <= 0 or frame_count <= 0:
+        # No usable index: sample by decode time instead, still without retrieving skipped frames
+        cap.release()
+        yield from _sample_by_timestamp(video_path, interval or 2.0, gray, stats)
+        return
+
+    targets = sorted({min(frame_count - 1, int(round(t * fps)))
+                      for t in frame_timestamps(frame_count / fps, interval, max_frames)})
+    stats["targets"] = len(targets)
+    seek_gap = max(1, int(SEEK_MIN_GAP * fps))
+    position = 0  # index of the next frame grab() would return
+    grab_time = 0.0
+    seek_cost = None  # seconds per seek, measured
+    try:
+        for target in targets:
+            gap = target - position
+            # Measure grabbing first, then try one seek, then pick whichever is cheaper
+            grab_cost = grab_time / stats["grabbed"] if stats["grabbed"] else None
+            if (stats["mode"] == "seek" and gap >= seek_gap and grab_cost is not None
+                    and (seek_cost is None or seek_cost < gap * grab_cost)):
+                start = time.perf_counter()
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                elapsed = time.perf_counter() - start
+                seek_cost = elapsed if seek_cost is None else (seek_cost + elapsed) / 2
+                stats["seeks"] += 1
+                if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != target:
+                    # Inexact seek: start over and walk the remaining targets frame by frame
+                    cap.release()
+                    cap = cv2.VideoCapture(video_path)
+                    stats["mode"] = "grab"
+                    position = 0
+                else:
+                    position = target
+            start = time.perf_counter()
+            while position < target:
+                if not cap.grab():
+                    return
+                stats["grabbed"] += 1
+                position += 1
+            grab_time += time.perf_counter() - start
+            ok, frame = cap.read()
+            if not ok:
+                return
+            stats["retrieved"] += 1
+            position += 1
+            if gray:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            yield round(target / fps, 3), frame
+    finally:
+        cap.release()
+
+
+def _sample_by_timestamp(video_path, interval, gray, stats):
+    import cv2
+
+    stats["mode"] = "timestamp"
+    cap = cv2.VideoCapture(video_path)
+    next_time = 0.0
+    try:
+        while cap.grab():
+            stats["grabbed"] += 1
+            t = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+            if t + 1e-3 < next_time:
+                continue
+            ok, frame = cap.retrieve()
+            if not ok:
+                continue
+            stats["retrieved"] += 1
+            stats["targets"] += 1
+            while next_time <= t + 1e-3:
+                next_time += interval
+            if gray:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            yield round(t, 3), frame
+    finally:
+        cap.release()
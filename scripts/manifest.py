@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+
+# ----- Paths -----------------------------------------------------------------
+RAW_DIR = os.path.join("videos", "raw_videos")
+FINAL_DIR = os.path.join("videos", "final")
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def file_md5(path, chunk_size=1024 * 1024):
+    """MD5 of a file's bytes (same digest uploader.py uses for duplicate checks)."""
+    hash_md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            hash_md5.update(chunk)
+    return hash_md5.hexdigest()
+
+
+def atomic_write(path, write, mode="w"):
+    """Call write(f) on a temp file next to path, then swap it in, so readers and crashes never see a partial file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, mode) as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def atomic_write_json(path, data):
+    atomic_write(path, lambda f: json.dump(data, f, indent=2))
+
+
+class VideoManifest:
+    """Append-only JSONL index of the videos living in one directory.
+
+    Every line is either an "add" record (video ID -> path, size, container,
+    md5, timestamp) or a "remove" tombstone. Replaying the log gives the
+    current set of videos without listing the directory. If the manifest
+    doesn't exist yet, it is bootstrapped once from a directory scan.
+    """
+
+    def __init__(self, directory, extensions=(".mp4",)):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self.extensions = extensions
+        self._lock = threading.Lock()
+
+    def _append(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, "a") as f:
+                f.write(line)
+
+    def record(self, video_id, path, container=None, **extra):
+        """Add (or replace) a video once its file is complete on disk."""
+        entry = {
+            "op": "add",
+            "video_id": video_id,
+            "path": path,
+            "size": os.path.getsize(path),
+            "container": container or os.path.splitext(path)[1].lstrip(".").lower(),
+            "md5": file_md5(path),
+            "added_at": datetime.now().isoformat(),
+        }
+        entry.update(extra)
+        self._append(entry)
+        return entry
+
+    def remove(self, video_id):
+        self._append({"op": "remove", "video_id": video_id})
+
+    def _bootstrap(self):
+        """One-time import of files that predate the manifest."""
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if name.lower().endswith(self.extensions):
+                video_id = os.path.splitext(name)[0]
+                self.record(video_id, os.path.join(self.directory, name))
+
+    def entries(self):
+        """Current videos as {video_id: entry}, in the order they were added."""
+        if not os.path.exists(self.path):
+            self._bootstrap()
+        current = {}
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn write from a crashed run
+                    if record.get("op") == "remove":
+                        current.pop(record["video_id"], None)
+                    else:
+                        current.pop(record["video_id"], None)
+                        current[record["video_id"]] = record
+        except FileNotFoundError:
+            return {}
+        # Files removed behind our back (manual cleanup, crashed stage) drop out
+        return {vid: entry for vid, entry in current.items() if os.path.exists(entry["path"])}
+
+    def get(self, video_id):
+        return self.entries().get(video_id)
+
+    def compact(self):
+        """Rewrite the log with only the live entries."""
+        live = self.entries()
+        with self._lock:
+            atomic_write(self.path, lambda f: f.writelines(json.dumps(entry) + "\n" for entry in live.values()))
+
+
+def raw_manifest():
+    return VideoManifest(RAW_DIR)
+
+
+def final_manifest():
+    return VideoManifest(FINAL_DIR)
@@ -0,0 +1,134 @@
+import os
+import json
+from scripts.prompt_compaction import estimate_tokens
+
+# ----- Settings --------------------------------------------------------------
+# Pack several transcripts into one chat request (async engine only)
+METADATA_BATCH = os.getenv("METADATA_BATCH", "1") == "1"
+# Prompt tokens per batched request, and a cap on videos per request
+METADATA_BATCH_TOKENS = int(os.getenv("METADATA_BATCH_TOKENS", "6000"))
+METADATA_BATCH_MAX_ITEMS = int(os.getenv("METADATA_BATCH_MAX_ITEMS", "8"))
+# Seconds to wait for more transcripts before sending a partial batch
+METADATA_BATCH_WAIT = float(os.getenv("METADATA_BATCH_WAIT", "1.0"))
+# Completion tokens reserved per video (title + description + hashtags)
+OUTPUT_TOKENS_PER_ITEM = 160
+TITLE_MAX_WORDS = 10
+
+BATCH_INSTRUCTIONS = (
+    "For each transcript below, create a Title (<=10 words) and a Description "
+    "(short summary + 10–12 trending hashtags) for a YouTube Short about it.\n"
+    "Answer with JSON only: {\"items\": [{\"id\": <id>, \"title\": <title>, \"description\": "
+    "<one short paragraph + hashtags>}, ...]} with exactly one item per transcript id.\n\n"
+    "Transcripts:\n"
+)
+
+# Structured-outputs schema for the reply. The API wants an object at the root,
+# so the array sits under "items"
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "video_metadata",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "items": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string"},
+                            "title": {"type": "string"},
+                            "description": {"type": "string"},
+                        },
+                        "required": ["id", "title", "description"],
+                        "additionalProperties": False,
+                    },
+                },
+            },
+            "required": ["items"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def item_payload(video_id, transcript):
+    return json.dumps({"id": video_id, "transcript": transcript}, ensure_ascii=False)
+
+
+def build_batch_prompt(items):
+    """One prompt for [(video_id, transcript), ...], one JSON object per line."""
+    return BATCH_INSTRUCTIONS + "\n".join(item_payload(video_id, transcript) for video_id, transcript in items)
+
+
+def plan_batches(items, token_budget=None, max_items=None):
+    """Split [(video_id, transcript), ...] into batches that fit the token budget, keeping order.
+
+    An item too large for the budget on its own still gets a batch of one.
+    """
+    token_budget = token_budget or METADATA_BATCH_TOKENS
+    max_items = max_items or METADATA_BATCH_MAX_ITEMS
+    overhead = estimate_tokens(BATCH_INSTRUCTIONS)
+    batches, batch, tokens = [], [], overhead
+    for item in items:
+        cost = estimate_tokens(item_payload(*item)) + OUTPUT_TOKENS_PER_ITEM
+        if batch and (tokens + cost > token_budget or len(batch) >= max_items):
+            batches.append(batch)
+            batch, tokens = [], overhead
+        batch.append(item)
+        tokens += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def max_completion_tokens(batch):
+    return OUTPUT_TOKENS_PER_ITEM * len(batch) + 50
+
+
+def validate_item(item):
+    """{"title", "description"} from one reply item, or None if it doesn't fit the schema."""
+    if not isinstance(item, dict):
+        return None
+    title, description = item.get("title"), item.get("description")
+    if not isinstance(title, str) or not isinstance(description, str):
+        return None
+    title, description = title.strip(), description.strip()
+    if not title or not description or len(title.split()) > TITLE_MAX_WORDS:
+        return None
+    return {"title": title, "description": description}
+
+
+def parse_batch_reply(text, video_ids):
+    """Map video_id -> metadata for every valid item in a batch reply.
+
+    Ids that are missing, duplicated, unknown or fail validation are left
+    out, so the caller can retry them one by one.
+    """
+    try:
+        reply = json.loads(text)
+    except (TypeError, ValueError):
+        return {}
+    items = reply.get("items") if isinstance(reply, dict) else None
+    if not isinstance(items, list):
+        return {}
+    wanted = set(video_ids)
+    parsed, seen = {}, set()
+    for item in items:
+        video_id = str(item.get("id")) if isinstance(item, dict) else None
+        if video_id not in wanted:
+            continue
+        if video_id in seen:
+            parsed.pop(video_id, None)  # contradictory answers: trust neither
+            continue
+        seen.add(video_id)
+        metadata = validate_item(item)
+        if metadata:
+            parsed[video_id] = metadata
+    return parsed
+
+
+def format_metadata(metadata):
+    """The per-video reply format, so batched results share the per-video cache entries."""
+    return f"Title: {metadata['title']}\nDescription: {metadata['description']}"
@@ -0,0 +1,323 @@
+import os
+import time
+import shutil
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from scripts import audio_encoding, metadata_batch, ocr_pool, prompt_compaction
+from scripts import openai_helper as helper
+from scripts.api_scheduler import get_scheduler
+
+# ----- Concurrency limits ----------------------------------------------------
+# In-flight Whisper uploads and chat completions across all videos
+WHISPER_CONCURRENCY = int(os.getenv("WHISPER_CONCURRENCY", "4"))
+CHAT_CONCURRENCY = int(os.getenv("CHAT_CONCURRENCY", "4"))
+# Threads for the blocking work (ffmpeg audio extraction, OCR). EasyOCR
+# already spreads one frame over the cores, so keep this small; with the OCR
+# process pool there is at least one thread per OCR process to feed it
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", "1"))
+
+
+class MetadataBatcher:
+    """Collects transcripts from concurrent videos and generates their metadata in batched requests.
+
+    submit() resolves once the video's batch is answered. A batch goes out
+    when it is full (token budget or item cap), when no other video can
+    still join it, or METADATA_BATCH_WAIT seconds after its first
+    transcript arrived. Replies are validated per item; items missing or
+    invalid in the reply (or a failed request) are retried through the
+    engine's one-video path.
+    """
+
+    def __init__(self, engine, videos, token_budget=None, max_items=None, wait=None):
+        self.engine = engine
+        self.outstanding = videos  # videos that may still submit
+        self.token_budget = token_budget or metadata_batch.METADATA_BATCH_TOKENS
+        self.max_items = max_items or metadata_batch.METADATA_BATCH_MAX_ITEMS
+        self.wait = metadata_batch.METADATA_BATCH_WAIT if wait is None else wait
+        self.requests = 0
+        self.fallbacks = 0
+        self._pending = []  # (video_id, transcript, future)
+        self._timer = None
+        self._tasks = set()
+
+    def skip(self):
+        """A video finished without needing metadata; don't wait for it."""
+        self.outstanding -= 1
+        if self._pending and self.outstanding <= 0:
+            self._flush()
+
+    async def submit(self, video_id, transcript):
+        """Metadata dict for one transcript (empty title if nothing usable came back)."""
+        self.outstanding -= 1
+        cache = helper.get_result_cache()
+        key = helper.metadata_cache_key(helper.build_metadata_prompt(transcript)) if cache else None
+        if key:
+            cached = cache.get("metadata", key)
+            if cached is not None:
+                print(f"♻️ [{video_id}] Cached title/description")
+                if self._pending and self.outstanding <= 0:
+                    self._flush()
+                return helper.parse_metadata(cached)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((video_id, transcript, future))
+        self._flush(full_only=self.outstanding > 0)
+        if self._pending and self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.wait, self._on_timer)
+        return await future
+
+    def _on_timer(self):
+        self._timer = None
+        self._flush()
+
+    def _flush(self, full_only=False):
+        """Send the pending transcripts; with full_only, keep the last, still open batch back."""
+        futures = {video_id: future for video_id, _t, future in self._pending}
+        items = [(video_id, transcript) for video_id, transcript, _f in self._pending]
+        batches = metadata_batch.plan_batches(items, self.token_budget, self.max_items)
+        if full_only:
+            last = batches.pop() if batches else []
+            if len(last) >= self.max_items:
+                batches.append(last)
+        sent = {video_id for batch in batches for video_id, _t in batch}
+        self._pending = [p for p in self._pending if p[0] not in sent]
+        if not self._pending and self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for batch in batches:
+            task = asyncio.ensure_future(self._send(batch, futures))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch, futures):
+        try:
+            await self._answer(batch, futures)
+        except Exception as e:
+            for video_id, _t in batch:
+                if not futures[video_id].done():
+                    futures[video_id].set_exception(e)
+
+    async def _answer(self, batch, futures):
+        parsed = {}
+        if len(batch) > 1:
+            parsed = await self.engine.generate_batch(batch)
+            self.requests += 1
+        for video_id, transcript in batch:
+            metadata = parsed.get(video_id)
+            if metadata is None:
+                if len(batch) > 1:
+                    self.fallbacks += 1
+                    print(f"⚠️ [{video_id}] Not in the batched reply. Retrying on its own…")
+                metadata = helper.parse_metadata(
+                    await self.engine.generate(video_id, helper.build_metadata_prompt(transcript)))
+            else:
+                cache = helper.get_result_cache()
+                if cache:
+                    cache.put("metadata", helper.metadata_cache_key(helper.build_metadata_prompt(transcript)),
+                              metadata_batch.format_metadata(metadata))
+            if not futures[video_id].done():
+                futures[video_id].set_result(metadata)
+
+
+class MetadataEngine:
+    """Generate metadata for many videos with overlapping API round-trips.
+
+    Each video still runs audio -> Whisper -> (OCR fallback) -> chat in
+    order, but videos run concurrently: Whisper and chat calls go through
+    AsyncOpenAI behind their own semaphores, and OCR/ffmpeg run in a thread
+    pool so they never block the event loop. A failing video is reported in
+    its result and does not affect the others. With batching on, chat
+    requests are shared between videos through a MetadataBatcher.
+    """
+
+    def __init__(self, client=None, whisper_concurrency=None, chat_concurrency=None, ocr_workers=None,
+                 batch=None):
+        self.client = client
+        self.batch = metadata_batch.METADATA_BATCH if batch is None else batch
+        self._owns_client = client is None
+        self.whisper_concurrency = whisper_concurrency or WHISPER_CONCURRENCY
+        self.chat_concurrency = chat_concurrency or CHAT_CONCURRENCY
+        self.ocr_workers = ocr_workers or max(OCR_WORKERS, ocr_pool.OCR_PROCESSES)
+
+    def _get_client(self):
+        if self.client is None:
+            if not helper.OPENAI_API_KEY:
+                raise RuntimeError("OPENAI_API_KEY is not set. Put it in your .env and keep .env out of git.")
+            from openai import AsyncOpenAI
+            self.client = AsyncOpenAI(api_key=helper.OPENAI_API_KEY, max_retries=0)
+        return self.client
+
+    async def _blocking(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._pool, func, *args)
+
+    async def transcribe(self, video_id, audio_path):
+        """Whisper transcription. Returns plain text (or '')."""
+        cache = helper.get_result_cache()
+        # Hashing is quick; on the default executor it never queues behind minutes of OCR in self._pool
+        key = await asyncio.to_thread(helper.whisper_cache_key, audio_path) if cache else None
+        if key:
+            cached = cache.get("transcript", key)
+            if cached is not None:
+                print(f"♻️ [{video_id}] Cached transcript")
+                return cached
+        chunks = await self._blocking(audio_encoding.upload_chunks, audio_path)
+        try:
+            async with self._whisper_slots:
+                print(f"🧠 [{video_id}] Transcribing with {helper.WHISPER_MODEL} "
+                      f"({helper.describe_upload(audio_path, chunks)})...")
+                texts = []
+                for chunk in chunks:
+                    with open(chunk, "rb") as f:
+                        audio = f.read()
+                    tx = await get_scheduler().acall(
+                        "whisper", self._get_client().audio.transcriptions.create,
+                        model=helper.WHISPER_MODEL,
+                        file=(os.path.basename(chunk), audio),
+                        response_format="text"
+                    )
+                    texts.append((tx or "").strip())
+                text = " ".join(t for t in texts if t)
+                if key and text:
+                    cache.put("transcript", key, text)
+                return text
+        except Exception as e:
+            print(f"❌ [{video_id}] Whisper API error: {e}")
+            return ""
+        finally:
+            audio_encoding.discard_chunks(audio_path, chunks)
+
+    async def generate(self, video_id, prompt_text):
+        """Chat completion for Title + Description. Returns the raw reply (or '')."""
+        cache = helper.get_result_cache()
+        key = helper.metadata_cache_key(prompt_text) if cache else None
+        if key:
+            cached = cache.get("metadata", key)
+            if cached is not None:
+                print(f"♻️ [{video_id}] Cached title/description")
+                return cached
+        async with self._chat_slots:
+            print(f"🤖 [{video_id}] Generating title/description with OpenAI...")
+            try:
+                resp = await get_scheduler().acall(
+                    "chat", self._get_client().chat.completions.create,
+                    tokens=helper.chat_tokens(prompt_text),
+                    model=helper.OPENAI_CHAT_MODEL,
+                    messages=[
+                        {"role": "system", "content": helper.SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt_text}
+                    ],
+                    temperature=helper.CHAT_TEMPERATURE,
+                )
+                text = resp.choices[0].message.content.strip()
+                if key and text:
+                    cache.put("metadata", key, text)
+                return text
+            except Exception as e:
+                print(f"❌ [{video_id}] Chat API error: {e}")
+                return ""
+
+    async def generate_batch(self, batch):
+        """One chat request for [(video_id, transcript), ...]. Returns video_id -> metadata for the valid items."""
+        ids = [video_id for video_id, _t in batch]
+        async with self._chat_slots:
+            print(f"🤖 Generating titles/descriptions for {len(batch)} videos in one request...")
+            prompt_text = metadata_batch.build_batch_prompt(batch)
+            try:
+                resp = await get_scheduler().acall(
+                    "chat", self._get_client().chat.completions.create,
+                    tokens=helper.chat_tokens(prompt_text, metadata_batch.max_completion_tokens(batch)),
+                    model=helper.OPENAI_CHAT_MODEL,
+                    messages=[
+                        {"role": "system", "content": helper.SYSTEM_PROMPT},
+                        {"role": "user", "content": prompt_text}
+                    ],
+                    temperature=helper.CHAT_TEMPERATURE,
+                    max_tokens=metadata_batch.max_completion_tokens(batch),
+                    response_format=metadata_batch.RESPONSE_FORMAT,
+                )
+                return metadata_batch.parse_batch_reply(resp.choices[0].message.content, ids)
+            except Exception as e:
+                print(f"❌ Batched chat API error ({', '.join(ids)}): {e}")
+                return {}
+
+    async def metadata(self, video_id, transcript):
+        """Title/description dict for one transcript, batched with other videos when enabled."""
+        if self._batcher is not None:
+            return await self._batcher.submit(video_id, transcript)
+        return helper.parse_metadata(await self.generate(video_id, helper.build_metadata_prompt(transcript)))
+
+    async def process(self, entry):
+        """One video end to end. Never raises; returns a result dict."""
+        video_id = entry["video_id"]
+        paths = helper.video_paths(entry)
+        start = time.perf_counter()
+        result = {"video_id": video_id, "ok": False, "error": None, "title": None}
+        wants_metadata = False
+        try:
+            if not os.path.exists(paths["audio"]):
+                await self._blocking(helper.extract_audio, entry["path"], paths["audio"])
+            transcript = ""
+            if os.path.exists(paths["audio"]):
+                upload_path = await self._blocking(helper.speech_audio, paths["audio"])
+                if upload_path:
+                    try:
+                        transcript = await self.transcribe(video_id, upload_path)
+                    finally:
+                        helper.discard_speech_audio(paths["audio"], upload_path)
+
+            from_ocr = not helper.is_usable(transcript)
+            if from_ocr:
+                print(f"⚠️ [{video_id}] Whisper transcript short. Falling back to OCR…")
+                transcript = await self._blocking(helper.extract_text_with_ocr, entry["path"], paths["frames"],
+                                                  paths["frame_interval"], entry.get("md5"))
+            if paths["frames"]:
+                shutil.rmtree(paths["frames"], ignore_errors=True)
+
+            if not helper.is_usable(transcript):
+                print(f"❌ [{video_id}] No usable transcript found. Skipping this video.")
+                helper.discard_audio(paths)
+                result["error"] = "no usable transcript"
+            else:
+                wants_metadata = True
+                prompt_transcript = prompt_compaction.compact_for_prompt(transcript, video_id, ocr=from_ocr)
+                metadata = await self.metadata(video_id, prompt_transcript)
+                if not metadata["title"]:
+                    result["error"] = "no metadata returned"
+                helper.save_metadata(entry, paths, transcript, metadata)
+                result.update(ok=bool(metadata["title"]), title=metadata["title"])
+        except Exception as e:
+            print(f"❌ [{video_id}] Failed: {e}")
+            result["error"] = str(e)
+        if not wants_metadata and self._batcher is not None:
+            self._batcher.skip()
+        result["seconds"] = round(time.perf_counter() - start, 2)
+        return result
+
+    async def run(self, entries):
+        """Process all entries concurrently. Results come back in entry order."""
+        self._whisper_slots = asyncio.Semaphore(self.whisper_concurrency)
+        self._chat_slots = asyncio.Semaphore(self.chat_concurrency)
+        self._batcher = MetadataBatcher(self, len(entries)) if self.batch and len(entries) > 1 else None
+        with ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix="metadata") as self._pool:
+            try:
+                results = await asyncio.gather(*(self.process(entry) for entry in entries))
+                if self._batcher is not None and self._batcher.requests:
+                    print(f"📦 {self._batcher.requests} batched chat requests, "
+                          f"{self._batcher.fallbacks} videos retried on their own")
+                return results
+            finally:
+                if self._owns_client and self.client is not None:
+                    await self.client.close()
+                    self.client = None
+
+
+def process_entries(entries, **engine_kwargs):
+    """Run the engine over final-manifest entries from synchronous code."""
+    print(f"⚡ Generating metadata for {len(entries)} videos "
+          f"(Whisper x{engine_kwargs.get('whisper_concurrency') or WHISPER_CONCURRENCY}, "
+          f"chat x{engine_kwargs.get('chat_concurrency') or CHAT_CONCURRENCY})")
+    results = asyncio.run(MetadataEngine(**engine_kwargs).run(entries))
+    failed = [r for r in results if not r["ok"]]
+    print(f"✅ Metadata for {len(results) - len(failed)}/{len(results)} videos")
+    for result in failed:
+        print(f"   ⚠️ {result['video_id']}: {result['error']}")
+    return results
@@ -0,0 +1,89 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# ----- Settings --------------------------------------------------------------
+# OCR worker processes (0 = OCR in the calling process). Every worker loads
+# its own torch + EasyOCR detector and recognizer, roughly 1 GB of RAM each,
+# so the default is at most 2; raise it only on hosts with the memory for it
+OCR_PROCESSES = int(os.getenv("OCR_PROCESSES", str(min(2, (os.cpu_count() or 1) // 2))))
+# Torch intra-op threads per worker; by default the cores are split evenly so
+# workers x threads never oversubscribes the machine
+OCR_TORCH_THREADS = int(os.getenv("OCR_TORCH_THREADS", "0"))
+
+
+def _init_worker(torch_threads):
+    # Must be set before torch is imported for OpenMP/MKL to honour it
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    from scripts import openai_helper
+
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    openai_helper.get_ocr_reader()  # load the model once per worker, not per task
+
+
+def _ocr_task(video_path, frames_dir):
+    """Runs in a worker: OCR one video (or its pre-sampled frames) and return only the text."""
+    from scripts import openai_helper
+
+    if frames_dir and os.path.isdir(frames_dir):
+        return openai_helper.extract_text_from_frames(frames_dir)
+    return openai_helper.extract_text_from_video(video_path)
+
+
+class OcrPool:
+    """Process pool for CPU-bound OCR, one EasyOCR model per worker process.
+
+    Threads don't help here: the GIL serializes the Python side and torch's
+    own thread pools fight each other. Tasks are whole videos, passed as
+    paths, and only the extracted text comes back, so nothing large crosses
+    the process boundary. extract() blocks its caller, so any number of
+    threads (e.g. the metadata engine's) can keep all workers busy. If a
+    worker dies (OOM kill, segfault in torch) the executor is broken for
+    good, so it is replaced and the task retried once.
+    """
+
+    def __init__(self, processes=None, torch_threads=None):
+        self.processes = max(1, processes or OCR_PROCESSES)
+        self.torch_threads = torch_threads or OCR_TORCH_THREADS or max(1, (os.cpu_count() or 1) // self.processes)
+        self._lock = threading.Lock()
+        self._executor = self._new_executor()
+        print(f"🔤 OCR pool: {self.processes} processes x {self.torch_threads} torch threads")
+
+    def _new_executor(self):
+        # spawn, not fork: the parent has threads (asyncio engine, ffmpeg readers)
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.torch_threads,),
+        )
+
+    def _replace_broken(self, broken):
+        """Swap in a fresh executor, unless another thread already replaced this broken one."""
+        with self._lock:
+            if self._executor is not broken:
+                return
+            print("⚠️ OCR worker process died; restarting the OCR pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def submit(self, video_path, frames_dir=None):
+        return self._executor.submit(_ocr_task, video_path, frames_dir)
+
+    def extract(self, video_path, frames_dir=None):
+        executor = self._executor
+        try:
+            return executor.submit(_ocr_task, video_path, frames_dir).result()
+        except BrokenProcessPool:
+            self._replace_broken(executor)
+        return self.submit(video_path, frames_dir).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
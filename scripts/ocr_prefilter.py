@@ -0,0 +1,162 @@
+import os
+import re
+
+import numpy as np
+
+# ----- Settings --------------------------------------------------------------
+# Thumbnail the frame comparison runs on (width, height); ~1/8 of 720x1280
+THUMB_SIZE = (90, 160)
+# Frames count as unchanged when the mean absolute difference of their
+# thumbnails is at most MAD_MAX grey levels (catches fades and scene changes)...
+MAD_MAX = float(os.getenv("OCR_MAD_MAX", "4"))
+# ...and at most this fraction of thumbnail pixels moved by more than PIXEL_DELTA
+# grey levels. A new caption line changes around 1% of the thumbnail,
+# compression noise almost nothing
+CHANGED_PIXELS_MAX = float(os.getenv("OCR_CHANGED_PIXELS_MAX", "0.004"))
+PIXEL_DELTA = 24
+
+# ----- Text-band pre-detection -------------------------------------------------
+# Only text-like regions go to the EasyOCR recognizer, instead of detection on the whole frame
+TEXT_BANDS = os.getenv("OCR_TEXT_BANDS", "1") == "1"
+# Resize factor applied to the frame before recognizing the bands (1 = full resolution)
+CROP_SCALE = float(os.getenv("OCR_CROP_SCALE", "0.75"))
+# Width the detector works at; 720x1280 frames are analysed at half size
+BAND_WORK_WIDTH = 360
+# Gradient strength (grey levels) that counts as an edge
+EDGE_THRESHOLD = 48
+# If candidate bands cover more than this share of the frame, or edges cover
+# more than BUSY_EDGE_SHARE of it (texture the detector can't see past), OCR
+# the whole frame
+BAND_MAX_COVERAGE = 0.6
+BUSY_EDGE_SHARE = 0.25
+
+
+def thumbnail(gray):
+    """Area-averaged THUMB_SIZE thumbnail of a grayscale frame as int16."""
+    import cv2
+
+    return cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA).astype(np.int16)
+
+
+def frame_difference(thumb_a, thumb_b):
+    """(mean absolute difference, fraction of pixels changed by more than PIXEL_DELTA)."""
+    diff = np.abs(thumb_a - thumb_b)
+    return float(diff.mean()), np.count_nonzero(diff > PIXEL_DELTA) / diff.size
+
+
+class FrameDeduper:
+    """Skips frames that look the same as the last frame that was OCR'd.
+
+    Short-form videos keep one caption on screen for seconds at a time, so
+    most sampled frames would only repeat the last OCR result. A frame is a
+    duplicate when both the mean difference and the share of changed pixels
+    against the reference thumbnail are within the thresholds.
+    """
+
+    def __init__(self, mad_max=MAD_MAX, changed_pixels_max=CHANGED_PIXELS_MAX):
+        self.mad_max = mad_max
+        self.changed_pixels_max = changed_pixels_max
+        self.kept = 0
+        self.skipped = 0
+        self._last_thumb = None
+
+    def is_duplicate(self, gray):
+        """True if gray can be skipped; otherwise it becomes the new reference frame."""
+        thumb = thumbnail(gray)
+        if self._last_thumb is not None:
+            mad, changed = frame_difference(thumb, self._last_thumb)
+            if mad <= self.mad_max and changed <= self.changed_pixels_max:
+                self.skipped += 1
+                return True
+        self._last_thumb = thumb
+        self.kept += 1
+        return False
+
+
+def normalize_text(text):
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+
+def dedupe_text_chunks(chunks):
+    """Drop repeated OCR chunks, keeping first-seen order.
+
+    A chunk is dropped if it was already seen or its words appear, in order,
+    in the previous chunk. When a caption builds up word by word, the longer version replaces
+    the previous one.
+    """
+    kept, normalized, seen = [], [], set()
+    for chunk in chunks:
+        norm = normalize_text(chunk)
+        if not norm or norm in seen:
+            continue
+        # Whole words only: "art" isn't in "press start", nor "cat" in "concatenate"
+        if normalized and f" {norm} " in f" {normalized[-1]} ":
+            continue
+        if normalized and f" {normalized[-1]} " in f" {norm} ":
+            seen.discard(normalized.pop())
+            kept.pop()
+        kept.append(chunk)
+        normalized.append(norm)
+        seen.add(norm)
+    return kept
+
+
+def find_text_bands(gray, work_width=BAND_WORK_WIDTH):
+    """Boxes (x0, y0, x1, y1) in frame pixels around likely text lines, [] if there are none.
+
+    Text shows up as a dense row of strong, short edges. The frame is
+    downscaled, edge-thresholded (morphological gradient), closed with a wide
+    kernel so the letters of a line merge, and the resulting components that
+    are wide, line-height and mostly filled are kept. Vertically overlapping
+    boxes are merged into bands and padded. On busy, heavily textured frames
+    or when the bands cover most of the frame, the whole frame is returned.
+    """
+    import cv2
+
+    h, w = gray.shape[:2]
+    scale = work_width / w
+    small = cv2.resize(gray, (work_width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    edges = (gradient > EDGE_THRESHOLD).astype(np.uint8)
+    if edges.mean() > BUSY_EDGE_SHARE:
+        return [(0, 0, w, h)]
+    joined = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 3)))
+
+    count, _labels, comp_stats, _centroids = cv2.connectedComponentsWithStats(joined, connectivity=8)
+    x, y, cw, ch, area = (comp_stats[1:, i] for i in range(5))
+    fill = area / np.maximum(cw * ch, 1)
+    # Line-height-ish (stacked caption boxes merge, so allow a few lines), wider than tall, and
+    # mostly filled: outlines of UI blocks and shapes close into hollow, low-fill components
+    keep = (ch >= 4) & (ch <= 120) & (cw >= 1.5 * ch) & (fill >= 0.2)
+    if not keep.any():
+        return []
+
+    boxes = sorted(zip(x[keep], y[keep], (x + cw)[keep], (y + ch)[keep]), key=lambda b: b[1])
+    bands = []
+    for x0, y0, x1, y1 in boxes:
+        pad = (y1 - y0) // 3 + 2
+        x0, y0, x1, y1 = x0 - pad, y0 - pad, x1 + pad, y1 + pad
+        if bands and y0 <= bands[-1][3]:
+            bx0, by0, bx1, by1 = bands[-1]
+            bands[-1] = (min(bx0, x0), by0, max(bx1, x1), max(by1, y1))
+        else:
+            bands.append((x0, y0, x1, y1))
+
+    bands = [
+        (max(0, int(x0 / scale)), max(0, int(y0 / scale)), min(w, int(x1 / scale)), min(h, int(y1 / scale)))
+        for x0, y0, x1, y1 in bands
+    ]
+    if sum(y1 - y0 for _x0, y0, _x1, y1 in bands) > BAND_MAX_COVERAGE * h:
+        return [(0, 0, w, h)]
+    return bands
+
+
+def band_boxes(gray, bands, scale=CROP_SCALE):
+    """The frame resized by scale, and bands on it as EasyOCR horizontal_list boxes [x_min, x_max, y_min, y_max]."""
+    import cv2
+
+    if scale != 1:
+        h, w = gray.shape[:2]
+        gray = cv2.resize(gray, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    boxes = [[int(x0 * scale), int(x1 * scale), int(y0 * scale), int(y1 * scale)] for x0, y0, x1, y1 in bands]
+    return gray, boxes
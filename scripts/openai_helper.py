@@ -1,191 +1,458 @@
 import os
 import json
-import subprocess
+import time
 import shutil
-import cv2
-import numpy as np
-import easyocr
-from openai import OpenAI
+import threading
 from dotenv import load_dotenv
+from scripts import audio_analysis, audio_encoding, ffmpeg_progress, metadata_batch, prompt_compaction
+from scripts.api_scheduler import get_scheduler
+from scripts.frame_sampler import sample_frames
+from scripts.manifest import VideoManifest, file_md5
+from scripts import ocr_prefilter
+from scripts.ocr_prefilter import FrameDeduper, dedupe_text_chunks, find_text_bands, band_boxes
+from scripts.result_cache import ResultCache, make_key
 
 # ----- Env + OpenAI client ---------------------------------------------------
 load_dotenv()  # reads .env in the project root
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-4o-mini")
 WHISPER_MODEL = os.getenv("WHISPER_MODEL", "whisper-1")
+SYSTEM_PROMPT = "You are a YouTube Shorts coach for tech content. Be concise and punchy."
+CHAT_TEMPERATURE = 0.7
+# Run step 3 through the asyncio engine in scripts/metadata_engine.py
+METADATA_ASYNC = os.getenv("METADATA_ASYNC", "1") == "1"
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY is not set. Put it in your .env and keep .env out of git.")
+# The client, the OCR model and the heavy imports behind them (openai,
+# easyocr/torch, cv2) are created on first use, so importing this module
+# (e.g. from run.py) stays cheap when step 3 never needs them
+_client = None
+_ocr_reader = None
+_result_cache = None
+_ocr_pool = None
+_init_lock = threading.Lock()
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+def get_client():
+    """Shared OpenAI client, built on first use."""
+    global _client
+    with _init_lock:
+        if _client is None:
+            if not OPENAI_API_KEY:
+                raise RuntimeError("OPENAI_API_KEY is not set. Put it in your .env and keep .env out of git.")
+            from openai import OpenAI
+            _client = OpenAI(api_key=OPENAI_API_KEY, max_retries=0)  # retries go through the scheduler
+        return _client
 
 # ----- Paths -----------------------------------------------------------------
 FINAL_DIR = os.path.join("videos", "final")
 PROCESSED_AUDIO_DIR = os.path.join("videos", "processed", "audio")
 PROCESSED_TRANSCRIPTS_DIR = os.path.join("videos", "processed", "transcripts")
 
-os.makedirs(FINAL_DIR, exist_ok=True)
-os.makedirs(PROCESSED_AUDIO_DIR, exist_ok=True)
-os.makedirs(PROCESSED_TRANSCRIPTS_DIR, exist_ok=True)
+# ----- Result cache ----------------------------------------------------------
+# Reuse transcripts, OCR text and metadata from earlier runs (see scripts/result_cache.py)
+RESULT_CACHE = os.getenv("RESULT_CACHE", "1") == "1"
+
+def get_result_cache():
+    """Shared ResultCache, or None when disabled."""
+    global _result_cache
+    with _init_lock:
+        if _result_cache is None and RESULT_CACHE:
+            _result_cache = ResultCache()
+        return _result_cache
+
+def whisper_cache_key(audio_path):
+    return make_key(file_md5(audio_path), WHISPER_MODEL)
+
+def metadata_cache_key(prompt_text):
+    return make_key(prompt_text, SYSTEM_PROMPT, OPENAI_CHAT_MODEL, CHAT_TEMPERATURE)
 
 # ----- OCR -------------------------------------------------------------------
-# GPU=False avoids surprise CUDA issues on laptops
-ocr_reader = easyocr.Reader(['en'], gpu=False)
+OCR_LANGUAGES = ['en']
+# Seconds between frames when OCR has to decode the video itself
+OCR_VIDEO_INTERVAL = 2
+# Cap on OCR'd frames per video (0 = no cap); frames are spread evenly when capped
+OCR_MAX_FRAMES = int(os.getenv("OCR_MAX_FRAMES", "0"))
+
+def get_ocr_pool():
+    """Shared OcrPool (scripts/ocr_pool.py), or None when OCR_PROCESSES is 0."""
+    global _ocr_pool
+    from scripts import ocr_pool
+    with _init_lock:
+        if _ocr_pool is None and ocr_pool.OCR_PROCESSES > 0:
+            _ocr_pool = ocr_pool.OcrPool()
+        return _ocr_pool
+
+def shutdown_ocr_pool():
+    global _ocr_pool
+    with _init_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown()
+            _ocr_pool = None
+
+def get_ocr_reader():
+    """Shared EasyOCR reader. Loading it pulls in torch and both models, so only do it when OCR runs."""
+    global _ocr_reader
+    with _init_lock:
+        if _ocr_reader is None:
+            import easyocr
+            print("🔤 Loading EasyOCR model...")
+            # GPU=False avoids surprise CUDA issues on laptops
+            _ocr_reader = easyocr.Reader(OCR_LANGUAGES, gpu=False)
+        return _ocr_reader
 
 # ----- Helpers ---------------------------------------------------------------
-def run_ffmpeg(cmd):
-    subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+def run_ffmpeg(cmd, job_id=None):
+    """Run ffmpeg with progress published under the "audio" stage. Returns True on success."""
+    ok, error = ffmpeg_progress.run_ffmpeg(cmd, job_id or cmd[-1], stage="audio")
+    if not ok:
+        print(f"❌ {error}")
+    return ok
 
 def extract_audio(video_path, audio_path):
     """Extract mono 16kHz WAV from video using ffmpeg."""
-    cmd = ["ffmpeg", "-i", video_path, "-ac", "1", "-ar", "16000", "-vn", audio_path, "-y"]
-    run_ffmpeg(cmd)
-    print("🎵 Audio extracted:", audio_path)
+    cmd = ["ffmpeg", "-i", video_path, "-ac", "1", "-ar", "16000", "-vn", "-y", audio_path]
+    if run_ffmpeg(cmd, os.path.splitext(os.path.basename(video_path))[0]):
+        print("🎵 Audio extracted:", audio_path)
 
 def transcribe_with_whisper(audio_path) -> str:
     """Transcribe with Whisper API. Returns plain text (or '')."""
-    print(f"🧠 Transcribing {audio_path} with {WHISPER_MODEL}...")
+    cache = get_result_cache()
+    key = whisper_cache_key(audio_path) if cache else None
+    if key:
+        cached = cache.get("transcript", key)
+        if cached is not None:
+            print(f"♻️ Cached transcript for {audio_path}")
+            return cached
+    chunks = audio_encoding.upload_chunks(audio_path)
+    print(f"🧠 Transcribing {audio_path} with {WHISPER_MODEL} ({describe_upload(audio_path, chunks)})...")
     try:
-        with open(audio_path, "rb") as f:
-            tx = client.audio.transcriptions.create(
-                model=WHISPER_MODEL,
-                file=f,
-                response_format="text"
-            )
-        text = (tx or "").strip()
+        texts = []
+        for chunk in chunks:
+            tx = get_scheduler().call("whisper", whisper_request, chunk)
+            texts.append((tx or "").strip())
+        text = " ".join(t for t in texts if t)
+        if key and text:
+            cache.put("transcript", key, text)
         return text
     except Exception as e:
         print(f"❌ Whisper API error: {e}")
         return ""
+    finally:
+        audio_encoding.discard_chunks(audio_path, chunks)
 
-def extract_text_with_ocr(video_path) -> str:
-    """Sample frames and OCR any on-screen text."""
-    print(f"📸 OCR scanning video: {video_path}")
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print("❌ Could not open video for OCR.")
+def whisper_request(path):
+    # Opens the file per attempt, so a retry re-sends it from the start
+    with open(path, "rb") as f:
+        return get_client().audio.transcriptions.create(
+            model=WHISPER_MODEL,
+            file=f,
+            response_format="text"
+        )
+
+def chat_tokens(prompt_text, completion_tokens=metadata_batch.OUTPUT_TOKENS_PER_ITEM):
+    """Estimated tokens a chat request counts against the tokens-per-minute limit."""
+    return metadata_batch.estimate_tokens(SYSTEM_PROMPT + prompt_text) + completion_tokens
+
+def describe_upload(audio_path, chunks):
+    """e.g. "312 KB opus, 1 file, WAV was 1.9 MB" for the transcription log line."""
+    sent = sum(os.path.getsize(c) for c in chunks)
+    fmt = os.path.splitext(chunks[0])[1].lstrip(".") if chunks else "?"
+    fmt = {"ogg": "opus"}.get(fmt, fmt)
+    files = f"{len(chunks)} file" + ("s" if len(chunks) != 1 else "")
+    return f"{sent / 1024:.0f} KB {fmt}, {files}, WAV was {os.path.getsize(audio_path) / 1024 / 1024:.1f} MB"
+
+def speech_audio(audio_path):
+    """The audio to send to Whisper, or None when VAD finds no speech in it.
+
+    Silent and music-only clips return None (the caller goes straight to OCR).
+    Leading/trailing silence is cut into a "<name>.speech.wav" next to the
+    original; the caller removes it after transcribing.
+    """
+    if not audio_analysis.VAD_ENABLED:
+        return audio_path
+    analysis = audio_analysis.analyze_wav(audio_path)
+    if analysis is None:
+        return audio_path
+    name = os.path.basename(audio_path)
+    if analysis["verdict"] != audio_analysis.SPEECH:
+        print(f"🎼 {name}: {analysis['verdict']} (peak {analysis['peak_dbfs']} dBFS, "
+              f"spread {analysis['energy_spread_db']} dB). Skipping Whisper.")
+        return None
+    start, end, duration = analysis["start"], analysis["end"], analysis["duration"]
+    if start + (duration - end) < audio_analysis.MIN_TRIM_SECONDS:
+        return audio_path
+    trimmed_path = os.path.splitext(audio_path)[0] + ".speech.wav"
+    audio_analysis.write_trimmed(audio_path, trimmed_path, start, end)
+    print(f"✂️ {name}: sending {start:.1f}-{end:.1f}s of {duration:.1f}s to Whisper")
+    return trimmed_path
+
+def discard_speech_audio(audio_path, upload_path):
+    if upload_path and upload_path != audio_path and os.path.exists(upload_path):
+        os.remove(upload_path)
+
+def ocr_frame(gray):
+    """OCR one grayscale frame. Returns its text (or '').
+
+    With OCR_TEXT_BANDS on, only the likely text lines are recognized, in
+    one call on the downscaled frame, and frames without any are skipped
+    without calling EasyOCR.
+    """
+    try:
+        reader = get_ocr_reader()
+        if ocr_prefilter.TEXT_BANDS:
+            bands = find_text_bands(gray)
+            if not bands:
+                return ""
+            h, w = gray.shape[:2]
+            if bands != [(0, 0, w, h)]:
+                # The bands are the detection: readtext() per crop would rerun CRAFT on each one
+                image, boxes = band_boxes(gray, bands)
+                result = reader.recognize(image, horizontal_list=boxes, free_list=[])
+                return " ".join(t[1] for t in result if len(t) >= 2).strip()
+        result = reader.readtext(gray)
+        return " ".join(t[1] for t in result if len(t) >= 2).strip()
+    except Exception as e:
+        print("OCR error on frame:", e)
         return ""
 
+def ocr_frames(frames):
+    """OCR an iterable of grayscale frames, skipping ones unchanged since the last OCR'd frame.
+
+    Returns the de-duplicated text chunks, or None if there were no frames at all.
+    """
+    deduper = FrameDeduper()
     text_chunks = []
-    frame_count = 0
-    fps = cap.get(cv2.CAP_PROP_FPS) or 15
-    frame_interval = max(int(fps * 2), 15)  # every ~2s
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        if frame_count % frame_interval == 0:
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            try:
-                result = ocr_reader.readtext(gray)
-                frame_text = " ".join([t[1] for t in result if len(t) >= 2]).strip()
-                if frame_text:
-                    text_chunks.append(frame_text)
-            except Exception as e:
-                print("OCR error on frame:", e)
-        frame_count += 1
-
-    cap.release()
-    extracted = " ".join(text_chunks).strip()
+    ocr_seconds = 0.0
+    for gray in frames:
+        if deduper.is_duplicate(gray):
+            continue
+        start = time.perf_counter()
+        frame_text = ocr_frame(gray)
+        ocr_seconds += time.perf_counter() - start
+        if frame_text:
+            text_chunks.append(frame_text)
+    if not deduper.kept:
+        return None
+    print(f"🔁 OCR ran on {deduper.kept} frames ({ocr_seconds / deduper.kept:.2f}s/frame), "
+          f"skipped {deduper.skipped} unchanged")
+    return dedupe_text_chunks(text_chunks)
+
+def report_ocr(text_chunks) -> str:
+    # One line per OCR'd frame, so prompt compaction can tell captions apart
+    extracted = "\n".join(text_chunks).strip()
     if extracted:
-        print("✅ OCR found text (first 300 chars):", extracted[:300])
+        print("✅ OCR found text (first 300 chars):", extracted[:300].replace("\n", " / "))
     else:
         print("⚠️ No readable on-screen text via OCR.")
     return extracted
 
+def extract_text_from_frames(frames_dir) -> str:
+    """OCR the grayscale frames the fused media pass already sampled."""
+    import cv2
+    print(f"📸 OCR scanning pre-sampled frames: {frames_dir}")
+    frames = (cv2.imread(os.path.join(frames_dir, name), cv2.IMREAD_GRAYSCALE) for name in sorted(os.listdir(frames_dir)))
+    text_chunks = ocr_frames(gray for gray in frames if gray is not None)
+    return report_ocr(text_chunks or [])
+
+def extract_text_with_ocr(video_path, frames_dir=None, frame_interval=None, video_md5=None) -> str:
+    """Sample frames and OCR any on-screen text, reusing a cached result when the video was seen before.
+
+    frame_interval is the sampling interval frames_dir was written with;
+    video_md5 saves re-hashing when the manifest already has it.
+    """
+    use_frames = bool(frames_dir and os.path.isdir(frames_dir))
+    cache = get_result_cache()
+    key = None
+    if cache:
+        sampling = {"source": "frames", "interval": frame_interval} if use_frames else \
+            {"source": "video", "interval": OCR_VIDEO_INTERVAL, "max_frames": OCR_MAX_FRAMES}
+        prefilter = [ocr_prefilter.MAD_MAX, ocr_prefilter.CHANGED_PIXELS_MAX,
+                     ocr_prefilter.TEXT_BANDS, ocr_prefilter.CROP_SCALE]
+        key = make_key(video_md5 or file_md5(video_path), OCR_LANGUAGES, sampling, prefilter)
+        cached = cache.get("ocr", key)
+        if cached is not None:
+            print(f"♻️ Cached OCR text for {video_path}")
+            return cached
+
+    pool = get_ocr_pool()
+    if pool is not None:
+        try:
+            text = pool.extract(video_path, frames_dir if use_frames else None)
+        except Exception as e:
+            print(f"❌ OCR worker failed on {video_path}: {e}")
+            return ""
+    elif use_frames:
+        text = extract_text_from_frames(frames_dir)
+    else:
+        text = extract_text_from_video(video_path)
+    if key and text:
+        cache.put("ocr", key, text)
+    return text
+
+def extract_text_from_video(video_path) -> str:
+    """OCR a frame every OCR_VIDEO_INTERVAL seconds, decoding only what the sampler needs."""
+    print(f"📸 OCR scanning video: {video_path}")
+    samples = sample_frames(video_path, OCR_VIDEO_INTERVAL, OCR_MAX_FRAMES or None)
+    text_chunks = ocr_frames(gray for _timestamp, gray in samples)
+    if text_chunks is None:
+        print("❌ Could not open video for OCR.")
+        return ""
+    return report_ocr(text_chunks)
+
 def generate_metadata(prompt_text) -> str:
     """Use Chat Completions to produce Title + Description."""
+    cache = get_result_cache()
+    key = metadata_cache_key(prompt_text) if cache else None
+    if key:
+        cached = cache.get("metadata", key)
+        if cached is not None:
+            print("♻️ Cached title/description")
+            return cached
     print("🤖 Generating title/description with OpenAI...")
     try:
-        resp = client.chat.completions.create(
+        resp = get_scheduler().call(
+            "chat", get_client().chat.completions.create,
+            tokens=chat_tokens(prompt_text),
             model=OPENAI_CHAT_MODEL,
             messages=[
-                {"role": "system", "content": "You are a YouTube Shorts coach for tech content. Be concise and punchy."},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt_text}
             ],
-            temperature=0.7,
+            temperature=CHAT_TEMPERATURE,
         )
-        return resp.choices[0].message.content.strip()
+        text = resp.choices[0].message.content.strip()
+        if key and text:
+            cache.put("metadata", key, text)
+        return text
     except Exception as e:
         print(f"❌ Chat API error: {e}")
         return ""
 
-def process_videos():
-    print("🚀 Script started!\n")
-    if not os.path.isdir(FINAL_DIR):
-        print(f"❌ Final directory not found: {FINAL_DIR}")
-        return
+def video_paths(entry):
+    """Where step 3 reads and writes the artifacts of one final-manifest entry."""
+    base = entry["video_id"]
+    return {
+        # The fused media pass in step 2 may already have written the WAV and OCR frames
+        "audio": entry.get("audio_path") or os.path.join(FINAL_DIR, base + ".wav"),
+        "frames": entry.get("frames_dir"),
+        "frame_interval": entry.get("frame_interval"),
+        "transcript": os.path.join(PROCESSED_TRANSCRIPTS_DIR, base + ".txt"),
+        "json": os.path.join(FINAL_DIR, base + ".json"),
+    }
 
-    files = [f for f in os.listdir(FINAL_DIR) if f.lower().endswith(".mp4")]
-    if not files:
-        print("ℹ️ No .mp4 files found in videos/final.")
-        return
+def is_usable(transcript):
+    return bool(transcript) and len(transcript.split()) >= 10
 
-    for file in files:
-        base = os.path.splitext(file)[0]
-        video_path = os.path.join(FINAL_DIR, file)
-        audio_path = os.path.join(FINAL_DIR, base + ".wav")
-        transcript_path = os.path.join(PROCESSED_TRANSCRIPTS_DIR, base + ".txt")
-        json_path = os.path.join(FINAL_DIR, base + ".json")
+def build_metadata_prompt(transcript):
+    return (
+        "Create a Title (<=10 words) and a Description (short summary + 10–12 trending hashtags) "
+        "for a YouTube Short about this transcript:\n\n"
+        f"{transcript}\n\n"
+        "Format strictly as:\n"
+        "Title: <title>\n"
+        "Description: <one short paragraph + hashtags>"
+    )
 
-        print(f"\n🧪 Processing {file}...")
+def parse_metadata(metadata_response):
+    """Parse the 'Title: ... / Description: ...' reply into a metadata dict."""
+    title = ""
+    description = ""
+    for line in metadata_response.splitlines():
+        lower = line.lower().strip()
+        if lower.startswith("title:"):
+            title = line.split(":", 1)[1].strip()
+        elif lower.startswith("description:"):
+            description = line.split(":", 1)[1].strip()
+        elif title and line.strip():
+            description += (" " + line.strip())
+    return {"title": title, "description": description}
 
-        extract_audio(video_path, audio_path)
-        transcript = transcribe_with_whisper(audio_path)
+def discard_audio(paths):
+    """Clean temp audio when a video is skipped."""
+    if os.path.exists(paths["audio"]):
+        os.remove(paths["audio"])
 
-        # Fallback to OCR if Whisper is too short
-        if not transcript or len(transcript.split()) < 10:
-            print("⚠️ Whisper transcript short. Falling back to OCR…")
-            transcript = extract_text_with_ocr(video_path)
+def save_metadata(entry, paths, transcript, metadata):
+    """Write the .json metadata and archive the audio and transcript."""
+    file = os.path.basename(entry["path"])
+    with open(paths["json"], "w") as f:
+        json.dump(metadata, f, indent=2)
 
-        if not transcript or len(transcript.split()) < 10:
-            print("❌ No usable transcript found. Skipping this video.")
-            # Clean temp audio if created
-            if os.path.exists(audio_path):
-                os.remove(audio_path)
-            continue
+    print(f"✅ Metadata saved for {file}!")
+    print(f"⬆️ Title: {metadata['title']}")
+    print(f"📝 Description: {metadata['description'][:120]}...")
 
-        # Build prompt for metadata
-        prompt = (
-            "Create a Title (<=10 words) and a Description (short summary + 10–12 trending hashtags) "
-            "for a YouTube Short about this transcript:\n\n"
-            f"{transcript}\n\n"
-            "Format strictly as:\n"
-            "Title: <title>\n"
-            "Description: <one short paragraph + hashtags>"
-        )
+    # Move processed artifacts (audio in the compact archive format)
+    if os.path.exists(paths["audio"]):
+        audio_encoding.archive_audio(paths["audio"], PROCESSED_AUDIO_DIR)
+    with open(paths["transcript"], "w") as f:
+        f.write(transcript)
+
+def process_video(entry):
+    """Transcribe (or OCR) one video and generate its metadata. Returns True if metadata was saved."""
+    video_path = entry["path"]
+    paths = video_paths(entry)
+    print(f"\n🧪 Processing {os.path.basename(video_path)}...")
+
+    if os.path.exists(paths["audio"]):
+        print("🎵 Using audio from the fused media pass:", paths["audio"])
+    else:
+        extract_audio(video_path, paths["audio"])
+    transcript = ""
+    upload_path = speech_audio(paths["audio"]) if os.path.exists(paths["audio"]) else None
+    if upload_path:
+        try:
+            transcript = transcribe_with_whisper(upload_path)
+        finally:
+            discard_speech_audio(paths["audio"], upload_path)
 
-        metadata_response = generate_metadata(prompt)
+    # Fallback to OCR if Whisper is too short
+    from_ocr = not is_usable(transcript)
+    if from_ocr:
+        print("⚠️ Whisper transcript short. Falling back to OCR…")
+        transcript = extract_text_with_ocr(video_path, paths["frames"], paths["frame_interval"], entry.get("md5"))
+    if paths["frames"]:
+        shutil.rmtree(paths["frames"], ignore_errors=True)
 
-        # Parse the response
-        title = ""
-        description = ""
-        for line in metadata_response.splitlines():
-            lower = line.lower().strip()
-            if lower.startswith("title:"):
-                title = line.split(":", 1)[1].strip()
-            elif lower.startswith("description:"):
-                description = line.split(":", 1)[1].strip()
-            elif title and line.strip():
-                description += (" " + line.strip())
+    if not is_usable(transcript):
+        print("❌ No usable transcript found. Skipping this video.")
+        discard_audio(paths)
+        return False
 
-        metadata = {"title": title, "description": description}
+    # The prompt gets a compacted transcript; the full one is archived
+    prompt_transcript = prompt_compaction.compact_for_prompt(transcript, ocr=from_ocr)
+    metadata = parse_metadata(generate_metadata(build_metadata_prompt(prompt_transcript)))
+    save_metadata(entry, paths, transcript, metadata)
+    return True
 
-        # Save .json metadata
-        with open(json_path, "w") as f:
-            json.dump(metadata, f, indent=2)
+def process_videos():
+    print("🚀 Script started!\n")
+    if not os.path.isdir(FINAL_DIR):
+        print(f"❌ Final directory not found: {FINAL_DIR}")
+        return
+    os.makedirs(PROCESSED_AUDIO_DIR, exist_ok=True)
+    os.makedirs(PROCESSED_TRANSCRIPTS_DIR, exist_ok=True)
 
-        print(f"✅ Metadata saved for {file}!")
-        print(f"⬆️ Title: {title}")
-        print(f"📝 Description: {description[:120]}...")
+    entries = [e for e in VideoManifest(FINAL_DIR).entries().values() if e["container"] == "mp4"]
+    if not entries:
+        print("ℹ️ No .mp4 files found in videos/final.")
+        return
+    get_client()  # Fail fast on a missing API key rather than once per video
 
-        # Move processed artifacts
-        if os.path.exists(audio_path):
-            shutil.move(audio_path, os.path.join(PROCESSED_AUDIO_DIR, os.path.basename(audio_path)))
-        with open(transcript_path, "w") as f:
-            f.write(transcript)
+    try:
+        if METADATA_ASYNC:
+            # Overlap Whisper/chat round-trips (and OCR fallbacks, with the OCR pool) across videos
+            from scripts.metadata_engine import process_entries
+            process_entries(entries)
+        else:
+            for entry in entries:
+                process_video(entry)
+    finally:
+        shutdown_ocr_pool()
 
+    if get_result_cache():
+        get_result_cache().report()
+    prompt_compaction.report()
+    get_scheduler().report()
     print("\n✅ All videos processed!")
 
 if __name__ == "__main__":
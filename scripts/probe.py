@@ -0,0 +1,86 @@
+import json
+import subprocess
+
+# ----- Shorts target ----------------------------------------------------------
+TARGET_WIDTH = 720
+TARGET_HEIGHT = 1280
+TARGET_VIDEO_CODEC = "h264"
+TARGET_PIX_FMT = "yuv420p"
+TARGET_AUDIO_CODEC = "aac"
+
+# Transcode decisions, cheapest first
+COPY = "copy"    # remux both streams as-is
+AUDIO = "audio"  # copy video, re-encode audio
+VIDEO = "video"  # re-encode video, copy audio
+FULL = "full"    # re-encode both
+
+
+def probe_video(path):
+    """Summarize a file's first video and audio streams with ffprobe, or None if it can't be read."""
+    cmd = ["ffprobe", "-v", "error", "-print_format", "json", "-show_streams", "-show_format", path]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+        data = json.loads(proc.stdout or "{}")
+    except (OSError, subprocess.TimeoutExpired, json.JSONDecodeError):
+        return None
+    if proc.returncode != 0 or not data.get("streams"):
+        return None
+
+    video = next((s for s in data["streams"] if s.get("codec_type") == "video"), None)
+    audio = next((s for s in data["streams"] if s.get("codec_type") == "audio"), None)
+    summary = {
+        "container": data.get("format", {}).get("format_name"),
+        "duration": float(data.get("format", {}).get("duration") or 0),
+        "video": None,
+        "audio": None,
+    }
+    if video:
+        rotation = int(video.get("tags", {}).get("rotate", 0) or 0)
+        for side_data in video.get("side_data_list", []):
+            rotation = rotation or int(side_data.get("rotation", 0) or 0)
+        summary["video"] = {
+            "codec": video.get("codec_name"),
+            "width": video.get("width"),
+            "height": video.get("height"),
+            "pix_fmt": video.get("pix_fmt"),
+            "rotation": rotation,
+            "frame_rate": video.get("avg_frame_rate"),
+        }
+    if audio:
+        summary["audio"] = {
+            "codec": audio.get("codec_name"),
+            "sample_rate": int(audio.get("sample_rate") or 0),
+            "channels": audio.get("channels"),
+        }
+    return summary
+
+
+def classify(probe):
+    """Decide which streams need re-encoding. Returns (decision, reasons)."""
+    if probe is None or probe["video"] is None:
+        return FULL, ["probe failed or no video stream"]
+
+    reasons = []
+    video = probe["video"]
+    if video["codec"] != TARGET_VIDEO_CODEC:
+        reasons.append(f"video codec {video['codec']}")
+    if (video["width"], video["height"]) != (TARGET_WIDTH, TARGET_HEIGHT):
+        reasons.append(f"resolution {video['width']}x{video['height']}")
+    if video["pix_fmt"] != TARGET_PIX_FMT:
+        reasons.append(f"pixel format {video['pix_fmt']}")
+    if video["rotation"]:
+        reasons.append(f"rotation {video['rotation']}")
+    video_ok = not reasons
+
+    audio = probe["audio"]
+    audio_ok = audio is None or audio["codec"] == TARGET_AUDIO_CODEC
+    if not audio_ok:
+        reasons.append(f"audio codec {audio['codec']}")
+
+    if video_ok and audio_ok:
+        return COPY, ["already Shorts-compliant"]
+    if video_ok:
+        return AUDIO, reasons
+    if audio_ok:
+        return VIDEO, reasons
+    return FULL, reasons
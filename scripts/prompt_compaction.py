@@ -0,0 +1,255 @@
+import os
+import re
+import threading
+from collections import Counter
+
+# ----- Settings --------------------------------------------------------------
+# Token budget for the transcript part of the metadata prompt (0 = no compaction)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "500"))
+# Long unpunctuated runs (OCR text) are cut into segments of at most this many words
+SEGMENT_MAX_WORDS = 30
+# A sentence whose word trigrams mostly appeared earlier is a repeat
+NGRAM_SIZE = 3
+NGRAM_OVERLAP_MAX = 0.8
+# Word n-grams seen before are dropped from OCR text (captions re-read on
+# every frame). Speech only loses back-to-back repeats and repeated sentences,
+# since cutting its n-grams breaks sentences that share a phrase
+OCR_REPEAT_NGRAM = 3
+# Symbol-only tokens that carry meaning ("ctrl + d", "$ 5", "str -> int")
+KEEP_SYMBOLS = {"+", "&", "%", "$", "=", "/", "-", "->", "=>", "==", "!=", "<=", ">="}
+# Glyphs OCR makes out of edges and texture; code and handles use some of them too
+JUNK_GLYPHS = set("|_~^`{}<>\\")
+# Hesitations Whisper transcribes verbatim (only sounds that are never real words: "mm" is millimetres)
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "hmm"}
+
+STOPWORDS = set("""
+a about above after again all also am an and any are as at be because been before being below between both but
+by can could did do does doing down during each few for from further get got had has have having he her here hers
+him his how i if in into is it its itself just let like me more most my no nor not now of off on once only or
+other our ours out over own really same she should so some such than that the their theirs them then there these
+they this those through to too under until up very was we were what when where which while who whom why will with
+would you your yours yeah oh um uh okay ok gonna wanna
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_PIECE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+# Whisper annotations such as [Music] or (applause), and music notes
+_ANNOTATION = re.compile(r"\[[^\]]{0,40}\]|\((?:music|applause|laughter|laughs|silence|inaudible)[^)]{0,20}\)|[♪♫]+",
+                         re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_totals_lock = threading.Lock()
+_totals = {"prompts": 0, "compacted": 0, "tokens_before": 0, "tokens_after": 0}
+
+
+def estimate_tokens(text):
+    """Fast local estimate of BPE tokens (GPT-4o-style tokenizers) for mostly-English text.
+
+    Common words are one token and long words split every ~6 letters;
+    digits go in groups of three and each symbol is its own token.
+    """
+    tokens = 0
+    for piece in _PIECE.findall(text):
+        if piece[0].isalpha():
+            tokens += 1 + (len(piece) - 1) // 6
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+def is_noise_token(token):
+    """Fillers and OCR debris: symbol runs, and tokens that are mostly junk glyphs.
+
+    A token with a real letter run that is at most half junk glyphs stays,
+    so code identifiers ("my_function", "__init__") and handles
+    ("@code_with_ana") survive; "l1|l" or "|~_a" don't.
+    """
+    core = token.strip(".,!?;:\"'()")
+    if core.lower() in FILLER_WORDS:
+        return True
+    if not re.search(r"[A-Za-z0-9]", core):
+        return core not in KEEP_SYMBOLS
+    if re.fullmatch(r"@?[A-Za-z_][\w.]*", core):
+        return False  # identifier, dotted name or handle
+    junk = sum(c in JUNK_GLYPHS for c in core)
+    return junk > 0 and (not re.search(r"[A-Za-z]{2}", core) or junk > len(core) / 2)
+
+
+def normalize(text):
+    """Drop annotations and noise tokens, collapse runs of whitespace (newlines kept as breaks)."""
+    text = _ANNOTATION.sub(" ", text)
+    lines = []
+    for line in text.splitlines():
+        words = [w for w in line.split() if not is_noise_token(w)]
+        if words:
+            lines.append(" ".join(words))
+    return "\n".join(lines)
+
+
+def collapse_repeats(words, max_n=8):
+    """Remove back-to-back repeats of the same 1..max_n word sequence ("follow for more follow for more")."""
+    keys = [_key(w) for w in words]
+    n = min(max_n, len(words) // 2)
+    while n >= 1:
+        i = 0
+        while i + 2 * n <= len(words):
+            if keys[i:i + n] == keys[i + n:i + 2 * n] and any(keys[i:i + n]):
+                del words[i + n:i + 2 * n]
+                del keys[i + n:i + 2 * n]
+            else:
+                i += 1
+        n -= 1
+    return words
+
+
+def _key(word):
+    return "".join(_WORD.findall(word.lower()))
+
+
+def drop_repeated_ngrams(text, n):
+    """Remove words covered by a word n-gram that already occurred earlier in the text (line breaks kept)."""
+    seen = set()
+    lines = []
+    for line in text.splitlines():
+        words = line.split()
+        keys = [_key(w) for w in words]
+        repeated = [False] * len(words)
+        for i in range(len(words) - n + 1):
+            gram = tuple(keys[i:i + n])
+            if gram in seen:
+                repeated[i:i + n] = [True] * n
+            else:
+                seen.add(gram)
+        kept = [w for w, dup in zip(words, repeated) if not dup]
+        if kept:
+            lines.append(" ".join(kept))
+    return "\n".join(lines)
+
+
+def split_sentences(text):
+    """Sentences, with long unpunctuated runs (OCR) cut into SEGMENT_MAX_WORDS-word segments."""
+    segments = []
+    for sentence in _SENTENCE_END.split(text):
+        words = collapse_repeats(sentence.split())
+        for i in range(0, len(words), SEGMENT_MAX_WORDS):
+            segment = " ".join(words[i:i + SEGMENT_MAX_WORDS])
+            if _WORD.search(segment.lower()):
+                segments.append(segment)
+    return segments
+
+
+def _ngrams(words, n=NGRAM_SIZE):
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def dedupe_sentences(sentences):
+    """Drop sentences already said: exact repeats, ones contained in a kept sentence, or mostly repeated n-grams."""
+    kept, kept_keys, seen_ngrams = [], [], set()
+    for sentence in sentences:
+        words = _WORD.findall(sentence.lower())
+        key = " ".join(words)
+        if not key or any(f" {key} " in f" {k} " for k in kept_keys):
+            continue
+        grams = _ngrams(words)
+        if grams and len(grams & seen_ngrams) / len(grams) >= NGRAM_OVERLAP_MAX:
+            continue
+        # A longer version of the previous sentence (captions building up) replaces it
+        if kept_keys and f" {kept_keys[-1]} " in f" {key} ":
+            kept.pop()
+            kept_keys.pop()
+        kept.append(sentence)
+        kept_keys.append(key)
+        seen_ngrams |= grams
+    return kept
+
+
+def select_sentences(sentences, budget):
+    """Most informative sentences that fit in budget tokens, in their original order.
+
+    SumBasic: a sentence scores the mean probability of its content words
+    in the transcript, and once it is picked its words' probabilities are
+    squared, so the next picks cover what hasn't been said yet. The
+    opening sentence (the hook) and hashtag lines go first.
+    """
+    words_per_sentence = [set(w for w in _WORD.findall(s.lower()) if w not in STOPWORDS) for s in sentences]
+    counts = Counter(w for words in words_per_sentence for w in words)
+    total = sum(counts.values()) or 1
+    probability = {w: c / total for w, c in counts.items()}
+    costs = [estimate_tokens(s) + 1 for s in sentences]
+
+    chosen, used = set(), 0
+    forced = [0] + [i for i, s in enumerate(sentences) if "#" in s]
+    while True:
+        candidates = [i for i in range(len(sentences)) if i not in chosen and used + costs[i] <= budget]
+        if not candidates:
+            break
+        best = next((i for i in forced if i in candidates), None)
+        if best is None:
+            best = max(candidates, key=lambda i: sum(probability[w] for w in words_per_sentence[i])
+                       / (len(words_per_sentence[i]) or 1))
+        chosen.add(best)
+        used += costs[best]
+        for w in words_per_sentence[best]:
+            probability[w] **= 2
+    return [s for i, s in enumerate(sentences) if i in chosen]
+
+
+def compact_transcript(text, budget=None, ocr=False):
+    """Shrink a transcript for the metadata prompt. Returns (compacted text, report dict).
+
+    Text already within budget tokens comes back as is, apart from
+    whitespace. Otherwise noise and repeated n-grams and sentences are
+    removed (more aggressively for ocr text); if the result is still over
+    budget, the most informative sentences are kept.
+    """
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    before = estimate_tokens(text)
+    report = {"tokens_before": before, "tokens_after": before, "sentences_before": 0, "sentences_after": 0}
+    if not budget or not text:
+        return text, report
+
+    if before <= budget:
+        # Fits already: don't rewrite what was said ("No no no way" stays)
+        compacted = "\n".join(" ".join(line.split()) for line in text.splitlines() if line.strip())
+    else:
+        cleaned = normalize(text)
+        if ocr:
+            cleaned = drop_repeated_ngrams(cleaned, OCR_REPEAT_NGRAM)
+        sentences = split_sentences(cleaned)
+        report["sentences_before"] = len(sentences)
+        sentences = dedupe_sentences(sentences)
+        if sum(estimate_tokens(s) + 1 for s in sentences) > budget:
+            sentences = select_sentences(sentences, budget)
+        compacted = " ".join(sentences)
+        report.update(sentences_after=len(sentences))
+    report["tokens_after"] = estimate_tokens(compacted)
+    with _totals_lock:
+        _totals["prompts"] += 1
+        _totals["compacted"] += report["tokens_after"] < before
+        _totals["tokens_before"] += before
+        _totals["tokens_after"] += report["tokens_after"]
+    return compacted, report
+
+
+def compact_for_prompt(text, label="", ocr=False):
+    """compact_transcript() with a one-line log when it changed anything."""
+    compacted, report = compact_transcript(text, ocr=ocr)
+    before, after = report["tokens_before"], report["tokens_after"]
+    if after < before:
+        print(f"🗜️ {label + ': ' if label else ''}prompt transcript ~{before} -> ~{after} tokens "
+              f"({1 - after / before:.0%} smaller, {report['sentences_before']} -> {report['sentences_after']} sentences)")
+    return compacted
+
+
+def report():
+    with _totals_lock:
+        totals = dict(_totals)
+    if totals["prompts"]:
+        saved = totals["tokens_before"] - totals["tokens_after"]
+        print(f"🗜️ Prompt compaction: {totals['compacted']}/{totals['prompts']} transcripts shortened, "
+              f"~{totals['tokens_before']} -> ~{totals['tokens_after']} tokens "
+              f"({saved / max(1, totals['tokens_before']):.0%} saved)")
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# ----- Settings --------------------------------------------------------------
+RESULT_CACHE_FILE = os.getenv("RESULT_CACHE_FILE", os.path.join("videos", "cache", "results.sqlite3"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL_DAYS", "30")) * 86400
+RESULT_CACHE_MAX_BYTES = int(float(os.getenv("RESULT_CACHE_MAX_MB", "100")) * 1024 ** 2)
+
+
+def make_key(*parts):
+    """Stable key for any JSON-serializable parts (hashes, model names, parameters)."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+class ResultCache:
+    """Persistent cache of API/OCR results (transcripts, OCR text, metadata) in SQLite.
+
+    Values are strings grouped by kind. Entries older than ttl seconds are
+    treated as misses and dropped, and once the stored values pass max_bytes
+    the least recently read entries are evicted. Hits and misses are counted
+    per kind for the current process.
+    """
+
+    def __init__(self, path=RESULT_CACHE_FILE, ttl=RESULT_CACHE_TTL, max_bytes=RESULT_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.counters = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "kind TEXT, key TEXT, value TEXT, size INTEGER, created REAL, accessed REAL, "
+            "PRIMARY KEY (kind, key))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+
+    def _count(self, kind, outcome):
+        counter = self.counters.setdefault(kind, {"hits": 0, "misses": 0})
+        counter[outcome] += 1
+
+    def get(self, kind, key):
+        """Cached value, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM results WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row is not None and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM results WHERE kind = ? AND key = ?", (kind, key))
+                row = None
+            if row is None:
+                self._count(kind, "misses")
+                return None
+            self._conn.execute("UPDATE results SET accessed = ? WHERE kind = ? AND key = ?", (now, kind, key))
+            self._count(kind, "hits")
+            return row[0]
+
+    def put(self, kind, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (kind, key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, value, len(value.encode()), now, now),
+            )
+            self._evict()
+
+    def _evict(self):
+        """Drop expired entries, then least recently read ones until under max_bytes."""
+        if self.ttl:
+            self._conn.execute("DELETE FROM results WHERE created < ?", (time.time() - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for kind, key, size in self._conn.execute(
+                "SELECT kind, key, size FROM results ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM results WHERE kind = ? AND key = ?", (kind, key))
+            total -= size
+
+    def stats(self):
+        """Per-kind hits, misses and hit rate for this process."""
+        with self._lock:
+            stats = {}
+            for kind, counter in self.counters.items():
+                lookups = counter["hits"] + counter["misses"]
+                stats[kind] = dict(counter, hit_rate=round(counter["hits"] / lookups, 3) if lookups else 0.0)
+            return stats
+
+    def report(self):
+        for kind, s in sorted(self.stats().items()):
+            print(f"   Result cache [{kind}]: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%} hit rate)")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
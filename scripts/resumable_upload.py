@@ -0,0 +1,184 @@
+import os
+import json
+import time
+from datetime import datetime
+
+from googleapiclient.errors import HttpError
+from googleapiclient.http import MediaFileUpload
+from scripts.api_scheduler import get_scheduler
+from scripts.manifest import atomic_write_json
+
+# ----- Settings --------------------------------------------------------------
+# Bytes per resumable-upload request. The protocol wants a multiple of 256 KB;
+# bigger chunks mean fewer round trips, smaller ones less to resend after a drop
+CHUNK_GRANULARITY = 256 * 1024
+UPLOAD_CHUNK_SIZE = max(1, int(float(os.getenv("YOUTUBE_UPLOAD_CHUNK_MB", "8")) * 1024 * 1024)
+                        // CHUNK_GRANULARITY) * CHUNK_GRANULARITY
+# One JSON file per video (keyed by its md5) with the session URI, offset and
+# the video's path. Kept outside videos/final, which every run empties
+SESSIONS_DIR = os.path.join("videos", ".upload_sessions")
+# YouTube keeps an unfinished upload session for about a week
+SESSION_MAX_AGE = float(os.getenv("YOUTUBE_UPLOAD_SESSION_MAX_AGE_HOURS", "144")) * 3600
+
+# The server lost the session (expired or already finalized): start over
+SESSION_GONE_STATUSES = {404, 410}
+
+MB = 1024 * 1024
+
+
+def session_path(session_key, sessions_dir=None):
+    return os.path.join(sessions_dir or SESSIONS_DIR, f"{session_key}.json")
+
+
+def load_session(session_key, size, sessions_dir=None):
+    """Saved {"uri", "offset", ...} for this file, or None if missing, stale or for different bytes."""
+    path = session_path(session_key, sessions_dir)
+    try:
+        with open(path) as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if session.get("size") != size or not session.get("uri") or time.time() - session.get("created", 0) > SESSION_MAX_AGE:
+        discard_session(session_key, sessions_dir)
+        return None
+    return session
+
+
+def save_session(session_key, session, sessions_dir=None):
+    path = session_path(session_key, sessions_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write_json(path, session)
+
+
+def discard_session(session_key, sessions_dir=None):
+    try:
+        os.remove(session_path(session_key, sessions_dir))
+    except FileNotFoundError:
+        pass
+
+
+def saved_sessions(sessions_dir=None):
+    """{session_key: session} for every session file on disk."""
+    sessions_dir = sessions_dir or SESSIONS_DIR
+    sessions = {}
+    for name in os.listdir(sessions_dir) if os.path.isdir(sessions_dir) else []:
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(sessions_dir, name)) as f:
+                sessions[name[:-len(".json")]] = json.load(f)
+        except (OSError, ValueError):
+            continue
+    return sessions
+
+
+def move_session(session_key, new_path, sessions_dir=None):
+    """Point a saved session at the video's new location after the file was moved."""
+    path = session_path(session_key, sessions_dir)
+    try:
+        with open(path) as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return
+    session["path"] = new_path
+    save_session(session_key, session, sessions_dir)
+
+
+def prune_sessions(sessions_dir=None):
+    """Discard sessions whose video is gone or that YouTube has expired. Returns how many."""
+    pruned = 0
+    for session_key, session in saved_sessions(sessions_dir).items():
+        if not os.path.exists(session.get("path") or "") or time.time() - session.get("created", 0) > SESSION_MAX_AGE:
+            discard_session(session_key, sessions_dir)
+            pruned += 1
+    return pruned
+
+
+class ChunkedFileUpload(MediaFileUpload):
+    """MediaFileUpload that gives each chunk to the HTTP client as bytes instead of a stream slice.
+
+    httplib2 resends a request once when the connection drops; a stream
+    body has been read by then, so the resend carries no data and hangs
+    until the socket times out.
+    """
+
+    def has_stream(self):
+        return False
+
+
+def insert_request(youtube, video_path, body, chunk_size):
+    media_class = ChunkedFileUpload if chunk_size > 0 else MediaFileUpload
+    media = media_class(video_path, chunksize=chunk_size, resumable=True, mimetype="video/*")
+    return youtube.videos().insert(part="snippet,status", body=body, media_body=media)
+
+
+def upload_video(youtube, video_path, body, session_key, chunk_size=None, sessions_dir=None):
+    """Upload video_path as a chunked resumable videos.insert. Returns (response, stats).
+
+    The session URI and committed offset are saved after every chunk, so
+    an upload interrupted by a crash continues from the last chunk the
+    server confirmed the next time the same file (session_key, e.g. its
+    md5) is uploaded. Each chunk goes through the API scheduler, which
+    retries 429/5xx and connection errors with backoff; a retry first asks
+    the server how much it has, then resends from there.
+    """
+    chunk_size = chunk_size or UPLOAD_CHUNK_SIZE
+    size = os.path.getsize(video_path)
+    label = os.path.basename(video_path)
+    request = insert_request(youtube, video_path, body, chunk_size)
+    session = load_session(session_key, size, sessions_dir)
+    resumed_from = None
+    if session:
+        request.resumable_uri = session["uri"]
+        request.resumable_progress = session.get("offset", 0)
+        # Makes the next next_chunk() ask the server for the committed range
+        # ("Content-Range: bytes */size") before sending anything
+        request._in_error_state = True
+        resumed_from = request.resumable_progress
+        print(f"↩️ {label}: resuming upload session at {resumed_from / MB:.1f}/{size / MB:.1f} MB")
+    else:
+        session = {"uri": None, "offset": 0, "size": size, "path": video_path, "created": time.time(),
+                   "started_at": datetime.now().isoformat()}
+
+    stats = {"bytes": size, "chunks": 0, "attempts": 0, "sent": 0, "resumed_from": resumed_from}
+
+    def send_chunk():
+        stats["attempts"] += 1
+        try:
+            return request.next_chunk()
+        finally:
+            # Persist as soon as the session exists, even if this chunk failed
+            if request.resumable_uri and (request.resumable_uri != session["uri"]
+                                          or request.resumable_progress != session["offset"]):
+                session.update(uri=request.resumable_uri, offset=request.resumable_progress)
+                save_session(session_key, session, sessions_dir)
+
+    start = time.perf_counter()
+    response = None
+    while response is None:
+        offset = request.resumable_progress
+        chunk_start = time.perf_counter()
+        try:
+            status, response = get_scheduler().call("youtube_upload", send_chunk)
+        except HttpError as e:
+            if resumed_from is None or e.resp.status not in SESSION_GONE_STATUSES:
+                raise
+            print(f"⚠️ {label}: saved upload session is gone ({e.resp.status}), starting over")
+            discard_session(session_key, sessions_dir)
+            return upload_video(youtube, video_path, body, session_key, chunk_size, sessions_dir)
+        seconds = time.perf_counter() - chunk_start
+        done = size if response is not None else request.resumable_progress
+        # A retry or resume may first learn of bytes committed earlier; one request sends at most a chunk
+        sent = min(max(0, done - offset), chunk_size)
+        stats["chunks"] += 1
+        stats["sent"] += sent
+        print(f"⬆️ {label}: {done / MB:.1f}/{size / MB:.1f} MB ({done / max(1, size):.0%}), "
+              f"chunk {sent / MB:.1f} MB in {seconds:.2f}s ({sent / MB / max(seconds, 1e-6):.1f} MB/s)")
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["retries"] = stats["attempts"] - stats["chunks"]
+    discard_session(session_key, sessions_dir)
+    print(f"📶 {label}: {stats['sent'] / MB:.1f} MB in {stats['seconds']:.1f}s "
+          f"({stats['sent'] / MB / max(stats['seconds'], 1e-6):.1f} MB/s), {stats['chunks']} chunks, "
+          f"{stats['retries']} retried")
+    return response, stats
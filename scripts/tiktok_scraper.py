@@ -1,77 +1,164 @@
 import os
-import json
-import subprocess
+import time
+import threading
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urlparse
 import requests
+from scripts.manifest import VideoManifest, atomic_write_json
+from scripts.video_ids import DownloadedIndex, canonical_video_id
+from scripts.ytdlp_backend import DownloadError, get_backend
+
+# ----- Download pool settings -------------------------------------------------
+# Number of concurrent yt-dlp downloads
+DOWNLOAD_WORKERS = int(os.getenv("TIKTOK_DOWNLOAD_WORKERS", "4"))
+# Max new videos per run (0 = no limit)
+MAX_DOWNLOADS_PER_RUN = int(os.getenv("TIKTOK_MAX_DOWNLOADS", "5"))
+# Minimum seconds between two download starts against the same host
+PER_HOST_INTERVAL = float(os.getenv("TIKTOK_PER_HOST_INTERVAL", "1.0"))
+
+
+class HostRateLimiter:
+    """Spaces out request starts per host so a worker pool doesn't burst one CDN."""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        if self.min_interval <= 0:
+            return
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
 
 class TikTokScraper:
-    def __init__(self):
+    def __init__(self, max_workers=None, max_downloads=None, per_host_interval=None, backend=None):
         self.output_dir = os.path.join("videos", "raw_videos")
         self.metadata_file = "tiktok_data.json"
         os.makedirs(self.output_dir, exist_ok=True)
+        self.manifest = VideoManifest(self.output_dir)
+
+        self.max_workers = max(1, max_workers or DOWNLOAD_WORKERS)
+        self.max_downloads = MAX_DOWNLOADS_PER_RUN if max_downloads is None else max_downloads
+        self.rate_limiter = HostRateLimiter(
+            PER_HOST_INTERVAL if per_host_interval is None else per_host_interval
+        )
+        # Shared yt-dlp backend ("inprocess" or "subprocess"), see scripts/ytdlp_backend.py
+        self.backend = backend if hasattr(backend, "download") else get_backend(backend)
+
+        # Guards the per-run counters and the metadata file
+        self._lock = threading.Condition()
+        self._in_flight = 0
+        self._completed = 0
+        self._active_ids = set()
         
         # Load existing metadata to track downloaded videos
         self.downloaded_videos = self.load_downloaded_videos()
     
     def load_downloaded_videos(self):
-        """Load list of already downloaded video IDs to prevent duplicates"""
-        if os.path.exists(self.metadata_file):
-            try:
-                with open(self.metadata_file, 'r') as f:
-                    data = json.load(f)
-                    return set(data.get('downloaded_videos', []))
-            except (json.JSONDecodeError, FileNotFoundError):
-                return set()
-        return set()
+        """Open the persistent index of downloaded video IDs to prevent duplicates"""
+        index = DownloadedIndex()
+        # Carry over the ID list older runs kept in tiktok_data.json
+        index.migrate_from_json(self.metadata_file)
+        return index
     
     def save_downloaded_videos(self):
-        """Save the list of downloaded video IDs"""
-        data = {
-            'downloaded_videos': list(self.downloaded_videos),
-            'last_updated': datetime.now().isoformat()
-        }
-        with open(self.metadata_file, 'w') as f:
-            json.dump(data, f, indent=2)
+        """Save a summary of downloaded videos (the IDs themselves live in the index)"""
+        with self._lock:
+            data = {
+                'downloaded_count': len(self.downloaded_videos),
+                'last_updated': datetime.now().isoformat()
+            }
+            atomic_write_json(self.metadata_file, data)
+
+    def mark_downloaded(self, video_id):
+        """Record a finished download and persist it right away."""
+        with self._lock:
+            self.downloaded_videos.add(video_id)
+        self.save_downloaded_videos()
     
     def download_video(self, video_url, video_id):
         """Download a single video using yt-dlp"""
-        if video_id in self.downloaded_videos:
+        with self._lock:
+            already_downloaded = video_id in self.downloaded_videos or video_id in self._active_ids
+            if not already_downloaded:
+                self._active_ids.add(video_id)
+        if already_downloaded:
             print(f"⏭️ Video {video_id} already downloaded, skipping...")
             return None
-        
+
+        try:
+            return self._fetch(video_url, video_id)
+        finally:
+            with self._lock:
+                self._active_ids.discard(video_id)
+
+    def _fetch(self, video_url, video_id):
+        """Download one URL through the configured yt-dlp backend."""
         filename = f"{video_id}.%(ext)s"
         filepath = os.path.join(self.output_dir, filename)
         
-        cmd = [
-            "yt-dlp",
-            "-o", filepath,
-            "--format", "best",
-            "--no-playlist",
-            "--no-warnings",
-            video_url
-        ]
-        
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-            if result.returncode == 0:
-                # Find the actual downloaded file
-                for file in os.listdir(self.output_dir):
-                    if file.startswith(video_id):
-                        downloaded_file = os.path.join(self.output_dir, file)
-                        print(f"✅ Downloaded: {file}")
-                        self.downloaded_videos.add(video_id)
-                        return downloaded_file
-            else:
-                print(f"❌ Failed to download {video_id}: {result.stderr}")
-                return None
-                
-        except subprocess.TimeoutExpired:
-            print(f"❌ Download timeout for {video_id}")
+            self.rate_limiter.wait(video_url)
+            downloaded_file, info = self.backend.download(video_url, filepath)
+        except DownloadError as e:
+            print(f"❌ Failed to download {video_id}: {e}")
             return None
         except Exception as e:
             print(f"❌ Error downloading {video_id}: {e}")
             return None
+
+        print(f"✅ Downloaded: {os.path.basename(downloaded_file)}")
+        self.manifest.record(video_id, downloaded_file, container=info.get("ext"), source_url=video_url)
+        self.mark_downloaded(video_id)
+        return downloaded_file
+
+    def _claim_slot(self):
+        """Reserve one of the per-run download slots, waiting on in-flight jobs if needed."""
+        with self._lock:
+            while True:
+                if not self.max_downloads or self._completed + self._in_flight < self.max_downloads:
+                    self._in_flight += 1
+                    return True
+                if self._in_flight == 0:
+                    return False
+                # Limit reached only if the in-flight downloads succeed; wait and see
+                self._lock.wait()
+
+    def _release_slot(self, succeeded):
+        with self._lock:
+            self._in_flight -= 1
+            if succeeded:
+                self._completed += 1
+            self._lock.notify_all()
+
+    def _download_job(self, index, total, url):
+        video_id = canonical_video_id(url)
+        if not video_id:
+            print(f"\n[{index + 1}/{total}] ⚠️ No TikTok video ID in {url}, skipping...")
+            return None
+        # Cheap duplicate pre-check before taking a slot or touching the network
+        if video_id in self.downloaded_videos:
+            print(f"\n[{index + 1}/{total}] ⏭️ Video {video_id} already downloaded, skipping...")
+            return None
+        if not self._claim_slot():
+            return None
+        video_file = None
+        try:
+            print(f"\n[{index + 1}/{total}] Processing: {video_id}")
+            video_file = self.download_video(url, video_id)
+            return video_file
+        finally:
+            self._release_slot(video_file is not None)
     
     def scrape_and_download(self):
         """Download videos from a curated list of popular tech TikTok URLs"""
@@ -91,20 +178,18 @@ class TikTokScraper:
             print("   4. Add it to the tech_video_urls list in tiktok_scraper.py")
             return 0
         
-        print(f"🎬 Attempting to download {len(tech_video_urls)} tech videos...")
+        print(f"🎬 Attempting to download {len(tech_video_urls)} tech videos "
+              f"({self.max_workers} workers, {self.backend.name} yt-dlp)...")
         
-        downloaded_count = 0
-        for i, url in enumerate(tech_video_urls):
-            if downloaded_count >= 5:  # Limit to 5 videos per run
-                break
-                
-            # Extract video ID from URL (strip query parameters)
-            video_id = url.split('/')[-1].split('?')[0]
-            print(f"\n[{i+1}/{len(tech_video_urls)}] Processing: {video_id}")
-            
-            video_file = self.download_video(url, video_id)
-            if video_file:
-                downloaded_count += 1
+        self._in_flight = 0
+        self._completed = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = []
+            for i, url in enumerate(tech_video_urls):
+                futures.append(pool.submit(self._download_job, i, len(tech_video_urls), url))
+            downloaded_count = sum(1 for future in futures if future.result())
+        self.backend.close()
         
         # Save metadata
         self.save_downloaded_videos()
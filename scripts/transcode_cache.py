@@ -0,0 +1,154 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+import subprocess
+
+# ----- Settings --------------------------------------------------------------
+TRANSCODE_CACHE_DIR = os.getenv("TRANSCODE_CACHE_DIR", os.path.join("videos", "cache", "transcode"))
+TRANSCODE_CACHE_MAX_BYTES = int(float(os.getenv("TRANSCODE_CACHE_MAX_GB", "20")) * 1024 ** 3)
+
+# Argument values that vary per run without changing what gets encoded
+VOLATILE_OPTIONS = {"-threads"}
+
+
+def ffmpeg_version():
+    try:
+        out = subprocess.run(["ffmpeg", "-version"], capture_output=True, text=True).stdout
+        return out.splitlines()[0] if out else "unknown"
+    except OSError:
+        return "unknown"
+
+
+def link_or_copy(src, dst):
+    """Hard-link when possible (same filesystem), otherwise copy."""
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class TranscodeCache:
+    """Content-addressed store for ffmpeg outputs with size-bounded LRU eviction.
+
+    Entries are keyed on the md5 of the input bytes plus the ffmpeg argument
+    vector (with file paths swapped for placeholders), so the same clip under
+    a new ID or a retried run reuses earlier work. Each entry is a directory
+    of named outputs; its mtime is bumped on every hit and the least recently
+    used entries are evicted once the store grows past max_bytes.
+    """
+
+    def __init__(self, root=TRANSCODE_CACHE_DIR, max_bytes=TRANSCODE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._ffmpeg_version = None
+        os.makedirs(root, exist_ok=True)
+
+    def key(self, input_md5, command, paths):
+        """Cache key for a command. paths maps placeholder names to the paths used in it."""
+        if self._ffmpeg_version is None:
+            self._ffmpeg_version = ffmpeg_version()
+        by_path = {path: f"{{{name}}}" for name, path in paths.items() if path}
+        normalized = []
+        skip_next = False
+        for arg in command[1:]:
+            if skip_next:
+                skip_next = False
+                continue
+            if arg in VOLATILE_OPTIONS:
+                skip_next = True
+                continue
+            for path, placeholder in by_path.items():
+                arg = arg.replace(path, placeholder)
+            normalized.append(arg)
+        material = json.dumps([input_md5, self._ffmpeg_version, normalized])
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.root, key[:2], key)
+
+    def restore(self, key, outputs):
+        """Copy a cached entry into place. outputs maps names to destination paths/dirs."""
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            with self._lock:
+                self.misses += 1
+            return False
+
+        for name, dst in outputs.items():
+            src = os.path.join(entry_dir, name)
+            if os.path.isdir(src):
+                shutil.rmtree(dst, ignore_errors=True)
+                os.makedirs(dst)
+                for frame in os.listdir(src):
+                    link_or_copy(os.path.join(src, frame), os.path.join(dst, frame))
+            elif os.path.exists(src):
+                link_or_copy(src, dst)
+        os.utime(entry_dir)  # LRU bookkeeping
+        with self._lock:
+            self.hits += 1
+        return True
+
+    def store(self, key, outputs):
+        """Add freshly encoded outputs (name -> file or directory) to the cache."""
+        entry_dir = self._entry_dir(key)
+        if os.path.isdir(entry_dir):
+            return
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        os.makedirs(tmp_dir)
+        size = 0
+        for name, src in outputs.items():
+            dst = os.path.join(tmp_dir, name)
+            if os.path.isdir(src):
+                os.makedirs(dst)
+                for frame in os.listdir(src):
+                    link_or_copy(os.path.join(src, frame), os.path.join(dst, frame))
+                    size += os.path.getsize(os.path.join(dst, frame))
+            elif os.path.exists(src):
+                link_or_copy(src, dst)
+                size += os.path.getsize(dst)
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump({"size": size, "created": time.time(), "outputs": sorted(outputs)}, f)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)  # another worker stored it first
+            return
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes."""
+        with self._lock:
+            entries = []
+            total = 0
+            for shard in os.listdir(self.root):
+                shard_dir = os.path.join(self.root, shard)
+                if not os.path.isdir(shard_dir):
+                    continue
+                for key in os.listdir(shard_dir):
+                    entry_dir = os.path.join(shard_dir, key)
+                    try:
+                        with open(os.path.join(entry_dir, "meta.json")) as f:
+                            size = json.load(f)["size"]
+                        entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+                    except (OSError, ValueError, KeyError):
+                        continue
+                    total += size
+            for _mtime, size, entry_dir in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,168 @@
+import os
+import json
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts.api_scheduler import error_status
+from scripts.manifest import atomic_write_json
+
+# ----- Settings --------------------------------------------------------------
+# Videos uploading at once. One upload rarely fills the uplink on its own
+UPLOAD_WORKERS = int(os.getenv("YOUTUBE_UPLOAD_WORKERS", "3"))
+# YouTube Data API daily quota, and what one videos.insert costs out of it
+DAILY_QUOTA = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+INSERT_COST = int(os.getenv("YOUTUBE_INSERT_COST", "1600"))
+QUOTA_LEDGER = "youtube_quota.json"
+# The quota resets at midnight Pacific time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+LEDGER_DAYS_KEPT = 30
+
+# 403 reasons meaning no more uploads today, whatever our ledger says
+QUOTA_ERROR_REASONS = ("quotaExceeded", "dailyLimitExceeded", "uploadLimitExceeded")
+
+DONE, DEFERRED, FAILED = "done", "deferred", "failed"
+
+
+def quota_window(now=None):
+    """The quota day (Pacific date) that now falls in, as "YYYY-MM-DD"."""
+    return (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE).date().isoformat()
+
+
+def next_reset(now=None):
+    """Local datetime at which the current quota day ends."""
+    now = (now or datetime.now(QUOTA_TIMEZONE)).astimezone(QUOTA_TIMEZONE)
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), QUOTA_TIMEZONE)
+    return midnight.astimezone()
+
+
+def is_quota_error(error):
+    if error_status(error) not in (403, 429):
+        return False
+    content = getattr(error, "content", b"") or b""
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", "replace")
+    return any(reason in content or reason in str(error) for reason in QUOTA_ERROR_REASONS)
+
+
+class QuotaLedger:
+    """Quota units spent per quota day, persisted so every run of the day shares one budget.
+
+    Units are taken before a call goes out (spend()), so concurrent
+    uploads can't overshoot the day together. If the API reports the
+    quota gone anyway (another client on the same project, a cost
+    change), exhaust() closes the day.
+    """
+
+    def __init__(self, path=QUOTA_LEDGER, daily_quota=None):
+        self.path = path
+        self.daily_quota = DAILY_QUOTA if daily_quota is None else daily_quota
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f).get("days", {})
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, days):
+        days = dict(sorted(days.items())[-LEDGER_DAYS_KEPT:])
+        atomic_write_json(self.path, {"daily_quota": self.daily_quota, "days": days})
+
+    def used(self):
+        with self._lock:
+            return self._load().get(quota_window(), {}).get("used", 0)
+
+    def remaining(self):
+        return max(0, self.daily_quota - self.used())
+
+    def spend(self, units, call="videos.insert"):
+        """Take units from today's quota. Returns False (and takes nothing) if they don't fit."""
+        with self._lock:
+            days = self._load()
+            day = days.setdefault(quota_window(), {"used": 0, "calls": {}})
+            if day["used"] + units > self.daily_quota:
+                return False
+            day["used"] += units
+            day["calls"][call] = day["calls"].get(call, 0) + 1
+            self._save(days)
+            return True
+
+    def refund(self, units, call="videos.insert"):
+        """Give back units taken for a call that never reached the API."""
+        with self._lock:
+            days = self._load()
+            day = days.get(quota_window())
+            if day is None:
+                return
+            day["used"] = max(0, day["used"] - units)
+            day["calls"][call] = max(0, day["calls"].get(call, 0) - 1)
+            self._save(days)
+
+    def exhaust(self):
+        """The API says today's quota is gone: mark it used up."""
+        with self._lock:
+            days = self._load()
+            day = days.setdefault(quota_window(), {"used": 0, "calls": {}})
+            day["used"] = max(day["used"], self.daily_quota)
+            self._save(days)
+
+
+def upload_priority(entry, metadata):
+    """Sort key: a higher "priority" in the video's metadata JSON first, then the video waiting longest."""
+    try:
+        priority = float(metadata.get("priority", 0))
+    except (TypeError, ValueError):
+        priority = 0.0
+    return (-priority, entry.get("queued_at") or entry.get("added_at", ""), entry["video_id"])
+
+
+def run_uploads(items, upload, ledger=None, workers=None, cost=None, label=str, needs_quota=None):
+    """Run upload(item) for items (highest priority first) on up to workers threads.
+
+    Each upload first takes cost quota units from the ledger, unless
+    needs_quota(item) says it doesn't (it resumes a videos.insert that was
+    paid for when it started). The units are given back if the upload
+    fails without an API response and without having opened a session.
+    Once the day's quota is spent, or the API reports it exceeded, the
+    items not yet started are deferred rather than failed. Returns {item
+    index: (DONE, result) | (DEFERRED, None) | (FAILED, error)}.
+    """
+    ledger = ledger or QuotaLedger()
+    workers = workers or UPLOAD_WORKERS
+    cost = INSERT_COST if cost is None else cost
+    quota_gone = threading.Event()
+    outcomes = {}
+
+    def run(index, item):
+        # Workers take items in submission order, so priority holds for who gets quota
+        charged = needs_quota is None or needs_quota(item)
+        if charged and (quota_gone.is_set() or not ledger.spend(cost)):
+            quota_gone.set()
+            outcomes[index] = (DEFERRED, None)
+            return
+        try:
+            outcomes[index] = (DONE, upload(item))
+        except Exception as e:
+            if is_quota_error(e):
+                ledger.exhaust()
+                quota_gone.set()
+                outcomes[index] = (DEFERRED, None)
+            else:
+                # No HTTP status and still no session: the insert never got to the server
+                if charged and error_status(e) is None and (needs_quota is None or needs_quota(item)):
+                    ledger.refund(cost)
+                print(f"❌ Upload failed for {label(item)}: {e}")
+                outcomes[index] = (FAILED, e)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for index, item in enumerate(items):
+            pool.submit(run, index, item)
+
+    deferred = [label(items[i]) for i, (outcome, _) in sorted(outcomes.items()) if outcome == DEFERRED]
+    if deferred:
+        print(f"⏸️ YouTube quota for today is used up ({ledger.used()}/{ledger.daily_quota} units): "
+              f"{len(deferred)} videos deferred until {next_reset():%Y-%m-%d %H:%M} ({', '.join(deferred)})")
+    return outcomes
@@ -0,0 +1,140 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+# ----- Paths -----------------------------------------------------------------
+INDEX_FILE = "downloaded_ids.sqlite3"
+LEGACY_METADATA_FILE = "tiktok_data.json"
+
+# ----- URL parsing -----------------------------------------------------------
+VIDEO_PATH_RE = re.compile(r"/(?:video|v|photo)/(\d+)")
+NUMERIC_ID_RE = re.compile(r"^(\d+)(?:[?#].*)?$")
+SHORT_LINK_HOSTS = {"vm.tiktok.com", "vt.tiktok.com"}
+
+
+def is_short_link(url):
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    return host in SHORT_LINK_HOSTS or (host.endswith("tiktok.com") and parsed.path.startswith("/t/"))
+
+
+def resolve_short_link(url, timeout=10):
+    """Follow a vm./vt./tiktok.com/t/ share link to the full video URL."""
+    import requests
+
+    response = requests.head(url, allow_redirects=True, timeout=timeout)
+    return response.url
+
+
+def canonical_video_id(value, resolve_short_links=True):
+    """Numeric TikTok video ID for a URL or stored ID, or None if there isn't one.
+
+    Handles /@user/video/<id> URLs (with or without query strings), bare IDs
+    with stray query strings left over from older runs, and share short links
+    (resolved with one HEAD request).
+    """
+    value = (value or "").strip()
+    match = NUMERIC_ID_RE.match(value)
+    if match:
+        return match.group(1)
+
+    parsed = urlparse(value)
+    match = VIDEO_PATH_RE.search(parsed.path)
+    if match:
+        return match.group(1)
+
+    query = parse_qs(parsed.query)
+    for key in ("item_id", "share_item_id"):
+        if query.get(key) and query[key][0].isdigit():
+            return query[key][0]
+
+    if resolve_short_links and is_short_link(value):
+        try:
+            return canonical_video_id(resolve_short_link(value), resolve_short_links=False)
+        except Exception as e:
+            print(f"❌ Could not resolve short link {value}: {e}")
+    return None
+
+
+class DownloadedIndex:
+    """Persistent set of downloaded video IDs, stored as SQLite integer keys.
+
+    IDs live in the rowid B-tree, so opening the index costs nothing no matter
+    how many IDs it holds and every membership check is a single key lookup.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS downloaded (id INTEGER PRIMARY KEY)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def __contains__(self, video_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM downloaded WHERE id = ?", (int(video_id),)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM downloaded").fetchone()[0]
+
+    def __iter__(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM downloaded ORDER BY id").fetchall()
+        return (str(row[0]) for row in rows)
+
+    def add(self, video_id):
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO downloaded (id) VALUES (?)", (int(video_id),))
+
+    def add_many(self, video_ids):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO downloaded (id) VALUES (?)",
+                ((int(v),) for v in video_ids)
+            )
+            self._conn.execute("COMMIT")
+
+    def migrate_from_json(self, metadata_file=LEGACY_METADATA_FILE):
+        """One-shot import of the legacy downloaded_videos list. Returns IDs imported."""
+        with self._lock:
+            done = self._conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if done or not os.path.exists(metadata_file):
+            return 0
+        try:
+            with open(metadata_file) as f:
+                legacy = json.load(f).get("downloaded_videos", [])
+        except (json.JSONDecodeError, AttributeError):
+            legacy = []
+
+        ids = {canonical_video_id(v, resolve_short_links=False) for v in legacy}
+        ids.discard(None)
+        self.add_many(ids)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('migrated_json', ?)",
+                (datetime.now().isoformat(),)
+            )
+        if legacy:
+            print(f"📦 Migrated {len(legacy)} legacy entries ({len(ids)} unique videos) into {self.path}")
+        return len(ids)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+if __name__ == "__main__":
+    # python -m scripts.video_ids [tiktok_data.json]
+    index = DownloadedIndex()
+    index.migrate_from_json(sys.argv[1] if len(sys.argv) > 1 else LEGACY_METADATA_FILE)
+    print(f"✅ {len(index)} video IDs in {index.path}")
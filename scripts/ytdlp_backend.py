@@ -0,0 +1,129 @@
+import os
+import json
+import threading
+import subprocess
+
+# ----- Settings --------------------------------------------------------------
+# "inprocess" drives yt-dlp through its Python API, "subprocess" spawns the CLI
+YTDLP_BACKEND = os.getenv("YTDLP_BACKEND", "inprocess")
+YTDLP_TIMEOUT = int(os.getenv("YTDLP_TIMEOUT", "120"))
+
+
+class DownloadError(Exception):
+    """Raised when a backend could not fetch a URL."""
+
+
+class InProcessBackend:
+    """Runs yt-dlp inside this process.
+
+    Each worker thread gets its own long-lived YoutubeDL instance (they are not
+    thread-safe), so extractors are imported once and HTTP connections are
+    reused across URLs.
+    """
+
+    name = "inprocess"
+
+    def __init__(self, timeout=YTDLP_TIMEOUT):
+        from yt_dlp import YoutubeDL  # ImportError lets get_backend fall back
+
+        self._youtube_dl_cls = YoutubeDL
+        self.timeout = timeout
+        self._local = threading.local()
+        self._instances = []
+        self._instances_lock = threading.Lock()
+
+    def _ydl(self):
+        ydl = getattr(self._local, "ydl", None)
+        if ydl is None:
+            ydl = self._youtube_dl_cls({
+                "format": "best",
+                "noplaylist": True,
+                "no_warnings": True,
+                "quiet": True,
+                "noprogress": True,
+                "socket_timeout": self.timeout,
+                "outtmpl": {"default": "%(id)s.%(ext)s"},
+            })
+            self._local.ydl = ydl
+            with self._instances_lock:
+                self._instances.append(ydl)
+        return ydl
+
+    def download(self, url, outtmpl):
+        """Download url to outtmpl. Returns (filepath, info_dict)."""
+        from yt_dlp.utils import DownloadError as YtDlpDownloadError
+
+        ydl = self._ydl()
+        ydl.params["outtmpl"]["default"] = outtmpl
+        try:
+            info = ydl.extract_info(url, download=True)
+        except YtDlpDownloadError as e:
+            raise DownloadError(str(e)) from e
+        if not info:
+            raise DownloadError("yt-dlp returned no info")
+
+        info = ydl.sanitize_info(info)
+        downloads = info.get("requested_downloads") or [{}]
+        filepath = downloads[0].get("filepath") or ydl.prepare_filename(info)
+        return filepath, info
+
+    def close(self):
+        with self._instances_lock:
+            instances, self._instances = self._instances, []
+            self._local = threading.local()
+        for ydl in instances:
+            close = getattr(ydl, "close", None)
+            if close:
+                close()
+
+
+class SubprocessBackend:
+    """Fallback mode: one yt-dlp CLI process per URL."""
+
+    name = "subprocess"
+
+    def __init__(self, timeout=YTDLP_TIMEOUT):
+        self.timeout = timeout
+
+    def download(self, url, outtmpl):
+        """Download url to outtmpl. Returns (filepath, info_dict)."""
+        cmd = [
+            "yt-dlp",
+            "-o", outtmpl,
+            "--format", "best",
+            "--no-playlist",
+            "--no-warnings",
+            "--no-simulate",
+            # Print the final info dict (including the real filepath) once the file is in place
+            "--print", "after_move:%()j",
+            url
+        ]
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=self.timeout)
+        except subprocess.TimeoutExpired as e:
+            raise DownloadError(f"timed out after {self.timeout}s") from e
+        if result.returncode != 0:
+            raise DownloadError(result.stderr.strip())
+
+        lines = result.stdout.strip().splitlines()
+        try:
+            info = json.loads(lines[-1])
+        except (IndexError, json.JSONDecodeError) as e:
+            raise DownloadError("could not parse yt-dlp output") from e
+        return info["filepath"], info
+
+    def close(self):
+        pass
+
+
+def get_backend(mode=None, timeout=YTDLP_TIMEOUT):
+    """Build the configured download backend, falling back to the CLI if needed."""
+    mode = mode or YTDLP_BACKEND
+    if mode == InProcessBackend.name:
+        try:
+            return InProcessBackend(timeout=timeout)
+        except ImportError:
+            print("⚠️ yt_dlp module not importable, falling back to the yt-dlp CLI.")
+    elif mode != SubprocessBackend.name:
+        raise ValueError(f"Unknown yt-dlp backend: {mode}")
+    return SubprocessBackend(timeout=timeout)
@@ -4,14 +4,26 @@ import time
 import shutil
 import pickle
 import hashlib
+import threading
+from datetime import datetime
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from scripts.manifest import FINAL_DIR, VideoManifest
+from scripts.api_scheduler import get_scheduler, is_retryable
+from scripts.resumable_upload import load_session, move_session, prune_sessions, saved_sessions, upload_video
+from scripts.upload_queue import run_uploads, upload_priority, DONE, DEFERRED, FAILED
 
 # Scopes for YouTube Data API
 SCOPES = ["https://www.googleapis.com/auth/youtube.upload"]
 
+# Videos waiting for another upload run; the workspace cleanup leaves them alone
+DEFERRED_DIR = os.path.join("videos", "deferred")
+# Videos the API rejected for good (bad metadata, auth); kept for a look, never retried
+FAILED_DIR = os.path.join("videos", "failed")
+
+_uploaded_lock = threading.Lock()
+
 # Fallback hashtags if none are found in the description
 DEFAULT_TECH_TAGS = [
     "FYP", "Tech", "AI", "Innovation", "YouTubeShorts", "Gadgets", "Trending",
@@ -48,14 +60,63 @@ def load_uploaded_videos():
 def save_uploaded_video(video_hash, video_id, title):
     """Save uploaded video info to prevent duplicates"""
     uploaded_file = "uploaded_videos.json"
-    data = {
-        'uploaded_hashes': list(load_uploaded_videos()),
-        'last_updated': time.strftime('%Y-%m-%d %H:%M:%S')
-    }
-    data['uploaded_hashes'].append(video_hash)
+    with _uploaded_lock:  # uploads finish on several threads
+        data = {
+            'uploaded_hashes': list(load_uploaded_videos()),
+            'last_updated': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        data['uploaded_hashes'].append(video_hash)
     
-    with open(uploaded_file, 'w') as f:
-        json.dump(data, f, indent=2)
+        with open(uploaded_file, 'w') as f:
+            json.dump(data, f, indent=2)
+
+def move_video(item, manifest, queued_at=None):
+    """Move a queued video and its metadata JSON into manifest's directory, out of reach of the workspace cleanup.
+
+    queued_at defaults to when the video first joined the queue; a later
+    one sends it behind the videos already waiting.
+    """
+    entry, file = item["entry"], item["file"]
+    os.makedirs(manifest.directory, exist_ok=True)
+    video_path = os.path.join(manifest.directory, file)
+    moved = os.path.abspath(video_path) != os.path.abspath(entry["path"])
+    if moved:
+        shutil.move(entry["path"], video_path)
+        shutil.move(item["json_path"], os.path.join(manifest.directory, file.replace(".mp4", ".json")))
+        move_session(item["session_key"], video_path)
+    manifest.record(entry["video_id"], video_path,
+                    queued_at=queued_at or entry.get("queued_at") or entry.get("added_at"))
+    if moved:
+        item["manifest"].remove(entry["video_id"])
+
+def has_open_session(item):
+    """Whether a resumable-upload session is saved for this video's bytes."""
+    path = item["entry"]["path"]
+    return os.path.exists(path) and load_session(item["session_key"], os.path.getsize(path)) is not None
+
+def defer_unfinished_uploads():
+    """Move videos from videos/final whose upload was cut off (a session is saved for them) to videos/deferred.
+
+    Runs before the workspace cleanup empties videos/final, so the next
+    upload run resumes them instead of the session file outliving the
+    video. Then drops sessions whose video no longer exists.
+    """
+    open_sessions = {os.path.abspath(session.get("path") or ""): session_key
+                     for session_key, session in saved_sessions().items()}
+    final_manifest = VideoManifest(FINAL_DIR)
+    deferred_manifest = VideoManifest(DEFERRED_DIR)
+    for entry in list(final_manifest.entries().values()):
+        session_key = open_sessions.get(os.path.abspath(entry["path"]))
+        file = os.path.basename(entry["path"])
+        json_path = os.path.join(FINAL_DIR, file.replace(".mp4", ".json"))
+        if session_key is None or not os.path.exists(entry["path"]) or not os.path.exists(json_path):
+            continue
+        move_video({"entry": entry, "manifest": final_manifest, "file": file, "json_path": json_path,
+                    "session_key": session_key}, deferred_manifest)
+        print(f"↩️ {file}: upload was interrupted, moved to {DEFERRED_DIR} to resume next run")
+    pruned = prune_sessions()
+    if pruned:
+        print(f"🧹 Dropped {pruned} upload sessions for videos that are gone or expired")
 
 def upload_to_youtube():
     creds = None
@@ -79,37 +140,55 @@ def upload_to_youtube():
         with open("token.pickle", "wb") as token:
             pickle.dump(creds, token)
 
-    youtube = build("youtube", "v3", credentials=creds)
+    # httplib2 connections aren't thread-safe: one API client per upload worker
+    clients = threading.local()
+
+    def youtube():
+        if not hasattr(clients, "youtube"):
+            clients.youtube = build("youtube", "v3", credentials=creds)
+        return clients.youtube
 
-    final_dir = os.path.join("videos", "final")
     uploaded_dir = os.path.join("videos", "uploaded")
     os.makedirs(uploaded_dir, exist_ok=True)
 
-    files = sorted([f for f in os.listdir(final_dir) if f.endswith(".mp4")])
+    final_manifest = VideoManifest(FINAL_DIR)
+    deferred_manifest = VideoManifest(DEFERRED_DIR)
+    failed_manifest = VideoManifest(FAILED_DIR)
     
     # Load already uploaded videos to prevent duplicates
     uploaded_hashes = load_uploaded_videos()
     print(f"📋 Found {len(uploaded_hashes)} previously uploaded videos")
 
-    uploaded_links = []
-
-    for file in files:
-        video_path = os.path.join(final_dir, file)
-        json_path = os.path.join(final_dir, file.replace(".mp4", ".json"))
+    # Videos deferred by an earlier run are queued together with today's
+    queue = []
+    for manifest in (deferred_manifest, final_manifest):
+        for entry in manifest.entries().values():
+            if entry["container"] != "mp4":
+                continue
+            video_path = entry["path"]
+            file = os.path.basename(video_path)
+            json_path = os.path.join(manifest.directory, file.replace(".mp4", ".json"))
 
-        if not os.path.exists(json_path):
-            print(f"⚠️ Metadata missing for {file}, skipping...")
-            continue
+            if not os.path.exists(json_path):
+                print(f"⚠️ Metadata missing for {file}, skipping...")
+                continue
 
-        # Check for duplicates using video hash
-        video_hash = get_video_hash(video_path)
-        if video_hash in uploaded_hashes:
-            print(f"⏭️ Duplicate detected for {file}, skipping...")
-            continue
+            # Check for duplicates using video hash
+            video_hash = entry.get("md5") or get_video_hash(video_path)
+            if video_hash in uploaded_hashes:
+                print(f"⏭️ Duplicate detected for {file}, skipping...")
+                continue
+            uploaded_hashes.add(video_hash)  # the same clip twice in the queue
 
-        with open(json_path) as f:
-            metadata = json.load(f)
+            with open(json_path) as f:
+                metadata = json.load(f)
+            queue.append({"entry": entry, "manifest": manifest, "file": file, "json_path": json_path,
+                          "video_hash": video_hash, "session_key": video_hash or entry["video_id"],
+                          "metadata": metadata})
+    queue.sort(key=lambda item: upload_priority(item["entry"], item["metadata"]))
 
+    def upload(item):
+        entry, file, metadata = item["entry"], item["file"], item["metadata"]
         video_tags = extract_hashtags(metadata.get("description", ""))
 
         request_body = {
@@ -125,43 +204,52 @@ def upload_to_youtube():
             }
         }
 
-        media = MediaFileUpload(
-            video_path,
-            chunksize=-1,
-            resumable=True,
-            mimetype="video/*"
-        )
-
-        try:
-            print(f"\n📤 Uploading: {file}")
-            upload = youtube.videos().insert(
-                part="snippet,status",
-                body=request_body,
-                media_body=media
-            )
+        print(f"\n📤 Uploading: {file}")
+        # Chunked and resumable: retries resend from the last confirmed byte, and
+        # a re-run after a crash picks up the saved session for this file
+        response, _ = upload_video(youtube(), entry["path"], request_body,
+                                   session_key=item["session_key"])
+        video_id = response.get("id")
+        youtube_link = f"https://www.youtube.com/watch?v={video_id}"
 
-            response = upload.execute()
-            video_id = response.get("id")
-            youtube_link = f"https://www.youtube.com/watch?v={video_id}"
-            uploaded_links.append(youtube_link)
+        print("\n".join([
+            f"✅ Uploaded: {video_id}",
+            f"📺 Video URL: {youtube_link}",
+            f"⬆️ Title: {request_body['snippet']['title']}",
+            f"📝 Description: {request_body['snippet']['description']}",
+            f"🏷️ Tags: {', '.join(video_tags)}",
+        ]))
 
-            print(f"✅ Uploaded: {video_id}")
-            print(f"📺 Video URL: {youtube_link}")
-            print(f"⬆️ Title: {request_body['snippet']['title']}")
-            print(f"📝 Description: {request_body['snippet']['description']}")
-            print(f"🏷️ Tags: {', '.join(video_tags)}")
+        # Save video hash to prevent future duplicates
+        save_uploaded_video(item["video_hash"], video_id, request_body['snippet']['title'])
 
-            # Save video hash to prevent future duplicates
-            save_uploaded_video(video_hash, video_id, request_body['snippet']['title'])
+        shutil.move(entry["path"], os.path.join(uploaded_dir, file))
+        shutil.move(item["json_path"], os.path.join(uploaded_dir, file.replace(".mp4", ".json")))
+        item["manifest"].remove(entry["video_id"])
+        return youtube_link
 
-            shutil.move(video_path, os.path.join(uploaded_dir, file))
-            shutil.move(json_path, os.path.join(uploaded_dir, file.replace(".mp4", ".json")))
+    # Concurrent uploads, paced by the API scheduler and the daily quota ledger
+    # instead of a fixed pause between videos. Resuming a saved session continues
+    # a videos.insert that was paid for when it started
+    outcomes = run_uploads(queue, upload, label=lambda item: item["file"],
+                           needs_quota=lambda item: not has_open_session(item))
 
-        except Exception as e:
-            print(f"❌ Upload failed for {file}: {e}")
-
-        time.sleep(1)  # prevent hitting rate limits
+    uploaded_links = []
+    for index, item in enumerate(queue):
+        outcome, result = outcomes[index]
+        if outcome == DONE:
+            uploaded_links.append(result)
+        elif outcome == DEFERRED and item["manifest"] is final_manifest:
+            move_video(item, deferred_manifest)
+        elif outcome == FAILED and os.path.exists(item["entry"]["path"]):
+            if is_retryable(result) or has_open_session(item):
+                # Try again next run, behind the videos already waiting
+                move_video(item, deferred_manifest, queued_at=datetime.now().isoformat())
+            else:
+                print(f"🚫 {item['file']}: not retrying ({type(result).__name__}), moved to {FAILED_DIR}")
+                move_video(item, failed_manifest)
 
+    get_scheduler().report()
     print("\n✅ All videos uploaded!")
     print("🔗 Uploaded video links:")
     for link in uploaded_links: